@@ -0,0 +1,93 @@
+from typing import AsyncIterator, Iterator
+from langchain_core.messages import HumanMessage, AIMessageChunk, AIMessage
+
+# Events of an answer stream, in the order a client sees them:
+#   ("node", name)        a graph node started calling an LLM
+#   ("low_relevance", "") a retrieved document was graded irrelevant
+#   ("thinking", text)    a chunk of the model's thoughts
+#   ("text", text)        a chunk of the answer
+EVENTS = ("node", "low_relevance", "thinking", "text")
+
+
+def cached_answer_chunks(message: AIMessage, chunk_size: int = 64) -> list[AIMessageChunk]:
+    """
+    Split a cached answer into thinking/text chunks shaped like the ones Claude
+    streams, so a semantic cache hit is rendered by the same streaming path.
+    """
+    blocks = message.content
+    if isinstance(blocks, str):
+        blocks = [{"type": "text", "text": blocks}]
+
+    chunks = []
+    for block in blocks:
+        if not isinstance(block, dict) or block.get("type") not in ("thinking", "text"):
+            continue
+        key = block["type"]
+        content = block.get(key, "")
+        for start in range(0, len(content), chunk_size):
+            chunks.append(AIMessageChunk(content=[{"type": key, key: content[start:start + chunk_size]}]))
+
+    return chunks
+
+
+class AnswerEvents:
+    """
+    Turn the (message, metadata) pairs of `stream_mode="messages"` into answer
+    events, so the Streamlit page and the HTTP service stream the same thing.
+    """
+
+    def __init__(self):
+        self.current_node = None
+        self.low_relevance = False
+
+    def feed(self, message, metadata: dict) -> list[tuple[str, str]]:
+        events = []
+        node = metadata.get("langgraph_node")
+        if node is not None and node != self.current_node:
+            self.current_node = node
+            events.append(("node", node))
+
+        if node == "grade_documents" and not self.low_relevance:
+            parsed = getattr(message, "additional_kwargs", {}).get("parsed")
+            if getattr(parsed, "binary_score", None) == "no":
+                self.low_relevance = True
+                events.append(("low_relevance", ""))
+
+        chunks = [message]
+        if node == "lookup_cache" and isinstance(message, AIMessage):
+            # Semantic cache hits come back as one full message: replay it as chunks.
+            chunks = cached_answer_chunks(message)
+
+        for chunk in chunks:
+            if not isinstance(chunk, AIMessageChunk) or not chunk.content:
+                continue
+            if isinstance(chunk.content, list):
+                block = chunk.content[0]
+                kind = block.get("type") if isinstance(block, dict) else None
+                if kind in ("thinking", "text") and kind in block:
+                    events.append((kind, block[kind]))
+
+        return events
+
+
+def answer_events(graph, prompt: str, config: dict) -> Iterator[tuple[str, str]]:
+    """Run the graph on a new user message and yield its answer events."""
+    stream = AnswerEvents()
+    for message, metadata in graph.stream(
+        {"messages": [HumanMessage(content=prompt)]},
+        stream_mode="messages",
+        config=config,
+    ):
+        yield from stream.feed(message, metadata)
+
+
+async def aanswer_events(graph, prompt: str, config: dict) -> AsyncIterator[tuple[str, str]]:
+    """Async version of `answer_events`, driven by `astream`."""
+    stream = AnswerEvents()
+    async for message, metadata in graph.astream(
+        {"messages": [HumanMessage(content=prompt)]},
+        stream_mode="messages",
+        config=config,
+    ):
+        for event in stream.feed(message, metadata):
+            yield event
@@ -0,0 +1,247 @@
+"""
+HTTP service of the agent graph.
+
+Runs the compiled AdaptiveRAGGraph behind FastAPI, so the graph scales separately
+from the Streamlit UI and across worker processes:
+
+    POST /threads/{thread_id}/runs/stream   {"message": "..."}
+        Answer a user message of the thread, streamed as server-sent events
+        (`node`, `low_relevance`, `thinking`, `text`, then `done` or `error`;
+        every `data` is JSON).
+    GET  /threads/{thread_id}/messages?offset=0
+        Messages of the thread from `offset` on, serialized with langchain's
+        messages_to_dict.
+    GET  /health
+        Liveness, active runs and whether the worker is draining.
+    GET  /metrics
+        Run, node and LLM metrics in the Prometheus text format, when the
+        prometheus telemetry sink is enabled (TELEMETRY_SINKS, prometheus by
+        default for the server).
+
+At most AGENT_API_MAX_CONCURRENT_RUNS runs stream at once per worker; a request
+that cannot start within AGENT_API_QUEUE_TIMEOUT seconds gets a 503 with
+Retry-After, and a second run on a busy thread gets a 409. On shutdown the worker
+stops accepting runs and waits up to AGENT_API_GRACEFUL_TIMEOUT seconds for the
+ones in flight.
+
+Run it from the repository root with:
+    python -m agent.api.server
+
+With AGENT_API_WORKERS > 1 every worker has its own graph; they share threads
+through the SQLite checkpointer file, where every checkpoint is committed before
+the run moves on (the in-memory one would need sticky routing by thread id).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from langchain_core.messages import messages_to_dict
+from pydantic import BaseModel
+from agent.api.events import aanswer_events
+from agent.lang_graph import resources
+from agent.lang_graph.telemetry import configure_logging
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_RUNS = int(os.getenv("AGENT_API_MAX_CONCURRENT_RUNS", "32"))
+QUEUE_TIMEOUT = float(os.getenv("AGENT_API_QUEUE_TIMEOUT", "10"))
+GRACEFUL_TIMEOUT = float(os.getenv("AGENT_API_GRACEFUL_TIMEOUT", "60"))
+HEARTBEAT_INTERVAL = float(os.getenv("AGENT_API_HEARTBEAT_INTERVAL", "15"))
+
+
+class RunRequest(BaseModel):
+    message: str
+
+
+def sse(event: str, data) -> str:
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class RunLimiter:
+    """
+    Admission control of the worker: a bounded number of concurrent runs, one run
+    per thread at a time, and no new runs once the worker drains.
+    """
+
+    def __init__(self, max_runs: int, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_runs)
+        self._runs: dict[str, object] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.draining = False
+
+    @property
+    def active_runs(self) -> int:
+        return len(self._runs)
+
+    async def acquire(self, thread_id: str) -> object:
+        """Admit a run of the thread and return its token, or raise an HTTP error."""
+        if self.draining:
+            raise HTTPException(503, "Server is shutting down", headers={"Retry-After": "1"})
+        if thread_id in self._runs:
+            raise HTTPException(409, f"Thread '{thread_id}' already has a run in progress")
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Too many concurrent runs", headers={"Retry-After": "5"})
+
+        if thread_id in self._runs:
+            # Another run of the thread started while this one was queued.
+            self._slots.release()
+            raise HTTPException(409, f"Thread '{thread_id}' already has a run in progress")
+        token = self._runs[thread_id] = object()
+        self._idle.clear()
+        return token
+
+    def release(self, thread_id: str, token: object) -> None:
+        """Release the run of the thread; releasing it twice is a no-op."""
+        if self._runs.get(thread_id) is not token:
+            return
+        del self._runs[thread_id]
+        self._slots.release()
+        if not self._runs:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> None:
+        """Refuse new runs and wait for the ones in flight."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutting down with {self.active_runs} runs still in flight")
+
+
+def build_agent():
+    from agent.lang_graph.graph import get_agent
+    from agent.lang_graph.semantic_cache import SemanticAnswerCache
+    from agent.lang_graph.verdict_cache import GradeVerdictCache
+
+    return get_agent(
+        warm_up=os.getenv("AGENT_API_WARM_UP", "1") == "1",
+        answer_cache=SemanticAnswerCache(),
+        verdict_cache=GradeVerdictCache(),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # Built before the graph, which picks it up: metrics at /metrics by default.
+    resources.telemetry(default="prometheus")
+    # Pooled async OpenAI connections, owned by the server's event loop.
+    resources.open_openai_async_http_client()
+    app.state.agent = build_agent()
+    app.state.limiter = RunLimiter(MAX_CONCURRENT_RUNS, QUEUE_TIMEOUT)
+    logger.info(f"Agent service ready ({MAX_CONCURRENT_RUNS} concurrent runs)")
+    yield
+    await app.state.limiter.drain(GRACEFUL_TIMEOUT)
+    await resources.aclose_openai_async_http_client()
+    resources.reset()
+
+
+app = FastAPI(title="AI Engineering Q&A agent", lifespan=lifespan)
+
+
+async def stream_run(agent, limiter: RunLimiter, token: object, thread_id: str, message: str, queued: float):
+    """
+    Stream the answer events of one run. The graph runs in its own task feeding a
+    queue, so heartbeats keep idle connections open while nodes grade or search,
+    and a client disconnect cancels the run.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    # The admission wait is reported with the run's telemetry.
+    config = {"configurable": {"thread_id": thread_id}, "metadata": {"queued_seconds": queued}}
+
+    async def produce():
+        try:
+            async for event in aanswer_events(agent, message, config):
+                await queue.put(event)
+            await queue.put(("done", {"thread_id": thread_id}))
+        except Exception as e:
+            logger.warning(f"Run of thread {thread_id} failed: {e!r}")
+            await queue.put(("error", {"message": str(e)}))
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            yield sse(event, data)
+            if event in ("done", "error"):
+                break
+    finally:
+        task.cancel()
+        limiter.release(thread_id, token)
+
+
+@app.post("/threads/{thread_id}/runs/stream")
+async def run_stream(thread_id: str, request: RunRequest):
+    limiter: RunLimiter = app.state.limiter
+    start = time.perf_counter()
+    token = await limiter.acquire(thread_id)
+    queued = time.perf_counter() - start
+
+    return StreamingResponse(
+        stream_run(app.state.agent, limiter, token, thread_id, request.message, queued),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # The stream releases the run when it ends; this covers a client that
+        # disconnects before the stream even started.
+        background=BackgroundTask(limiter.release, thread_id, token),
+    )
+
+
+@app.get("/threads/{thread_id}/messages")
+async def thread_messages(thread_id: str, offset: int = 0):
+    state = await app.state.agent.aget_state({"configurable": {"thread_id": thread_id}})
+    messages = state.values.get("messages", [])[offset:]
+    return {"thread_id": thread_id, "offset": offset, "messages": messages_to_dict(messages)}
+
+
+@app.get("/health")
+async def health():
+    limiter: RunLimiter = app.state.limiter
+    return {
+        "status": "draining" if limiter.draining else "ok",
+        "active_runs": limiter.active_runs,
+        "max_concurrent_runs": MAX_CONCURRENT_RUNS,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    from agent.lang_graph.telemetry import PrometheusSink
+
+    sink = resources.telemetry().sink(PrometheusSink)
+    if sink is None:
+        raise HTTPException(404, "The prometheus telemetry sink is not enabled")
+    return PlainTextResponse(sink.render(), media_type="text/plain; version=0.0.4")
+
+
+def main() -> None:
+    import uvicorn
+
+    uvicorn.run(
+        "agent.api.server:app",
+        host=os.getenv("AGENT_API_HOST", "0.0.0.0"),
+        port=int(os.getenv("AGENT_API_PORT", "8001")),
+        workers=int(os.getenv("AGENT_API_WORKERS", "1")),
+        timeout_graceful_shutdown=int(GRACEFUL_TIMEOUT),
+        timeout_keep_alive=30,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Budget reasons recorded in budget["exhausted"].
+DEADLINE = "deadline"
+LLM_CALLS = "llm_calls"
+REWRITES = "rewrites"
+REGENERATIONS = "regenerations"
+
+
+def new_budget(
+    deadline_seconds: float = 60.0,
+    max_rewrites: int = 2,
+    max_regenerations: int = 2,
+    max_llm_calls: int = 40,
+) -> dict:
+    """
+    Budget of a single graph run, carried in GraphState["budget"].
+
+    Nodes spend it and record the first limit that ran out in `exhausted`; edges
+    only read it, so every routing decision is based on what the state says.
+    """
+    return {
+        "deadline": time.time() + deadline_seconds,
+        "max_rewrites": max_rewrites,
+        "max_regenerations": max_regenerations,
+        "max_llm_calls": max_llm_calls,
+        "rewrites": 0,
+        "generations": 0,
+        "llm_calls": 0,
+        "routed": False,
+        "exhausted": None,
+    }
+
+
+def exhaust(budget: dict, reason: str) -> dict:
+    """Record `reason` as the exhausted budget, unless one was already recorded."""
+    if budget["exhausted"] is not None:
+        return budget
+
+    logger.warning(f"Budget exhausted: {reason}")
+    return {**budget, "exhausted": reason}
+
+
+def spend(budget: dict, llm_calls: int = 0, rewrites: int = 0, generations: int = 0) -> dict:
+    """Account for the work of a node and check the deadline and the LLM call limit."""
+    budget = {
+        **budget,
+        "llm_calls": budget["llm_calls"] + llm_calls,
+        "rewrites": budget["rewrites"] + rewrites,
+        "generations": budget["generations"] + generations,
+    }
+
+    if time.time() >= budget["deadline"]:
+        return exhaust(budget, DEADLINE)
+    if budget["llm_calls"] >= budget["max_llm_calls"]:
+        return exhaust(budget, LLM_CALLS)
+
+    return budget
+
+
+def can_rewrite(budget: dict) -> bool:
+    return budget["exhausted"] is None and budget["rewrites"] < budget["max_rewrites"]
+
+
+def can_regenerate(budget: dict) -> bool:
+    return budget["exhausted"] is None and budget["generations"] - 1 < budget["max_regenerations"]
+
+
+def out_of_time(budget: dict) -> bool:
+    return budget["exhausted"] in (DEADLINE, LLM_CALLS)
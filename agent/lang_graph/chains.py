@@ -1,26 +1,24 @@
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_core.output_parsers import StrOutputParser
-from agent.lang_graph.output_models import RouteQuery, GradeDocuments, GradeHallucinations, GradeAnswer
-from agent.lang_graph.prompts import (
-    ROUTING_PROMPT, GRADING_PROMPT, HALLUCINATION_PROMPT, 
-    ANSWER_PROMPT, REWRITE_PROMPT
-)
-from dotenv import load_dotenv
-from pathlib import Path
+# Nothing is built at import time: every accessor creates its model or chain on first
+# use and shares it process-wide through the resource registry (see resources.py).
 import os
+from agent.lang_graph import resources
 
-root_dir = Path().absolute()
-
-load_dotenv(dotenv_path=root_dir / ".env")
 
 # --- LLM Instances ---
-# Use the OPENAI_API_KEY environment variable explicitly
-GPT_4O_MINI = ChatOpenAI(
-    model="gpt-4o-mini", 
-    temperature=0,
-    openai_api_key=os.environ.get("OPENAI_API_KEY")
-)
+def gpt_4o_mini():
+    def build():
+        from langchain_openai import ChatOpenAI
+
+        # Use the OPENAI_API_KEY environment variable explicitly
+        return ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            openai_api_key=os.environ.get("OPENAI_API_KEY"),
+            http_client=resources.openai_http_client(),
+            http_async_client=resources.openai_async_http_client(),
+        )
+
+    return resources.shared("gpt_4o_mini", build)
 
 # CLAUDE_3_7 = ChatAnthropic(
 #     api_key=os.getenv("ANTHROPIC_API_KEY"),
@@ -30,17 +28,73 @@ GPT_4O_MINI = ChatOpenAI(
 #     thinking={"type": "enabled", "budget_tokens": 1024}
 # )
 
+
 # --- Chains ---
-query_router_llm = GPT_4O_MINI.with_structured_output(RouteQuery)
-query_router_chain = ROUTING_PROMPT | query_router_llm
+def query_router_chain():
+    def build():
+        from agent.lang_graph.output_models import RouteQuery
+        from agent.lang_graph.prompts import ROUTING_PROMPT
+
+        return ROUTING_PROMPT | gpt_4o_mini().with_structured_output(RouteQuery)
+
+    return resources.shared("query_router_chain", build)
+
+
+def document_grader_chain():
+    def build():
+        from agent.lang_graph.output_models import GradeDocuments
+        from agent.lang_graph.prompts import GRADING_PROMPT
+
+        return GRADING_PROMPT | gpt_4o_mini().with_structured_output(GradeDocuments)
+
+    return resources.shared("document_grader_chain", build)
+
+
+def batch_document_grader_chain():
+    def build():
+        from agent.lang_graph.output_models import GradeDocumentsBatch
+        from agent.lang_graph.prompts import BATCH_GRADING_PROMPT
+
+        return BATCH_GRADING_PROMPT | gpt_4o_mini().with_structured_output(GradeDocumentsBatch)
+
+    return resources.shared("batch_document_grader_chain", build)
+
+
+def hallucination_grader_chain():
+    def build():
+        from agent.lang_graph.output_models import GradeHallucinations
+        from agent.lang_graph.prompts import HALLUCINATION_PROMPT
+
+        return HALLUCINATION_PROMPT | gpt_4o_mini().with_structured_output(GradeHallucinations)
+
+    return resources.shared("hallucination_grader_chain", build)
+
+
+def answer_grader_chain():
+    def build():
+        from agent.lang_graph.output_models import GradeAnswer
+        from agent.lang_graph.prompts import ANSWER_PROMPT
+
+        return ANSWER_PROMPT | gpt_4o_mini().with_structured_output(GradeAnswer)
+
+    return resources.shared("answer_grader_chain", build)
+
+
+def question_rewriter_chain():
+    def build():
+        from langchain_core.output_parsers import StrOutputParser
+        from agent.lang_graph.prompts import REWRITE_PROMPT
+
+        return REWRITE_PROMPT | gpt_4o_mini() | StrOutputParser()
+
+    return resources.shared("question_rewriter_chain", build)
 
-document_grader_llm = GPT_4O_MINI.with_structured_output(GradeDocuments)
-document_grader_chain = GRADING_PROMPT | document_grader_llm
 
-hallucination_grader_llm = GPT_4O_MINI.with_structured_output(GradeHallucinations)
-hallucination_grader_chain = HALLUCINATION_PROMPT | hallucination_grader_llm
+def conversation_summary_chain():
+    def build():
+        from langchain_core.output_parsers import StrOutputParser
+        from agent.lang_graph.prompts import SUMMARY_PROMPT
 
-answer_grader_llm = GPT_4O_MINI.with_structured_output(GradeAnswer)
-answer_grader_chain = ANSWER_PROMPT | answer_grader_llm
+        return SUMMARY_PROMPT | gpt_4o_mini() | StrOutputParser()
 
-question_rewriter_chain = REWRITE_PROMPT | GPT_4O_MINI | StrOutputParser()
\ No newline at end of file
+    return resources.shared("conversation_summary_chain", build)
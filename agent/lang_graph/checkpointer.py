@@ -0,0 +1,581 @@
+import asyncio
+import atexit
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+"""
+
+TABLES = ("checkpoints", "blobs", "writes", "threads")
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    Durable, bounded LangGraph checkpointer on a local SQLite file.
+
+    Channel values are stored once per version (like MemorySaver), and:
+    - writes are batched: the task writes of a step are buffered and committed in
+      one transaction with the checkpoint that follows them, so every stored
+      checkpoint (and the last one of a run) is visible to the other processes
+      sharing the file as soon as `put` returns. Writes not followed by a
+      checkpoint (e.g. of a failed step) are committed every `batch_size`
+      statements or `flush_interval` seconds, and before every read;
+    - only the last `keep_last` checkpoints of a thread are kept, with the channel
+      values and pending writes no kept checkpoint refers to;
+    - threads idle for `ttl_seconds`, and the least recently used ones beyond
+      `max_threads`, are evicted every `evict_interval` seconds;
+    - `compact` applies the retention to every thread and gives the freed pages
+      back to the file system.
+
+    The file can be shared by the worker processes of one host (WAL mode).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        keep_last: int = 10,
+        ttl_seconds: float | None = 30 * 24 * 3600,
+        max_threads: int | None = 10_000,
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        evict_interval: float = 60.0,
+        serde: SerializerProtocol | None = None,
+    ):
+        super().__init__(serde=serde)
+        if keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+
+        self.path = Path(path)
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.evict_interval = evict_interval
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._lock = threading.RLock()
+        self._pending: list[tuple[str, tuple]] = []
+        self._touched: set[tuple[str, str]] = set()
+        self._timer: threading.Timer | None = None
+        self._last_eviction = time.monotonic()
+        self._closed = False
+        atexit.register(self.close)
+
+    # --- Write batching ---
+    def _queue(self, statements: list[tuple[str, tuple]]) -> None:
+        with self._lock:
+            self._pending.extend(statements)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            elif self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Commit the buffered writes, then apply retention and (when due) eviction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._closed or not self._pending:
+                return
+
+            pending, self._pending = self._pending, []
+            touched, self._touched = self._touched, set()
+            with self._transaction():
+                for sql, params in pending:
+                    self._conn.execute(sql, params)
+                for thread_id, checkpoint_ns in touched:
+                    self._retain(thread_id, checkpoint_ns)
+
+            if time.monotonic() - self._last_eviction >= self.evict_interval:
+                self.evict()
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """Flush the buffered writes and close the database."""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            self._conn.close()
+
+    # --- Retention, eviction and compaction ---
+    def _retain(self, thread_id: str, checkpoint_ns: str) -> int:
+        """Keep the last `keep_last` checkpoints of the thread and what they refer to."""
+        deleted = self._conn.execute(
+            """
+            DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                ORDER BY checkpoint_id DESC LIMIT ?
+            )
+            """,
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last),
+        ).rowcount
+        if not deleted:
+            return 0
+
+        self._conn.execute(
+            """
+            DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            )
+            """,
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+        )
+
+        referenced = set()
+        for type_, checkpoint in self._conn.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ):
+            versions = self.serde.loads_typed((type_, checkpoint))["channel_versions"]
+            referenced.update((channel, str(version)) for channel, version in versions.items())
+
+        stale = [
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in self._conn.execute(
+                "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            )
+            if (channel, version) not in referenced
+        ]
+        self._conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            stale,
+        )
+        return deleted
+
+    def evict(self) -> list[str]:
+        """
+        Delete the threads idle for more than `ttl_seconds` and the least recently
+        used ones beyond `max_threads`.
+
+        Returns:
+            The evicted thread ids.
+        """
+        with self._lock:
+            self._last_eviction = time.monotonic()
+            evicted = []
+            if self.ttl_seconds is not None:
+                evicted += [
+                    row[0] for row in self._conn.execute(
+                        "SELECT thread_id FROM threads WHERE last_access < ?", (time.time() - self.ttl_seconds,)
+                    )
+                ]
+            if self.max_threads is not None:
+                evicted += [
+                    row[0] for row in self._conn.execute(
+                        "SELECT thread_id FROM threads ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.max_threads,)
+                    )
+                ]
+
+            evicted = list(dict.fromkeys(evicted))
+            if evicted:
+                with self._transaction():
+                    for table in TABLES:
+                        self._conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in evicted])
+                logger.info(f"Evicted {len(evicted)} idle checkpoint threads")
+
+            return evicted
+
+    def compact(self, vacuum: bool = False) -> dict:
+        """
+        Apply the retention to every thread, evict idle threads, drop rows no
+        checkpoint refers to and give the freed pages back to the file system
+        (`vacuum` rewrites the whole file instead).
+
+        Returns:
+            The storage stats before and after compaction.
+        """
+        with self._lock:
+            self.flush()
+            before = self.storage_stats()
+            self.evict()
+            with self._transaction():
+                namespaces = self._conn.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall()
+                for thread_id, checkpoint_ns in namespaces:
+                    self._retain(thread_id, checkpoint_ns)
+                for table in ("blobs", "writes", "threads"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id NOT IN (SELECT DISTINCT thread_id FROM checkpoints)"
+                    )
+            self._conn.execute("VACUUM" if vacuum else "PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            after = self.storage_stats()
+
+        logger.info(f"Compacted checkpoints from {before['file_bytes']:,} to {after['file_bytes']:,} bytes")
+        return {"before": before, "after": after}
+
+    # --- Storage size ---
+    def thread_sizes(self, limit: int | None = None) -> dict[str, int]:
+        """Stored bytes of every thread, largest first."""
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                """
+                SELECT thread_id, SUM(size) AS total FROM (
+                    SELECT thread_id, length(checkpoint) + length(metadata) AS size FROM checkpoints
+                    UNION ALL SELECT thread_id, ifnull(length(value), 0) FROM blobs
+                    UNION ALL SELECT thread_id, ifnull(length(value), 0) FROM writes
+                ) GROUP BY thread_id ORDER BY total DESC LIMIT ?
+                """,
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return dict(rows)
+
+    def storage_stats(self) -> dict:
+        """Thread and checkpoint counts, stored bytes and the size of the file."""
+        with self._lock:
+            self.flush()
+            threads = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+            checkpoints = self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        sizes = self.thread_sizes()
+
+        return {
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "bytes": sum(sizes.values()),
+            "file_bytes": page_count * page_size,
+            "free_bytes": free_pages * page_size,
+            "largest_threads": dict(list(sizes.items())[:10]),
+        }
+
+    # --- BaseCheckpointSaver ---
+    def _touch(self, thread_id: str) -> tuple[str, tuple]:
+        return (
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT (thread_id) DO UPDATE SET last_access = excluded.last_access",
+            (thread_id, time.time()),
+        )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values: dict[str, Any] = c.pop("channel_values")
+
+        statements = []
+        for channel, version in new_versions.items():
+            type_, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            statements.append((
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, channel, str(version), type_, value),
+            ))
+
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        statements.append((
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                type_, serialized, metadata_type, serialized_metadata,
+            ),
+        ))
+        statements.append(self._touch(thread_id))
+
+        with self._lock:
+            self._touched.add((thread_id, checkpoint_ns))
+            self._pending.extend(statements)
+            # Commit now: another worker may read the thread right after the run.
+            self.flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        statements = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, serialized = self.serde.dumps_typed(value)
+            # Regular writes are written once; special ones (errors, interrupts) are replaced.
+            verb = "INSERT OR IGNORE" if idx >= 0 else "INSERT OR REPLACE"
+            statements.append((
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, serialized, task_path),
+            ))
+
+        self._queue(statements)
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, serialized, metadata_type, metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, serialized))
+
+        versions = {channel: str(version) for channel, version in checkpoint["channel_versions"].items()}
+        values = {}
+        if versions:
+            placeholders = ",".join("?" * len(versions))
+            for channel, version, blob_type, value in self._conn.execute(
+                f"SELECT channel, version, type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND channel IN ({placeholders})",
+                (thread_id, checkpoint_ns, *versions),
+            ):
+                if versions[channel] == version and blob_type != "empty":
+                    values[channel] = self.serde.loads_typed((blob_type, value))
+
+        writes = self._conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((write_type, value)))
+                for task_id, _, channel, write_type, value, _ in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            self.flush()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+
+            result = self._tuple(row)
+            # Reading a thread keeps it alive too; written with the next batch.
+            self._pending.append(self._touch(thread_id))
+            return result
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                f"SELECT * FROM checkpoints {where} ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC", params
+            ).fetchall()
+
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                results.append(self._tuple(row))
+
+        yield from results
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            with self._transaction():
+                for table in TABLES:
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # Async versions run the SQLite calls in a worker thread, off the event loop.
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for result in results:
+            yield result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+if __name__ == "__main__":
+    # Compact the configured checkpoint database and report its size.
+    from agent.lang_graph import resources
+    from agent.lang_graph.telemetry import configure_logging
+
+    configure_logging()
+    saver = resources.checkpointer()
+    if not isinstance(saver, SQLiteCheckpointer):
+        raise SystemExit("CHECKPOINTER_BACKEND is not sqlite, nothing to compact")
+    report = saver.compact(vacuum=True)
+    print(report["after"])
@@ -0,0 +1,161 @@
+import logging
+from langchain_core.documents import Document
+from agent.lang_graph.rerank import jaccard
+from agent.lang_graph.tokens import count_tokens, truncate_to_tokens
+from agent.vector_store.sparse_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def merge_overlapping(text: str, next_text: str, min_overlap: int = 20) -> str | None:
+    """
+    Merge two chunks when the end of `text` repeats the start of `next_text` (the
+    splitter's chunk overlap) or one contains the other; None when they do not overlap.
+    """
+    if next_text in text:
+        return text
+    if text in next_text:
+        return next_text
+
+    for size in range(min(len(text), len(next_text)), min_overlap - 1, -1):
+        if text.endswith(next_text[:size]):
+            return text + next_text[size:]
+
+    return None
+
+
+class ContextPacker:
+    """
+    Pack retrieved documents into the context of the generator and of the
+    hallucination grader.
+
+    Chunks of the same source that overlap (the splitter repeats `chunk_overlap`
+    characters between neighbours) or are adjacent are merged back into one
+    passage, near-duplicate passages are dropped, and the remaining passages are
+    added by relevance (the order of the documents, best first) until
+    `max_tokens` is reached; the passage that does not fit is truncated.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 6000,
+        model: str = "gpt-4o-mini",
+        duplicate_threshold: float = 0.9,
+        min_truncated_tokens: int = 64,
+    ):
+        self.max_tokens = max_tokens
+        self.model = model
+        self.duplicate_threshold = duplicate_threshold
+        self.min_truncated_tokens = min_truncated_tokens
+
+    @staticmethod
+    def _join(passage: list, other: list) -> list | None:
+        (rank, text, start), (other_rank, other_text, other_start) = passage, other
+        joined = merge_overlapping(text, other_text)
+        if joined is None:
+            joined = merge_overlapping(other_text, text)
+        if joined is None and start is not None and other_start is not None:
+            if 0 <= other_start - (start + len(text)) <= 2:
+                joined = text + "\n" + other_text
+            elif 0 <= start - (other_start + len(other_text)) <= 2:
+                joined = other_text + "\n" + text
+        if joined is None:
+            return None
+
+        starts = [s for s in (start, other_start) if s is not None]
+        return [min(rank, other_rank), joined, min(starts) if starts else None]
+
+    def merge_passages(self, docs: list[Document]) -> list[tuple[int, str]]:
+        """
+        Merge overlapping and adjacent chunks of each source.
+
+        Returns:
+            (rank of the best chunk, text) of every passage.
+        """
+        by_source: dict[str, list[tuple[int, Document]]] = {}
+        for rank, doc in enumerate(docs):
+            # Documents without a source (e.g. web search results) are never merged.
+            source = doc.metadata.get("source")
+            key = source if source and source != "web" else f"#{rank}"
+            by_source.setdefault(key, []).append((rank, doc))
+
+        passages = []
+        for chunks in by_source.values():
+            # Chunks split with add_start_index are put back in page order, so
+            # adjacent ones can be joined too; overlapping ones merge in any order.
+            chunks.sort(key=lambda item: (item[1].metadata.get("start_index", -1), item[0]))
+            merged: list[list] = []
+            for rank, doc in chunks:
+                passage = [rank, doc.page_content, doc.metadata.get("start_index")]
+                while True:
+                    for other in merged:
+                        joined = self._join(other, passage)
+                        if joined is not None:
+                            merged.remove(other)
+                            passage = joined
+                            break
+                    else:
+                        break
+                merged.append(passage)
+
+            passages.extend((rank, text) for rank, text, _ in merged)
+
+        return sorted(passages)
+
+    def pack(self, docs: list[Document]) -> tuple[str, dict]:
+        """
+        Pack the documents into a context string.
+
+        Args:
+            docs: documents, best first.
+
+        Returns:
+            The context and a report of merged, duplicate and dropped passages and of
+            the tokens saved.
+        """
+        passages = self.merge_passages(docs)
+
+        kept, kept_terms, duplicates = [], [], 0
+        for _, text in passages:
+            terms = set(tokenize(text))
+            if any(jaccard(terms, other) >= self.duplicate_threshold for other in kept_terms):
+                duplicates += 1
+                continue
+            kept.append(text)
+            kept_terms.append(terms)
+
+        packed, used, truncated, dropped = [], 0, 0, 0
+        for text in kept:
+            tokens = count_tokens(text, self.model)
+            if used + tokens <= self.max_tokens:
+                packed.append(text)
+                used += tokens
+                continue
+
+            remaining = self.max_tokens - used
+            if remaining >= self.min_truncated_tokens:
+                text = truncate_to_tokens(text, remaining, self.model)
+                packed.append(text)
+                used += count_tokens(text, self.model)
+                truncated += 1
+            else:
+                dropped += 1
+
+        unpacked_tokens = sum(count_tokens(doc.page_content, self.model) for doc in docs)
+        report = {
+            "documents": len(docs),
+            "passages": len(packed),
+            "merged": len(docs) - len(passages),
+            "duplicates": duplicates,
+            "truncated": truncated,
+            "dropped": dropped,
+            "tokens": used,
+            "tokens_saved": max(unpacked_tokens - used, 0),
+        }
+        logger.info(
+            f"Packed {len(docs)} documents into {len(packed)} passages, {used} tokens "
+            f"({report['merged']} merged, {duplicates} duplicates, {dropped} dropped, "
+            f"{report['tokens_saved']} tokens saved)"
+        )
+
+        return "\n\n".join(packed), report
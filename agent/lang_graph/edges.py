@@ -1,35 +1,28 @@
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
-from dotenv import load_dotenv
-from pinecone import Pinecone
-from pathlib import Path
-from langchain_community.tools.tavily_search import TavilySearchResults
+import logging
 from agent.lang_graph.states import GraphState
-from agent.lang_graph.chains import query_router_chain
-import os
+from agent.lang_graph import resources
+from agent.lang_graph import chains
+from agent.lang_graph import budget as budgets
 
-root_dir = Path().absolute()
-
-load_dotenv(dotenv_path=root_dir / ".env")
+logger = logging.getLogger(__name__)
 
 class AdaptiveRAGEdges:
-    def __init__(self):
-        # --- Pinecone Setup ---
-        self.pc = Pinecone()
-        self.index = self.pc.Index("web-ai-engineer-index")
-        # Explicitly use the OpenAI API key
-        self.embedding_model = OpenAIEmbeddings(
-            model="text-embedding-3-large",
-            openai_api_key=os.environ.get("OPENAI_API_KEY")
-        )
-        self.vector_store = PineconeVectorStore(index=self.index, embedding=self.embedding_model)
-
-        # --- Web and Vectorstore Retrievers ---
-        self.web_search_tool = TavilySearchResults(k=3)
-        self.retriever = self.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 15}
-        )
+    # --- Shared clients (built once per process on first use, see resources.py) ---
+    @property
+    def embedding_model(self):
+        return resources.embedding_model()
+
+    @property
+    def vector_store(self):
+        return resources.vector_store()
+
+    @property
+    def web_search_tool(self):
+        return resources.web_search_tool()
+
+    @property
+    def retriever(self):
+        return resources.retriever()
 
     def route_question(self, state: GraphState) -> GraphState:
         """
@@ -38,25 +31,111 @@ class AdaptiveRAGEdges:
         Args:
             state: GraphState with current state (question).
         """
-        print(f"--- Routing question ---")
-        route = query_router_chain.invoke({"question": state["messages"][-1].content})
+        logger.info("Routing question")
+        route = chains.query_router_chain().invoke({"question": state["messages"][-1].content})
+        return self.datasource_route(route)
+
+    async def aroute_question(self, state: GraphState) -> GraphState:
+        """Async version of `route_question`."""
+        logger.info("Routing question")
+        route = await chains.query_router_chain().ainvoke({"question": state["messages"][-1].content})
+        return self.datasource_route(route)
 
+    @staticmethod
+    def datasource_route(route) -> str:
         if route.datasource == "web_search":
             return "web_search"
         elif route.datasource == "vectorstore":
             return "vectorstore"
         
+    def route_after_cache_lookup(self, state: GraphState) -> GraphState:
+        """
+        Finish on a semantic cache hit, otherwise route the user question.
+
+        Args:
+            state: GraphState with current state (question and cache_hit).
+        """
+        if state.get("cache_hit"):
+            return "cache_hit"
+
+        return self.route_question(state)
+
+    async def aroute_after_cache_lookup(self, state: GraphState) -> GraphState:
+        """Async version of `route_after_cache_lookup`."""
+        if state.get("cache_hit"):
+            return "cache_hit"
+
+        return await self.aroute_question(state)
+
+    def is_cache_hit(self, state: GraphState) -> GraphState:
+        """
+        Finish on a semantic cache hit, otherwise go on to (speculative) routing.
+
+        Args:
+            state: GraphState with current state (cache_hit).
+        """
+        return "cache_hit" if state.get("cache_hit") else "cache_miss"
+
+    def route_speculated(self, state: GraphState) -> GraphState:
+        """
+        Continue with the documents of the speculated route, or run the route when
+        it was not speculated (no documents, not even an empty list).
+
+        Args:
+            state: GraphState with current state (route and documents).
+        """
+        if state["documents"] is None:
+            return state["route"]
+        return "grade_documents" if state["route"] == "vectorstore" else "generate"
+
     def decide_to_generate(self, state: GraphState) -> GraphState:
         """
         Decide whether to generate an answer to the user question.
+
+        Without relevant documents the query is rewritten while the budget allows
+        it; once it is used up, the run degrades to a web search (or, out of time,
+        straight to generation) instead of looping.
         
         Args:
             state: GraphState with current state (question).
         """
-        print(f"--- Deciding to generate ---")
+        logger.info("Deciding to generate")
         filtered_docs = state["documents"]
-        if not filtered_docs:
+        if filtered_docs:
+            return "generate"
+
+        budget = state["budget"]
+        if budgets.can_rewrite(budget):
             return "rewrite_query"
-        
-        else:
-            return "generate"
\ No newline at end of file
+        if budgets.out_of_time(budget):
+            return "generate"
+        return "web_search"
+
+    def decide_to_grade_generation(self, state: GraphState) -> GraphState:
+        """
+        Grade the generation, or return it ungraded when the run is out of time or
+        LLM calls.
+
+        Args:
+            state: GraphState with current state (budget).
+        """
+        if budgets.out_of_time(state["budget"]):
+            return "end"
+        return "grade_generation"
+
+    def decide_after_grading(self, state: GraphState) -> GraphState:
+        """
+        Finish with a useful answer, otherwise regenerate or rewrite while the budget
+        allows it and return the best ungraded answer once it is used up.
+
+        Args:
+            state: GraphState with current state (generation_grade and budget).
+        """
+        grade = state["generation_grade"]
+        budget = state["budget"]
+
+        if grade == "not supported" and not budgets.can_regenerate(budget):
+            return "end"
+        if grade == "not useful" and not budgets.can_rewrite(budget):
+            return "end"
+        return grade
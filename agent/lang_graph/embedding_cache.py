@@ -0,0 +1,161 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+root_dir = Path().absolute()
+
+DEFAULT_CACHE_PATH = root_dir / ".cache" / "embeddings.sqlite3"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that remembers every vector it has computed.
+
+    Vectors are keyed by a hash of the model name and the text. Lookups go through a
+    bounded in-memory LRU first and then through a SQLite file that survives
+    restarts; only the misses of both tiers are sent to the wrapped model. Vectors
+    are kept as float32 arrays in memory and as raw float32 bytes on disk.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_memory_items: int = 4096,
+        cache_path: str | Path | None = DEFAULT_CACHE_PATH,
+    ):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.max_memory_items = max_memory_items
+
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if cache_path is not None:
+            cache_path = Path(cache_path)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if self._db is not None:
+                # SQLite caps the number of bound parameters per statement.
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                    self.disk_hits += len(rows)
+
+        return found
+
+    def _put_many(self, items: dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()],
+                )
+                self._db.commit()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._get_many(list(dict.fromkeys(keys)))
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            self.misses += len(missing)
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, vectors)
+            }
+            self._put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        found = self._get_many([key])
+        if key in found:
+            return found[key].tolist()
+
+        self.misses += 1
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        self._put_many({key: vector})
+
+        return vector.tolist()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._get_many(list(dict.fromkeys(keys)))
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            self.misses += len(missing)
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, vectors)
+            }
+            self._put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        found = self._get_many([key])
+        if key in found:
+            return found[key].tolist()
+
+        self.misses += 1
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        self._put_many({key: vector})
+
+        return vector.tolist()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_items": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
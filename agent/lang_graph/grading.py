@@ -0,0 +1,497 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from langchain_core.documents import Document
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from agent.lang_graph.prompts import GRADING_SYSTEM_PROMPT, BATCH_GRADING_SYSTEM_PROMPT
+from agent.lang_graph.tokens import count_tokens
+from agent.lang_graph.verdict_cache import GradeVerdictCache
+
+logger = logging.getLogger(__name__)
+
+GRADING_MODES = ("sequential", "concurrent", "listwise")
+GENERATION_GRADING_MODES = ("sequential", "parallel")
+
+
+def format_batch_documents(docs: list[Document], first_id: int = 0) -> str:
+    """Wrap each document in an id tag so the batch grader can refer to it."""
+    return "\n\n".join(
+        f'<document id="{first_id + i}">\n{doc.page_content}\n</document>'
+        for i, doc in enumerate(docs)
+    )
+
+
+def grading_agreement(verdicts: list[str], other_verdicts: list[str]) -> float:
+    """Fraction of documents on which two grading runs over the same documents agree."""
+    if len(verdicts) != len(other_verdicts):
+        raise ValueError("Both grading runs must cover the same documents")
+    if not verdicts:
+        return 1.0
+
+    return sum(a == b for a, b in zip(verdicts, other_verdicts)) / len(verdicts)
+
+
+class DocumentGrader:
+    """
+    Grade retrieved documents for relevance to the user question.
+
+    In "sequential" mode every document goes through the grader chain one after the
+    other. In "concurrent" mode documents are fanned out to a bounded thread pool,
+    each grade gets its own timeout and a failed or timed-out grade falls back to
+    `default_verdict`. In "listwise" mode all documents are graded by the batch
+    grader chain in as few calls as fit in `max_batch_tokens`. In every mode the
+    original document order is preserved, and with a `verdict_cache` only documents
+    without a memoized verdict for the question are sent to the LLM.
+    """
+
+    def __init__(
+        self,
+        grader_chain,
+        mode: str = "concurrent",
+        max_concurrency: int = 8,
+        timeout: float = 15.0,
+        default_verdict: str = "yes",
+        batch_grader_chain=None,
+        max_batch_tokens: int = 8000,
+        verdict_cache: GradeVerdictCache | None = None,
+    ):
+        if mode not in GRADING_MODES:
+            raise ValueError(f"Unknown grading mode '{mode}', expected one of {GRADING_MODES}")
+        if default_verdict not in ("yes", "no"):
+            raise ValueError("default_verdict must be 'yes' or 'no'")
+        if mode == "listwise" and batch_grader_chain is None:
+            raise ValueError("Listwise grading needs a batch grader chain")
+
+        self.grader_chain = grader_chain
+        self.mode = mode
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.default_verdict = default_verdict
+        self.batch_grader_chain = batch_grader_chain
+        self.max_batch_tokens = max_batch_tokens
+        self.verdict_cache = verdict_cache
+
+    def grade(self, docs: list[Document], question: str, thread_id: str | None = None) -> tuple[list[Document], dict]:
+        """
+        Grade the documents and keep only the relevant ones.
+
+        Args:
+            docs: retrieved documents, in retrieval order.
+            question: the question the documents are graded against.
+            thread_id: conversation thread, scopes the verdict cache when it is not shared.
+
+        Returns:
+            The relevant documents (original order) and a report with per-document
+            verdicts, timings in seconds, failure counts and verdict cache hits.
+        """
+        start = time.perf_counter()
+        verdicts = self._cached_verdicts(docs, question, thread_id)
+        to_grade = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        graded = self._grade_with_mode([docs[i] for i in to_grade], question)
+
+        return self._collect(docs, question, thread_id, verdicts, to_grade, graded, start)
+
+    async def agrade(self, docs: list[Document], question: str, thread_id: str | None = None) -> tuple[list[Document], dict]:
+        """Async version of `grade`: documents are graded on the event loop instead of a thread pool."""
+        start = time.perf_counter()
+        verdicts = self._cached_verdicts(docs, question, thread_id)
+        to_grade = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        graded = await self._agrade_with_mode([docs[i] for i in to_grade], question)
+
+        return self._collect(docs, question, thread_id, verdicts, to_grade, graded, start)
+
+    def _cached_verdicts(self, docs: list[Document], question: str, thread_id: str | None) -> list[str | None]:
+        if self.verdict_cache is None:
+            return [None] * len(docs)
+        return [self.verdict_cache.get(doc, question, thread_id) for doc in docs]
+
+    def _collect(
+        self,
+        docs: list[Document],
+        question: str,
+        thread_id: str | None,
+        verdicts: list[str | None],
+        to_grade: list[int],
+        graded: tuple[list, list, list, int, int],
+        start: float,
+    ) -> tuple[list[Document], dict]:
+        graded_verdicts, graded_timings, graded_failures, calls, prompt_tokens = graded
+        timings = [0.0] * len(docs)
+
+        failed = {failure["index"] for failure in graded_failures}
+        failures = [{**failure, "index": to_grade[failure["index"]]} for failure in graded_failures]
+        for position, i in enumerate(to_grade):
+            verdicts[i], timings[i] = graded_verdicts[position], graded_timings[position]
+            # Fallback verdicts of failed grades are not worth remembering.
+            if self.verdict_cache is not None and position not in failed:
+                self.verdict_cache.put(docs[i], question, graded_verdicts[position], thread_id)
+
+        filtered_docs = [doc for doc, verdict in zip(docs, verdicts) if verdict == "yes"]
+
+        report = {
+            "mode": self.mode,
+            "verdicts": verdicts,
+            "timings": timings,
+            "failures": failures,
+            "llm_calls": calls,
+            "prompt_tokens": prompt_tokens,
+            "cache_hits": len(docs) - len(to_grade),
+            "total_time": time.perf_counter() - start,
+        }
+        logger.info(
+            f"Graded {len(docs)} documents in {report['total_time']:.2f}s with {calls} calls "
+            f"({len(filtered_docs)} relevant, {len(failures)} failed, {report['cache_hits']} cached)"
+        )
+
+        return filtered_docs, report
+
+    def _grade_with_mode(self, docs: list[Document], question: str) -> tuple[list, list, list, int, int]:
+        if not docs:
+            return [], [], [], 0, 0
+
+        if self.mode == "listwise":
+            return self._grade_listwise(docs, question)
+
+        if self.mode == "sequential":
+            verdicts, timings, failures = self._grade_sequentially(docs, question)
+        else:
+            verdicts, timings, failures = self._grade_concurrently(docs, question)
+
+        return verdicts, timings, failures, len(docs), self._prompt_tokens(docs, question)
+
+    async def _agrade_with_mode(self, docs: list[Document], question: str) -> tuple[list, list, list, int, int]:
+        if not docs:
+            return [], [], [], 0, 0
+
+        if self.mode == "listwise":
+            return await self._agrade_listwise(docs, question)
+
+        # Sequential grading is concurrent grading one document at a time.
+        max_concurrency = 1 if self.mode == "sequential" else self.max_concurrency
+        verdicts, timings, failures = await self._agrade_concurrently(docs, question, max_concurrency)
+
+        return verdicts, timings, failures, len(docs), self._prompt_tokens(docs, question)
+
+    def _prompt_tokens(self, docs: list[Document], question: str) -> int:
+        overhead = count_tokens(GRADING_SYSTEM_PROMPT + question)
+        return sum(overhead + count_tokens(doc.page_content) for doc in docs)
+
+    def _grade_one(self, doc: Document, question: str) -> tuple[str, float, Exception | None]:
+        start = time.perf_counter()
+        try:
+            score = self.grader_chain.invoke({"document": doc.page_content, "question": question})
+            verdict = "yes" if score.binary_score.strip().lower() == "yes" else "no"
+            error = None
+        except Exception as e:
+            verdict, error = self.default_verdict, e
+
+        return verdict, time.perf_counter() - start, error
+
+    async def _agrade_one(self, doc: Document, question: str) -> tuple[str, float, Exception | None]:
+        start = time.perf_counter()
+        try:
+            score = await self.grader_chain.ainvoke({"document": doc.page_content, "question": question})
+            verdict = "yes" if score.binary_score.strip().lower() == "yes" else "no"
+            error = None
+        except Exception as e:
+            verdict, error = self.default_verdict, e
+
+        return verdict, time.perf_counter() - start, error
+
+    async def _agrade_concurrently(self, docs: list[Document], question: str, max_concurrency: int) -> tuple[list, list, list]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(doc: Document):
+            # The timeout starts once the grade holds a slot, like in the thread pool.
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(self._agrade_one(doc, question), self.timeout)
+                except asyncio.TimeoutError:
+                    return self.default_verdict, time.perf_counter() - start, "timeout"
+
+        results = await asyncio.gather(*(run(doc) for doc in docs))
+
+        verdicts = [verdict for verdict, _, _ in results]
+        timings = [elapsed for _, elapsed, _ in results]
+        failures = [
+            {"index": i, "reason": error if isinstance(error, str) else repr(error)}
+            for i, (_, _, error) in enumerate(results) if error is not None
+        ]
+        return verdicts, timings, failures
+
+    def _grade_sequentially(self, docs: list[Document], question: str) -> tuple[list, list, list]:
+        verdicts, timings, failures = [], [], []
+        for i, doc in enumerate(docs):
+            verdict, elapsed, error = self._grade_one(doc, question)
+            verdicts.append(verdict)
+            timings.append(elapsed)
+            if error is not None:
+                failures.append({"index": i, "reason": repr(error)})
+
+        return verdicts, timings, failures
+
+    def _grade_concurrently(self, docs: list[Document], question: str) -> tuple[list, list, list]:
+        verdicts = [self.default_verdict] * len(docs)
+        timings = [None] * len(docs)
+        failures = []
+        started = {}
+
+        def run(i: int, doc: Document):
+            started[i] = time.perf_counter()
+            return self._grade_one(doc, question)
+
+        executor = ContextThreadPoolExecutor(max_workers=min(self.max_concurrency, len(docs)))
+        futures = {executor.submit(run, i, doc): i for i, doc in enumerate(docs)}
+        pending = set(futures)
+        poll_interval = min(self.timeout, 0.1)
+
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    i = futures[future]
+                    verdict, elapsed, error = future.result()
+                    verdicts[i], timings[i] = verdict, elapsed
+                    if error is not None:
+                        failures.append({"index": i, "reason": repr(error)})
+
+                # Per-document timeout, measured from when the grade actually started
+                # so that documents queued behind the concurrency limit are not penalized.
+                now = time.perf_counter()
+                for future in list(pending):
+                    i = futures[future]
+                    if i in started and now - started[i] >= self.timeout:
+                        pending.discard(future)
+                        timings[i] = now - started[i]
+                        failures.append({"index": i, "reason": "timeout"})
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        failures.sort(key=lambda failure: failure["index"])
+        return verdicts, timings, failures
+
+    def split_by_token_budget(self, docs: list[Document], question: str) -> list[list[int]]:
+        """
+        Split document indexes into batches whose prompt fits in `max_batch_tokens`.
+        A document that exceeds the budget on its own gets a batch of its own.
+        """
+        overhead = count_tokens(BATCH_GRADING_SYSTEM_PROMPT + question)
+        batches, current, current_tokens = [], [], overhead
+
+        for i, doc in enumerate(docs):
+            doc_tokens = count_tokens(format_batch_documents([doc], first_id=i))
+            if current and current_tokens + doc_tokens > self.max_batch_tokens:
+                batches.append(current)
+                current, current_tokens = [], overhead
+            current.append(i)
+            current_tokens += doc_tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    def _grade_batch(self, docs: list[Document], indexes: list[int], question: str) -> tuple[dict, float, int]:
+        start = time.perf_counter()
+        documents = "\n\n".join(format_batch_documents([docs[i]], first_id=i) for i in indexes)
+        result = self.batch_grader_chain.invoke({"documents": documents, "question": question})
+
+        verdicts = {}
+        for verdict in result.verdicts:
+            if verdict.document_id in indexes:
+                verdicts[verdict.document_id] = "yes" if verdict.binary_score.strip().lower() == "yes" else "no"
+
+        prompt_tokens = count_tokens(BATCH_GRADING_SYSTEM_PROMPT + question + documents)
+        return verdicts, time.perf_counter() - start, prompt_tokens
+
+    async def _agrade_batch(self, docs: list[Document], indexes: list[int], question: str) -> tuple[dict, float, int]:
+        start = time.perf_counter()
+        documents = "\n\n".join(format_batch_documents([docs[i]], first_id=i) for i in indexes)
+        result = await self.batch_grader_chain.ainvoke({"documents": documents, "question": question})
+
+        verdicts = {}
+        for verdict in result.verdicts:
+            if verdict.document_id in indexes:
+                verdicts[verdict.document_id] = "yes" if verdict.binary_score.strip().lower() == "yes" else "no"
+
+        prompt_tokens = count_tokens(BATCH_GRADING_SYSTEM_PROMPT + question + documents)
+        return verdicts, time.perf_counter() - start, prompt_tokens
+
+    def _collect_batches(self, docs: list[Document], batches: list[list[int]], outcomes: list) -> tuple[list, list, list, int, int]:
+        """Fold the (verdicts, elapsed, prompt tokens, failure reason) of every batch into per-document results."""
+        verdicts = [self.default_verdict] * len(docs)
+        timings = [None] * len(docs)
+        failures = []
+        prompt_tokens = 0
+
+        for indexes, (batch_verdicts, elapsed, batch_tokens, reason) in zip(batches, outcomes):
+            prompt_tokens += batch_tokens
+            for i in indexes:
+                timings[i] = elapsed
+                if i in batch_verdicts:
+                    verdicts[i] = batch_verdicts[i]
+                else:
+                    failures.append({"index": i, "reason": reason})
+
+        return verdicts, timings, failures, len(batches), prompt_tokens
+
+    def _grade_listwise(self, docs: list[Document], question: str) -> tuple[list, list, list, int, int]:
+        batches = self.split_by_token_budget(docs, question)
+
+        outcomes = [None] * len(batches)
+        started = {}
+
+        def run(b: int, indexes: list[int]):
+            started[b] = time.perf_counter()
+            return self._grade_batch(docs, indexes, question)
+
+        executor = ContextThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches)))
+        futures = {executor.submit(run, b, indexes): b for b, indexes in enumerate(batches)}
+        pending = set(futures)
+        poll_interval = min(self.timeout, 0.1)
+
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    b = futures[future]
+                    try:
+                        outcomes[b] = (*future.result(), "missing verdict")
+                    except Exception as e:
+                        outcomes[b] = ({}, None, 0, repr(e))
+
+                # Per-batch timeout, measured from when the batch started, as in
+                # _grade_concurrently: batches queued behind the limit are not penalized.
+                now = time.perf_counter()
+                for future in list(pending):
+                    b = futures[future]
+                    if b in started and now - started[b] >= self.timeout:
+                        pending.discard(future)
+                        outcomes[b] = ({}, now - started[b], 0, "timeout")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self._collect_batches(docs, batches, outcomes)
+
+    async def _agrade_listwise(self, docs: list[Document], question: str) -> tuple[list, list, list, int, int]:
+        batches = self.split_by_token_budget(docs, question)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(indexes: list[int]):
+            async with semaphore:
+                try:
+                    return (*await asyncio.wait_for(self._agrade_batch(docs, indexes, question), self.timeout), "missing verdict")
+                except asyncio.TimeoutError:
+                    return {}, self.timeout, 0, "timeout"
+                except Exception as e:
+                    return {}, None, 0, repr(e)
+
+        outcomes = await asyncio.gather(*(run(indexes) for indexes in batches))
+        return self._collect_batches(docs, batches, outcomes)
+
+
+class GenerationGrader:
+    """
+    Grade a generation: "not supported" when it is not grounded in its context,
+    otherwise "useful" or "not useful" depending on whether it answers the question.
+
+    In "sequential" mode the answer grader only runs after the hallucination grader
+    said the generation is grounded. In "parallel" mode both graders run at the same
+    time and the grade is returned as soon as it is known: an ungrounded generation
+    does not wait for the answer grader, which is cancelled if it has not started
+    yet and discarded otherwise.
+    """
+
+    def __init__(self, hallucination_grader_chain, answer_grader_chain, mode: str = "parallel"):
+        if mode not in GENERATION_GRADING_MODES:
+            raise ValueError(f"Unknown generation grading mode '{mode}', expected one of {GENERATION_GRADING_MODES}")
+
+        self.hallucination_grader_chain = hallucination_grader_chain
+        self.answer_grader_chain = answer_grader_chain
+        self.mode = mode
+
+    def _is_grounded(self, context: str, generation: str) -> bool:
+        score = self.hallucination_grader_chain.invoke({"documents": context, "generation": generation})
+        return score.binary_score.strip().lower() == "yes"
+
+    def _is_useful(self, question: str, generation: str) -> bool:
+        score = self.answer_grader_chain.invoke({"question": question, "generation": generation})
+        return score.binary_score.strip().lower() == "yes"
+
+    async def _ais_grounded(self, context: str, generation: str) -> bool:
+        score = await self.hallucination_grader_chain.ainvoke({"documents": context, "generation": generation})
+        return score.binary_score.strip().lower() == "yes"
+
+    async def _ais_useful(self, question: str, generation: str) -> bool:
+        score = await self.answer_grader_chain.ainvoke({"question": question, "generation": generation})
+        return score.binary_score.strip().lower() == "yes"
+
+    def grade(self, context: str, question: str, generation: str) -> tuple[str, dict]:
+        """
+        Grade the generation.
+
+        Args:
+            context: the documents the generation was given.
+            question: the question it answers.
+            generation: the generated answer.
+
+        Returns:
+            The grade and a report with the LLM calls made and the grading time.
+        """
+        start = time.perf_counter()
+
+        if self.mode == "sequential":
+            llm_calls = 1
+            grade = "not supported"
+            if self._is_grounded(context, generation):
+                llm_calls += 1
+                grade = "useful" if self._is_useful(question, generation) else "not useful"
+        else:
+            executor = ContextThreadPoolExecutor(max_workers=2)
+            try:
+                grounded = executor.submit(self._is_grounded, context, generation)
+                useful = executor.submit(self._is_useful, question, generation)
+
+                # Only "not grounded" settles the grade on its own.
+                if not grounded.result():
+                    grade = "not supported"
+                    llm_calls = 1 if useful.cancel() else 2
+                else:
+                    grade = "useful" if useful.result() else "not useful"
+                    llm_calls = 2
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        return grade, self._report(grade, llm_calls, start)
+
+    async def agrade(self, context: str, question: str, generation: str) -> tuple[str, dict]:
+        """Async version of `grade`; in "parallel" mode the answer grader request is really cancelled."""
+        start = time.perf_counter()
+
+        if self.mode == "sequential":
+            llm_calls = 1
+            grade = "not supported"
+            if await self._ais_grounded(context, generation):
+                llm_calls += 1
+                grade = "useful" if await self._ais_useful(question, generation) else "not useful"
+        else:
+            grounded = asyncio.create_task(self._ais_grounded(context, generation))
+            useful = asyncio.create_task(self._ais_useful(question, generation))
+            try:
+                if not await grounded:
+                    grade, llm_calls = "not supported", 2
+                else:
+                    grade, llm_calls = ("useful" if await useful else "not useful"), 2
+            finally:
+                useful.cancel()
+
+        return grade, self._report(grade, llm_calls, start)
+
+    def _report(self, grade: str, llm_calls: int, start: float) -> dict:
+        report = {"mode": self.mode, "grade": grade, "llm_calls": llm_calls, "total_time": time.perf_counter() - start}
+        logger.info(f"Generation graded {grade} in {report['total_time']:.2f}s with {llm_calls} calls")
+        return report
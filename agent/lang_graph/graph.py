@@ -1,62 +1,190 @@
 from langgraph.graph import END, StateGraph, START
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.utils import accepts_config
 from agent.lang_graph.states import GraphState
 from agent.lang_graph.nodes import AdaptiveRAGNodes
 from agent.lang_graph.edges import AdaptiveRAGEdges
+from agent.lang_graph.telemetry import Telemetry
+from agent.lang_graph import resources
+
+def runnable(func, afunc=None, telemetry: Telemetry | None = None, kind: str = "node") -> RunnableLambda:
+    """
+    Wrap a node or an edge so the graph runs `func` under invoke/stream and `afunc`
+    under ainvoke/astream. Without `afunc` the step is CPU-only and runs inline on
+    the event loop instead of being sent to a thread. With an enabled `telemetry`
+    every call is recorded as a step of its run.
+    """
+    step = func
+    if afunc is None:
+        pass_config = accepts_config(step)
+
+        async def afunc(state, config: RunnableConfig):
+            return step(state, config) if pass_config else step(state)
+
+    if telemetry is not None and telemetry.enabled:
+        func, afunc = telemetry.instrument(step, afunc, kind)
+
+    return RunnableLambda(func, afunc=afunc, name=step.__name__)
+
 
 class AdaptiveRAGGraph:
-    def __init__(self):
-        self.nodes = AdaptiveRAGNodes()
+    def __init__(
+        self,
+        checkpointer: BaseCheckpointSaver | None = None,
+        telemetry: Telemetry | None = None,
+        **node_options,
+    ):
+        self.nodes = AdaptiveRAGNodes(**node_options)
         self.edges = AdaptiveRAGEdges()
+        # Off unless TELEMETRY_SINKS is set or the server enabled it, see resources.telemetry().
+        self.telemetry = telemetry if telemetry is not None else resources.telemetry()
 
         self.Graph = StateGraph(GraphState)
 
         self.Graph = self.setup_nodes(self.Graph)
         self.Graph = self.setup_edges(self.Graph)
 
-        self.agent = self.Graph.compile(checkpointer=MemorySaver())
+        # Durable and bounded by default, see resources.checkpointer().
+        self.agent = self.Graph.compile(checkpointer=checkpointer if checkpointer is not None else resources.checkpointer())
+        if self.telemetry.enabled:
+            self.agent = self.agent.with_config(callbacks=[self.telemetry.callbacks])
+
+    def node(self, func, afunc=None) -> RunnableLambda:
+        return runnable(func, afunc, self.telemetry, "node")
+
+    def edge(self, func, afunc=None) -> RunnableLambda:
+        return runnable(func, afunc, self.telemetry, "edge")
 
     def setup_nodes(self, graph: StateGraph) -> StateGraph:
-        graph.add_node("web_search", self.nodes.web_search)
-        graph.add_node("retrieve_documents", self.nodes.retrieve_documents)
-        graph.add_node("grade_documents", self.nodes.grade_documents)
-        graph.add_node("generate", self.nodes.generate)
-        graph.add_node("grade_generation", self.nodes.grade_generation)
-        graph.add_node("rewrite_query", self.nodes.rewrite_query)
+        graph.add_node("init_budget", self.node(self.nodes.init_budget))
+        graph.add_node("web_search", self.node(self.nodes.web_search, self.nodes.aweb_search))
+        graph.add_node("retrieve_documents", self.node(self.nodes.retrieve_documents, self.nodes.aretrieve_documents))
+        graph.add_node("grade_documents", self.node(self.nodes.grade_documents, self.nodes.agrade_documents))
+        graph.add_node("generate", self.node(self.nodes.generate, self.nodes.agenerate))
+        graph.add_node("grade_generation", self.node(self.nodes.grade_generation, self.nodes.agrade_generation))
+        graph.add_node("rewrite_query", self.node(self.nodes.rewrite_query, self.nodes.arewrite_query))
+
+        if self.nodes.memory is not None:
+            graph.add_node("update_memory", self.node(self.nodes.update_memory, self.nodes.aupdate_memory))
+
+        if self.nodes.reranker is not None:
+            graph.add_node("rerank_documents", self.node(self.nodes.rerank_documents))
+
+        if self.nodes.speculative_routing:
+            graph.add_node("speculate_route", self.node(self.nodes.speculate_route, self.nodes.aspeculate_route))
+
+        if self.nodes.answer_cache is not None:
+            graph.add_node("lookup_cache", self.node(self.nodes.lookup_cache, self.nodes.alookup_cache))
+            graph.add_node("update_cache", self.node(self.nodes.update_cache, self.nodes.aupdate_cache))
 
         return graph
     
     def setup_edges(self, graph: StateGraph) -> StateGraph:
-        
-        graph.add_conditional_edges(
-            START,
-            self.edges.route_question,
-            {
-                "web_search": "web_search",
-                "vectorstore": "retrieve_documents",
-            },
-        )
+        use_cache = self.nodes.answer_cache is not None
+        # Retrieved documents go through the rerank stage, when enabled, before grading.
+        after_retrieval = "rerank_documents" if self.nodes.reranker is not None else "grade_documents"
+
+        graph.add_edge(START, "init_budget")
+        # The run starts once the conversation memory, when enabled, is up to date.
+        entry = "init_budget"
+        if self.nodes.memory is not None:
+            graph.add_edge("init_budget", "update_memory")
+            entry = "update_memory"
+
+        if self.nodes.speculative_routing:
+            if use_cache:
+                graph.add_edge(entry, "lookup_cache")
+                graph.add_conditional_edges(
+                    "lookup_cache",
+                    self.edge(self.edges.is_cache_hit),
+                    {
+                        "cache_hit": END,
+                        "cache_miss": "speculate_route",
+                    },
+                )
+            else:
+                graph.add_edge(entry, "speculate_route")
+            graph.add_conditional_edges(
+                "speculate_route",
+                self.edge(self.edges.route_speculated),
+                {
+                    "web_search": "web_search",
+                    "vectorstore": "retrieve_documents",
+                    "generate": "generate",
+                    "grade_documents": after_retrieval,
+                },
+            )
+        elif use_cache:
+            graph.add_edge(entry, "lookup_cache")
+            graph.add_conditional_edges(
+                "lookup_cache",
+                self.edge(self.edges.route_after_cache_lookup, self.edges.aroute_after_cache_lookup),
+                {
+                    "cache_hit": END,
+                    "web_search": "web_search",
+                    "vectorstore": "retrieve_documents",
+                },
+            )
+        else:
+            graph.add_conditional_edges(
+                entry,
+                self.edge(self.edges.route_question, self.edges.aroute_question),
+                {
+                    "web_search": "web_search",
+                    "vectorstore": "retrieve_documents",
+                },
+            )
 
         graph.add_edge("web_search", "generate")
-        graph.add_edge("retrieve_documents", "grade_documents")
+        graph.add_edge("retrieve_documents", after_retrieval)
+        if self.nodes.reranker is not None:
+            graph.add_edge("rerank_documents", "grade_documents")
 
         graph.add_conditional_edges(
             "grade_documents",
-            self.edges.decide_to_generate,
+            self.edge(self.edges.decide_to_generate),
             {
                 "rewrite_query": "rewrite_query",
                 "generate": "generate",
+                "web_search": "web_search",
             },
         )
         graph.add_edge("rewrite_query", "retrieve_documents")
         graph.add_conditional_edges(
             "generate",
-            self.nodes.grade_generation,
+            self.edge(self.edges.decide_to_grade_generation),
+            {
+                "grade_generation": "grade_generation",
+                "end": END,
+            },
+        )
+        graph.add_conditional_edges(
+            "grade_generation",
+            self.edge(self.edges.decide_after_grading),
             {
                 "not supported": "generate",
-                "useful": END,
+                "useful": "update_cache" if use_cache else END,
                 "not useful": "rewrite_query",
+                "end": END,
             },
         )
 
+        if use_cache:
+            graph.add_edge("update_cache", END)
+
         return graph
+
+
+def get_agent(name: str = "default", warm_up: bool = False, **node_options):
+    """
+    Return the process-wide compiled agent registered under `name`, building it on
+    first use. Every caller (e.g. every Streamlit session and rerun) gets the same
+    compiled graph; `node_options` and `warm_up` only apply to the first build.
+    """
+    def build():
+        if warm_up:
+            resources.warm_up()
+        return AdaptiveRAGGraph(**node_options).agent
+
+    return resources.shared(f"agent:{name}", build)
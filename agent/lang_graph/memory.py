@@ -0,0 +1,108 @@
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from agent.lang_graph.tokens import count_tokens
+
+# Tokens a chat message costs on top of its text (role and separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def message_text(message: BaseMessage) -> str:
+    """Text of a message, without thinking (or any other non-text) blocks."""
+    if isinstance(message.content, str):
+        return message.content
+
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in message.content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def strip_thinking(message: BaseMessage) -> BaseMessage:
+    """Drop the thinking blocks of an earlier answer, keeping its text."""
+    if isinstance(message, AIMessage) and not isinstance(message.content, str):
+        return AIMessage(content=message_text(message), id=message.id)
+    return message
+
+
+class ConversationMemory:
+    """
+    Token-budgeted view of a conversation for the generator.
+
+    The most recent turns (a user message and the answers that follow it) are kept
+    verbatim, without their thinking blocks, within `max_tokens`; the current turn
+    is always kept. Older turns are left out of the view and folded into a rolling
+    summary, but only once they add up to `summary_batch_tokens`, so the summary is
+    refreshed by one LLM call every few turns instead of every turn, and never
+    recomputed from scratch: the turns already folded are not sent again. Until
+    then the generator sees neither their text nor their summary.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        summary_batch_tokens: int = 1000,
+        max_summary_tokens: int = 400,
+        model: str = "gpt-4o-mini",
+    ):
+        self.max_tokens = max_tokens
+        self.summary_batch_tokens = summary_batch_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.model = model
+
+    def tokens(self, messages: list[BaseMessage]) -> int:
+        return sum(count_tokens(message_text(m), self.model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    @staticmethod
+    def turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+        """Group messages into turns, each starting with a user message."""
+        turns: list[list[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, HumanMessage) or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def recent(self, turns: list[list[BaseMessage]]) -> int:
+        """Number of most recent turns that fit `max_tokens`, at least the current one."""
+        kept, used = 0, 0
+        for turn in reversed(turns):
+            tokens = self.tokens(turn)
+            if kept and used + tokens > self.max_tokens:
+                break
+            kept += 1
+            used += tokens
+        return kept
+
+    def to_summarize(self, messages: list[BaseMessage], summarized: int) -> list[BaseMessage]:
+        """
+        The oldest unsummarized messages that no longer fit the budget, once they are
+        worth a summary call; empty otherwise.
+
+        Args:
+            messages: every message of the thread.
+            summarized: number of leading messages already folded into the summary.
+        """
+        turns = self.turns([strip_thinking(m) for m in messages[summarized:]])
+        kept = self.recent(turns)
+
+        overflow = [message for turn in turns[:len(turns) - kept] for message in turn]
+        if self.tokens(overflow) < self.summary_batch_tokens:
+            return []
+        return overflow
+
+    def view(self, messages: list[BaseMessage], summarized: int) -> list[BaseMessage]:
+        """
+        Most recent turns of the thread within `max_tokens` (the current one always),
+        without the thinking of earlier answers.
+
+        Args:
+            messages: every message of the thread.
+            summarized: number of leading messages already folded into the summary.
+        """
+        turns = self.turns([strip_thinking(m) for m in messages[summarized:]])
+        return [message for turn in turns[len(turns) - self.recent(turns):] for message in turn]
+
+    def format(self, messages: list[BaseMessage]) -> str:
+        """Transcript of the turns to summarize."""
+        roles = {"human": "User", "ai": "Assistant"}
+        return "\n\n".join(f"{roles.get(m.type, m.type)}: {message_text(m)}" for m in messages)
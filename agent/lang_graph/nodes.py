@@ -1,51 +1,347 @@
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain_anthropic import ChatAnthropic
-from dotenv import load_dotenv
-from pinecone import Pinecone
-from pathlib import Path
+import logging
 from langchain_core.documents import Document
-from langchain_core.messages import SystemMessage
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
 from agent.lang_graph.states import GraphState
-from agent.lang_graph.chains import (
-    question_rewriter_chain, answer_grader_chain, 
-    document_grader_chain, hallucination_grader_chain
-)
-from agent.lang_graph.prompts import RAG_SYSTEM_PROMPT
+from agent.lang_graph import resources
+from agent.lang_graph import chains
+from agent.lang_graph.prompts import RAG_SYSTEM_PROMPT, CONVERSATION_SUMMARY_SECTION
+from agent.lang_graph.grading import DocumentGrader, GenerationGrader, GRADING_MODES, GENERATION_GRADING_MODES
+from agent.lang_graph.semantic_cache import SemanticAnswerCache
+from agent.lang_graph.verdict_cache import GradeVerdictCache
+from agent.lang_graph.speculation import SpeculativeRouter
+from agent.lang_graph.rerank import CandidateReranker
+from agent.lang_graph.context import ContextPacker
+from agent.lang_graph.memory import ConversationMemory
+from agent.lang_graph import budget as budgets
+from agent.lang_graph.tokens import truncate_to_tokens
+from langchain_core.runnables import RunnableConfig
 
-import os
+logger = logging.getLogger(__name__)
 
-root_dir = Path().absolute()
+class AdaptiveRAGNodes:
+    def __init__(
+        self,
+        grading_mode: str = "concurrent",
+        max_grading_concurrency: int = 8,
+        grading_timeout: float = 15.0,
+        default_grading_verdict: str = "yes",
+        max_grading_batch_tokens: int = 8000,
+        answer_cache: SemanticAnswerCache | None = None,
+        verdict_cache: GradeVerdictCache | None = None,
+        deadline_seconds: float = 60.0,
+        max_rewrites: int = 2,
+        max_regenerations: int = 2,
+        max_llm_calls: int = 40,
+        speculative_routing: bool = False,
+        speculative_web_search_after: float | None = 1.0,
+        rerank: bool = True,
+        rerank_top_n: int = 8,
+        rerank_min_score: float = 0.0,
+        rerank_confident_score: float | None = 0.9,
+        rerank_duplicate_threshold: float = 0.9,
+        max_context_tokens: int = 6000,
+        generation_grading_mode: str = "parallel",
+        max_history_tokens: int | None = 3000,
+        history_summary_batch_tokens: int = 1000,
+    ):
+        # --- Document Grading (grader built on first use) ---
+        if grading_mode not in GRADING_MODES:
+            raise ValueError(f"Unknown grading mode '{grading_mode}', expected one of {GRADING_MODES}")
+        self.grading_options = {
+            "mode": grading_mode,
+            "max_concurrency": max_grading_concurrency,
+            "timeout": grading_timeout,
+            "default_verdict": default_grading_verdict,
+            "max_batch_tokens": max_grading_batch_tokens,
+            "verdict_cache": verdict_cache,
+        }
+        self._document_grader = None
 
-load_dotenv(dotenv_path=root_dir / ".env")
+        # --- Generation Grading (grader built on first use) ---
+        if generation_grading_mode not in GENERATION_GRADING_MODES:
+            raise ValueError(
+                f"Unknown generation grading mode '{generation_grading_mode}', expected one of {GENERATION_GRADING_MODES}"
+            )
+        self.generation_grading_mode = generation_grading_mode
+        self._generation_grader = None
 
-class AdaptiveRAGNodes:
-    def __init__(self):
-        # --- Pinecone Setup ---
-        self.pc = Pinecone()
-        self.index = self.pc.Index("web-ai-engineer-index")
-        self.embedding_model = OpenAIEmbeddings(
-            model="text-embedding-3-large",
-            openai_api_key=os.environ.get("OPENAI_API_KEY")
-        )
-        self.vector_store = PineconeVectorStore(index=self.index, embedding=self.embedding_model)
+        # --- Semantic Answer Cache ---
+        self.answer_cache = answer_cache
 
-        # --- Web and Vectorstore Retrievers ---
-        self.web_search_tool = TavilySearchResults(k=3)
-        self.retriever = self.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 15}
-        )
+        # --- Per-run Budget ---
+        self.budget_options = {
+            "deadline_seconds": deadline_seconds,
+            "max_rewrites": max_rewrites,
+            "max_regenerations": max_regenerations,
+            "max_llm_calls": max_llm_calls,
+        }
 
-        # --- Anthropic LLM Setup with thinking mode enabled ---
-        self.generator = ChatAnthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
-            model="claude-3-7-sonnet-latest",
-            temperature=1,
-            max_tokens=2048,
-            thinking={"type": "enabled", "budget_tokens": 1024}
-        )
+        # --- Speculative Routing (router built on first use) ---
+        self.speculative_routing = speculative_routing
+        self.speculative_web_search_after = speculative_web_search_after
+        self._speculative_router = None
+
+        # --- Pre-grading Rerank ---
+        self.reranker = None
+        if rerank:
+            self.reranker = CandidateReranker(
+                top_n=rerank_top_n,
+                min_score=rerank_min_score,
+                confident_score=rerank_confident_score,
+                duplicate_threshold=rerank_duplicate_threshold,
+            )
+
+        # --- Context Packing (generation and hallucination grading) ---
+        self.context_packer = ContextPacker(max_tokens=max_context_tokens)
+
+        # --- Conversation Memory (None sends the whole thread to the generator) ---
+        self.memory = None
+        if max_history_tokens is not None:
+            self.memory = ConversationMemory(
+                max_tokens=max_history_tokens,
+                summary_batch_tokens=history_summary_batch_tokens,
+            )
+
+    # --- Shared clients (built once per process on first use, see resources.py) ---
+    @property
+    def embedding_model(self):
+        return resources.embedding_model()
+
+    @property
+    def vector_store(self):
+        return resources.vector_store()
+
+    @property
+    def web_search_tool(self):
+        return resources.web_search_tool()
+
+    @property
+    def retriever(self):
+        return resources.retriever()
+
+    @property
+    def generator(self):
+        return resources.generator()
+
+    @property
+    def document_grader(self) -> DocumentGrader:
+        if self._document_grader is None:
+            listwise = self.grading_options["mode"] == "listwise"
+            self._document_grader = DocumentGrader(
+                chains.document_grader_chain(),
+                batch_grader_chain=chains.batch_document_grader_chain() if listwise else None,
+                **self.grading_options,
+            )
+
+        return self._document_grader
+
+    @property
+    def generation_grader(self) -> GenerationGrader:
+        if self._generation_grader is None:
+            self._generation_grader = GenerationGrader(
+                chains.hallucination_grader_chain(),
+                chains.answer_grader_chain(),
+                mode=self.generation_grading_mode,
+            )
+
+        return self._generation_grader
+
+    @property
+    def speculative_router(self) -> SpeculativeRouter:
+        if self._speculative_router is None:
+            self._speculative_router = SpeculativeRouter(
+                lambda question: chains.query_router_chain().invoke({"question": question}).datasource,
+                self.retriever.invoke,
+                self.search_web,
+                web_search_after=self.speculative_web_search_after,
+                arouter=self.aroute_datasource,
+                aretrieve=self.retriever.ainvoke,
+                asearch=self.asearch_web,
+            )
+
+        return self._speculative_router
+
+    async def aroute_datasource(self, question: str) -> str:
+        """Datasource picked by the router for the question."""
+        route = await chains.query_router_chain().ainvoke({"question": question})
+        return route.datasource
+
+    def user_question(self, state: GraphState) -> str:
+        """Content of the last user message of the thread."""
+        return next(msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)).content
+
+    def spend_routing(self, budget: dict) -> dict:
+        """The router LLM call is accounted by the first node that runs after it."""
+        if budget["routed"]:
+            return budget
+        return budgets.spend({**budget, "routed": True}, llm_calls=1)
+
+    def init_budget(self, state: GraphState) -> GraphState:
+        """
+        Start a run: reset the question and documents of the previous turn and give
+        the run a fresh budget (deadline, rewrites, regenerations and LLM calls).
+
+        Args:
+            state: GraphState with current state (only user question).
+
+        Returns:
+            GraphState with question, empty documents and budget
+        """
+        budget = budgets.new_budget(**self.budget_options)
+        return {"question": self.user_question(state), "documents": [], "budget": budget}
+
+    def update_memory(self, state: GraphState) -> GraphState:
+        """
+        Fold the oldest turns that no longer fit the history budget into the
+        rolling conversation summary.
+
+        Args:
+            state: GraphState with current state (messages, summary and budget).
+
+        Returns:
+            GraphState with the updated summary and number of summarized messages,
+            unchanged while the older turns are not worth a summary call
+        """
+        summarized = state.get("summarized_messages", 0)
+        overflow = self.memory.to_summarize(state["messages"], summarized)
+        if not overflow:
+            return {}
+
+        logger.info(f"Summarizing {len(overflow)} earlier messages")
+        summary = chains.conversation_summary_chain().invoke(self.summary_input(state, overflow))
+        return self.memory_result(state, summary, summarized + len(overflow))
+
+    async def aupdate_memory(self, state: GraphState) -> GraphState:
+        """Async version of `update_memory`."""
+        summarized = state.get("summarized_messages", 0)
+        overflow = self.memory.to_summarize(state["messages"], summarized)
+        if not overflow:
+            return {}
+
+        logger.info(f"Summarizing {len(overflow)} earlier messages")
+        summary = await chains.conversation_summary_chain().ainvoke(self.summary_input(state, overflow))
+        return self.memory_result(state, summary, summarized + len(overflow))
+
+    def summary_input(self, state: GraphState, overflow: list) -> dict:
+        return {
+            "summary": state.get("summary") or "(empty)",
+            "conversation": self.memory.format(overflow),
+            "max_words": int(self.memory.max_summary_tokens * 0.75),
+        }
+
+    def memory_result(self, state: GraphState, summary: str, summarized: int) -> GraphState:
+        return {
+            "summary": truncate_to_tokens(summary, self.memory.max_summary_tokens),
+            "summarized_messages": summarized,
+            "budget": budgets.spend(state["budget"], llm_calls=1),
+        }
+
+    def is_cacheable(self, state: GraphState) -> bool:
+        """
+        Only the first turn of a thread is cached: follow-up questions depend on the
+        conversation history and cannot be answered from another thread's answer.
+        """
+        if self.answer_cache is None:
+            return False
+        if self.answer_cache.embedding_model is None:
+            self.answer_cache.embedding_model = self.embedding_model
+
+        human_turns = [msg for msg in state["messages"] if isinstance(msg, HumanMessage)]
+        return len(human_turns) == 1
+
+    def lookup_cache(self, state: GraphState) -> GraphState:
+        """
+        Answer from the semantic cache when a similar question was already answered.
+
+        Args:
+            state: GraphState with current state (only user question).
+
+        Returns:
+            GraphState with the cached answer and documents on a hit, or the question on a miss
+        """
+        logger.info("Looking up answer cache")
+
+        question = state["messages"][-1].content
+        entry = self.answer_cache.lookup(question) if self.is_cacheable(state) else None
+        return self.cache_lookup_result(question, entry)
+
+    async def alookup_cache(self, state: GraphState) -> GraphState:
+        """Async version of `lookup_cache`."""
+        logger.info("Looking up answer cache")
+
+        question = state["messages"][-1].content
+        entry = await self.answer_cache.alookup(question) if self.is_cacheable(state) else None
+        return self.cache_lookup_result(question, entry)
+
+    def cache_lookup_result(self, question: str, entry: dict | None) -> GraphState:
+        if entry is None:
+            return {"question": question, "cache_hit": False}
+
+        logger.info(f"Cache hit (similarity {entry['similarity']:.3f}, route {entry['route']})")
+        return {
+            "messages": [AIMessage(content=entry["answer"])],
+            "documents": entry["documents"],
+            "question": question,
+            "cache_hit": True,
+        }
+
+    def update_cache(self, state: GraphState) -> GraphState:
+        """
+        Store a generation that passed both graders in the semantic cache.
+
+        Args:
+            state: GraphState with current state (documents and graded answer).
+        """
+        logger.info("Updating answer cache")
+
+        if self.is_cacheable(state):
+            question = next(msg for msg in state["messages"] if isinstance(msg, HumanMessage)).content
+            self.answer_cache.store(question, state["messages"][-1].content, state["documents"])
+
+        return {"cache_hit": False}
+
+    async def aupdate_cache(self, state: GraphState) -> GraphState:
+        """Async version of `update_cache`."""
+        logger.info("Updating answer cache")
+
+        if self.is_cacheable(state):
+            question = next(msg for msg in state["messages"] if isinstance(msg, HumanMessage)).content
+            await self.answer_cache.astore(question, state["messages"][-1].content, state["documents"])
+
+        return {"cache_hit": False}
+
+    def speculate_route(self, state: GraphState) -> GraphState:
+        """
+        Route the user question while retrieval (and, when the router is slow, web
+        search) already runs, and keep the documents of the picked route.
+
+        Args:
+            state: GraphState with current state (only user question).
+
+        Returns:
+            GraphState with the route and its documents, None when the route was not
+            speculated and still has to run (an empty list is a speculated route that
+            found nothing)
+        """
+        logger.info("Routing question speculatively")
+
+        route, docs, _ = self.speculative_router.route(self.user_question(state))
+        return {
+            "route": route,
+            "documents": docs,
+            "budget": self.spend_routing(state["budget"]),
+        }
+
+    async def aspeculate_route(self, state: GraphState) -> GraphState:
+        """Async version of `speculate_route`: the discarded branch is cancelled."""
+        logger.info("Routing question speculatively")
+
+        route, docs, _ = await self.speculative_router.aroute(self.user_question(state))
+        return {
+            "route": route,
+            "documents": docs,
+            "budget": self.spend_routing(state["budget"]),
+        }
 
     def retrieve_documents(self, state: GraphState) -> GraphState:
         """
@@ -57,57 +353,147 @@ class AdaptiveRAGNodes:
         Returns:
             GraphState with documents and question
         """
-        print(f"--- Retrieving documents ---")
+        logger.info("Retrieving documents")
 
-        question = state["messages"][-1].content
+        question = state["question"]
         docs = self.retriever.invoke(question)
 
-        return {"documents": docs, "question": question, "messages": state["messages"]}
-    
-    def format_docs(self, docs: list[Document]) -> str:
-        return "\n\n".join(doc.page_content for doc in docs)
+        return {
+            "documents": docs,
+            "question": question,
+            "messages": state["messages"],
+            "budget": self.spend_routing(state["budget"]),
+        }
+
+    async def aretrieve_documents(self, state: GraphState) -> GraphState:
+        """Async version of `retrieve_documents`."""
+        logger.info("Retrieving documents")
+
+        question = state["question"]
+        docs = await self.retriever.ainvoke(question)
+
+        return {
+            "documents": docs,
+            "question": question,
+            "messages": state["messages"],
+            "budget": self.spend_routing(state["budget"]),
+        }
     
+    def rerank_documents(self, state: GraphState) -> GraphState:
+        """
+        Rerank the retrieved documents without an LLM: drop near-duplicates and weak
+        candidates, and let very confident hits skip grading.
+
+        Args:
+            state: GraphState with current state (documents and question).
+
+        Returns:
+            GraphState with the documents to grade, the confident documents and the rerank report
+        """
+        logger.info("Reranking documents")
+        to_grade, confident, rerank_report = self.reranker.rerank(state["documents"], state["question"])
+
+        return {
+            "documents": to_grade,
+            "confident_documents": confident,
+            "rerank_report": rerank_report,
+        }
+
     def generate(self, state: GraphState) -> GraphState:
         """
-        Generate an answer to the user question, using the documents and the question.
+        Generate an answer to the user question, using the documents packed into a
+        token-budgeted context and the question.
         
         Args:
             state: GraphState with current state (documents and question).
 
         Returns:
-            GraphState with answer
+            GraphState with answer and the context it was generated from
         """
-        print(f"--- Generating answer ---")
+        logger.info("Generating answer")
 
+        context, messages = self.generation_prompt(state)
+        return self.generation_result(state, context, self.generator.invoke(messages))
+
+    async def agenerate(self, state: GraphState) -> GraphState:
+        """Async version of `generate`."""
+        logger.info("Generating answer")
+
+        context, messages = self.generation_prompt(state)
+        return self.generation_result(state, context, await self.generator.ainvoke(messages))
+
+    def generation_prompt(self, state: GraphState) -> tuple[str, list]:
+        """Packed context and the messages sent to the generator."""
+        context, _ = self.context_packer.pack(state["documents"])
         sys_msg_with_docs = RAG_SYSTEM_PROMPT.format(
-            documents=self.format_docs(state["documents"])
+            documents=context
         )
 
+        messages = state["messages"]
+        if self.memory is not None:
+            # Recent turns without earlier thinking blocks, older ones as a summary.
+            messages = self.memory.view(messages, state.get("summarized_messages", 0))
+            if state.get("summary"):
+                sys_msg_with_docs += CONVERSATION_SUMMARY_SECTION.format(summary=state["summary"])
+
         sys_msg = SystemMessage(
             content=sys_msg_with_docs
         )
 
-        return {"documents": state["documents"], "messages": [self.generator.invoke([sys_msg] + state["messages"])], "question": state["question"]}
+        return context, [sys_msg] + messages
 
-    def grade_documents(self, state: GraphState) -> GraphState:
+    def generation_result(self, state: GraphState, context: str, answer: AIMessage) -> GraphState:
+        return {
+            "documents": state["documents"],
+            "messages": [answer],
+            "question": state["question"],
+            "context": context,
+            "budget": budgets.spend(state["budget"], llm_calls=1, generations=1),
+        }
+
+    def grade_documents(self, state: GraphState, config: RunnableConfig) -> GraphState:
         """
         Grade the documents based on the user question.
         
         Args:
-            state: GraphState with current state (documents and question).
+            state: GraphState with current state (documents, confident documents and question).
+            config: run config, its thread_id scopes memoized grading verdicts.
 
         Returns:
-            GraphState with documents and question
+            GraphState with relevant documents, question and the grading report
         """
 
-        print(f"--- Grading documents ---")
-        filtered_docs = []
-        for doc in state["documents"]:
-            isRelevant = document_grader_chain.invoke({"document": self.format_docs([doc]), "question": state["question"]})
-            if isRelevant.binary_score == "yes":
-                filtered_docs.append(doc)
+        logger.info("Grading documents")
+        thread_id = config.get("configurable", {}).get("thread_id")
+        filtered_docs, grading_report = self.document_grader.grade(
+            state["documents"], state["question"], thread_id=thread_id
+        )
+        return self.grading_result(state, filtered_docs, grading_report)
+
+    async def agrade_documents(self, state: GraphState, config: RunnableConfig) -> GraphState:
+        """Async version of `grade_documents`: the graders run on the event loop."""
+        logger.info("Grading documents")
+        thread_id = config.get("configurable", {}).get("thread_id")
+        filtered_docs, grading_report = await self.document_grader.agrade(
+            state["documents"], state["question"], thread_id=thread_id
+        )
+        return self.grading_result(state, filtered_docs, grading_report)
+
+    def grading_result(self, state: GraphState, filtered_docs: list[Document], grading_report: dict) -> GraphState:
+        # Confident hits of the rerank stage are relevant without grading.
+        filtered_docs = state.get("confident_documents", []) + filtered_docs
+
+        budget = budgets.spend(state["budget"], llm_calls=grading_report["llm_calls"])
+        if not filtered_docs and not budgets.can_rewrite(budget):
+            budget = budgets.exhaust(budget, budgets.REWRITES)
 
-        return {"documents": filtered_docs, "question": state["question"], "messages": state["messages"]}
+        return {
+            "documents": filtered_docs,
+            "question": state["question"],
+            "messages": state["messages"],
+            "grading_report": grading_report,
+            "budget": budget,
+        }
 
     def rewrite_query(self, state: GraphState) -> GraphState:
         """
@@ -119,10 +505,37 @@ class AdaptiveRAGNodes:
         Returns:
             GraphState with better question
         """
-        print(f"--- Rewriting query ---")
-        better_query = question_rewriter_chain.invoke({"question": state["question"]})
-        return {"question": better_query, "documents": state["documents"], "messages": state["messages"]}
+        logger.info("Rewriting query")
+        better_query = chains.question_rewriter_chain().invoke({"question": state["question"]})
+        return self.rewrite_result(state, better_query)
+
+    async def arewrite_query(self, state: GraphState) -> GraphState:
+        """Async version of `rewrite_query`."""
+        logger.info("Rewriting query")
+        better_query = await chains.question_rewriter_chain().ainvoke({"question": state["question"]})
+        return self.rewrite_result(state, better_query)
+
+    def rewrite_result(self, state: GraphState, better_query: str) -> GraphState:
+        return {
+            "question": better_query,
+            "documents": state["documents"],
+            "messages": state["messages"],
+            "budget": budgets.spend(state["budget"], llm_calls=1, rewrites=1),
+        }
     
+    def search_web(self, question: str) -> list[Document]:
+        """Search the web and join the results into a single document."""
+        return self.web_results(self.web_search_tool.invoke({"query": question}))
+
+    async def asearch_web(self, question: str) -> list[Document]:
+        """Async version of `search_web`."""
+        return self.web_results(await self.web_search_tool.ainvoke({"query": question}))
+
+    @staticmethod
+    def web_results(docs: list[dict]) -> list[Document]:
+        web_results = "\n".join([d["content"] for d in docs])
+        return [Document(page_content=web_results, metadata={"source": "web"})]
+
     def web_search(self, state: GraphState) -> GraphState:
         """
         Search the web for the user question.
@@ -130,45 +543,57 @@ class AdaptiveRAGNodes:
         Args:
             state: GraphState with current state (question).
         """
-        print(f"--- Searching web ---")
-        question = state["messages"][-1].content
-        docs = self.web_search_tool.invoke({"query": question})
+        logger.info("Searching web")
+        return {
+            "documents": self.search_web(self.user_question(state)),
+            "question": state["question"],
+            "messages": state["messages"],
+            "budget": self.spend_routing(state["budget"]),
+        }
 
-        web_results = "\n".join([d["content"] for d in docs])
-        web_results_doc = Document(page_content=web_results, metadata={"source": "web"})
-
-        return {"documents": [web_results_doc], "question": state["question"], "messages": state["messages"]}
+    async def aweb_search(self, state: GraphState) -> GraphState:
+        """Async version of `web_search`."""
+        logger.info("Searching web")
+        return {
+            "documents": await self.asearch_web(self.user_question(state)),
+            "question": state["question"],
+            "messages": state["messages"],
+            "budget": self.spend_routing(state["budget"]),
+        }
     
     def grade_generation(self, state: GraphState) -> GraphState:
         """
-        Grade the generation based on the user question.
+        Grade the generation based on the user question and on the context it was
+        generated from.
         
         Args:
-            state: GraphState with current state (question).
+            state: GraphState with current state (question and context).
+
+        Returns:
+            GraphState with the generation grade ("useful", "not useful" or "not supported")
         """
-        print(f"--- Grading generation ---")
-        is_grounded = hallucination_grader_chain.invoke(
-            {
-                "documents": self.format_docs(state["documents"]), 
-                "generation": state["messages"][-1].content
-            }
+        logger.info("Grading generation")
+        grade, report = self.generation_grader.grade(
+            state["context"], state["question"], state["messages"][-1].content
         )
+        return self.generation_grade_result(state, grade, report)
 
-        if is_grounded.binary_score == "yes":
-            isUseful = answer_grader_chain.invoke(
-                {
-                    "question": state["question"],
-                    "generation": state["messages"][-1].content
-                }
-            )
+    async def agrade_generation(self, state: GraphState) -> GraphState:
+        """Async version of `grade_generation`: both graders run on the event loop."""
+        logger.info("Grading generation")
+        grade, report = await self.generation_grader.agrade(
+            state["context"], state["question"], state["messages"][-1].content
+        )
+        return self.generation_grade_result(state, grade, report)
+
+    def generation_grade_result(self, state: GraphState, grade: str, report: dict) -> GraphState:
+        budget = budgets.spend(state["budget"], llm_calls=report["llm_calls"])
+        if grade == "not supported" and not budgets.can_regenerate(budget):
+            budget = budgets.exhaust(budget, budgets.REGENERATIONS)
+        elif grade == "not useful" and not budgets.can_rewrite(budget):
+            budget = budgets.exhaust(budget, budgets.REWRITES)
 
-            if isUseful.binary_score == "yes":
-                return "useful"
-            else:
-                return "not_useful"
-            
-        else:
-            return "not supported"
+        return {"generation_grade": grade, "budget": budget}
         
 if __name__ == "__main__":
     nodes = AdaptiveRAGNodes()
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import List, Literal
 from pydantic import BaseModel, Field
 
 class RouteQuery(BaseModel):
@@ -16,6 +16,23 @@ class GradeDocuments(BaseModel):
         description="Documents are relevant to the question, 'yes' or 'no'"
     )
 
+class DocumentVerdict(BaseModel):
+    """Binary relevance score for one document of a batch."""
+
+    document_id: int = Field(
+        description="Id of the graded document, exactly as given in the prompt"
+    )
+    binary_score: str = Field(
+        description="Document is relevant to the question, 'yes' or 'no'"
+    )
+
+class GradeDocumentsBatch(BaseModel):
+    """Binary scores for relevance check on a batch of retrieved documents."""
+
+    verdicts: List[DocumentVerdict] = Field(
+        description="One verdict for every document id in the prompt"
+    )
+
 class GradeHallucinations(BaseModel):
     """Binary score for hallucination present in generation answer."""
 
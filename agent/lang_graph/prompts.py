@@ -23,6 +23,17 @@ GRADING_PROMPT = ChatPromptTemplate.from_messages(
     ]
 )
 
+# --- Batch Document Grading ---
+BATCH_GRADING_SYSTEM_PROMPT = GRADING_SYSTEM_PROMPT + """ \n
+    You will receive several documents, each one wrapped in a <document id="..."> tag. \n
+    Grade every document independently and return one verdict per document id."""
+BATCH_GRADING_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", BATCH_GRADING_SYSTEM_PROMPT),
+        ("human", "Retrieved documents: \n\n {documents} \n\n User question: {question}"),
+    ]
+)
+
 # --- Hallucination Grading ---
 HALLUCINATION_SYSTEM_PROMPT = """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts. \n 
      Give a binary score 'yes' or 'no'. 'Yes' means that the answer is grounded in / supported by the set of facts."""
@@ -59,4 +70,18 @@ REWRITE_PROMPT = ChatPromptTemplate.from_messages(
 # --- RAG ---
 RAG_SYSTEM_PROMPT = """You are an expert at elaborating answers using retrieved documents from a vectorstore. \n
     You are given a user question and a set of documents. Answer the question using the following documents.
-    \n Documents: \n\n {documents}."""
\ No newline at end of file
+    \n Documents: \n\n {documents}."""
+# Appended to the RAG system prompt once older turns are summarized.
+CONVERSATION_SUMMARY_SECTION = """
+    \n Summary of the earlier conversation: \n\n {summary}"""
+
+# --- Conversation Memory ---
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a conversation between a user and an AI engineering assistant. \n
+    Update the current summary with the new turns: keep the user's goals, the facts and conclusions established and \n
+    any open questions, drop small talk and repetition. Answer with the updated summary only, in at most {max_words} words."""
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SUMMARY_SYSTEM_PROMPT),
+        ("human", "Current summary: \n\n {summary} \n\n New turns: \n\n {conversation}"),
+    ]
+)
@@ -0,0 +1,116 @@
+import logging
+from langchain_core.documents import Document
+from agent.vector_store.hybrid import RELEVANCE_SCORE
+from agent.vector_store.sparse_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def lexical_overlap(question: str, doc: Document) -> float:
+    """Fraction of the question's terms that appear in the document."""
+    question_terms = set(tokenize(question))
+    if not question_terms:
+        return 0.0
+
+    return len(question_terms & set(tokenize(doc.page_content))) / len(question_terms)
+
+
+def jaccard(terms: set[str], other_terms: set[str]) -> float:
+    if not terms and not other_terms:
+        return 1.0
+    return len(terms & other_terms) / len(terms | other_terms)
+
+
+class CandidateReranker:
+    """
+    Score retrieved documents without an LLM and pick the ones worth grading.
+
+    A document scores a weighted mix of its dense relevance score (from the vector
+    store, when the document came from the dense search) and its lexical overlap
+    with the question. Near-duplicates are collapsed onto their best-scored copy.
+    Documents with a dense score scoring `confident_score` or more skip LLM grading
+    (a keyword-only hit is always graded: matching the question's terms says little
+    about relevance), documents below `min_score` are dropped, and at most `top_n`
+    of the rest are sent to grading.
+    """
+
+    def __init__(
+        self,
+        top_n: int = 8,
+        min_score: float = 0.0,
+        confident_score: float | None = 0.9,
+        duplicate_threshold: float = 0.9,
+        similarity_weight: float = 0.7,
+        lexical_weight: float = 0.3,
+    ):
+        if top_n < 1:
+            raise ValueError("top_n must be at least 1")
+
+        self.top_n = top_n
+        self.min_score = min_score
+        self.confident_score = confident_score
+        self.duplicate_threshold = duplicate_threshold
+        self.similarity_weight = similarity_weight
+        self.lexical_weight = lexical_weight
+
+    def score(self, doc: Document, question: str) -> float:
+        lexical = lexical_overlap(question, doc)
+        similarity = doc.metadata.get(RELEVANCE_SCORE)
+        # Keyword-only hits (e.g. from the BM25 index) have no dense score.
+        if similarity is None:
+            return lexical
+
+        total = self.similarity_weight + self.lexical_weight
+        return (self.similarity_weight * similarity + self.lexical_weight * lexical) / total
+
+    def is_confident(self, doc: Document, score: float) -> bool:
+        return (
+            self.confident_score is not None
+            and doc.metadata.get(RELEVANCE_SCORE) is not None
+            and score >= self.confident_score
+        )
+
+    def rerank(self, docs: list[Document], question: str) -> tuple[list[Document], list[Document], dict]:
+        """
+        Rerank the retrieved documents.
+
+        Args:
+            docs: retrieved documents.
+            question: the question they were retrieved for.
+
+        Returns:
+            The documents to grade and the confident ones that skip grading (both best
+            first), and a report of the scores and of the grader calls avoided.
+        """
+        scores = [self.score(doc, question) for doc in docs]
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+
+        kept, kept_terms, duplicates = [], [], 0
+        for i in order:
+            terms = set(tokenize(docs[i].page_content))
+            if any(jaccard(terms, other) >= self.duplicate_threshold for other in kept_terms):
+                duplicates += 1
+                continue
+            kept.append(i)
+            kept_terms.append(terms)
+
+        confident = [i for i in kept if self.is_confident(docs[i], scores[i])]
+        candidates = [i for i in kept if i not in confident and scores[i] >= self.min_score]
+        to_grade = candidates[:self.top_n]
+
+        report = {
+            "scores": scores,
+            "candidates": len(docs),
+            "duplicates": duplicates,
+            "below_threshold": len(kept) - len(confident) - len(candidates),
+            "cut_by_top_n": len(candidates) - len(to_grade),
+            "confident": len(confident),
+            "sent_to_grading": len(to_grade),
+            "grader_calls_avoided": len(docs) - len(to_grade),
+        }
+        logger.info(
+            f"Reranked {len(docs)} documents: {len(to_grade)} to grade, {len(confident)} confident, "
+            f"{duplicates} duplicates, {report['grader_calls_avoided']} grader calls avoided"
+        )
+
+        return [docs[i] for i in to_grade], [docs[i] for i in confident], report
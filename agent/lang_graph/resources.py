@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+root_dir = Path().absolute()
+
+load_dotenv(dotenv_path=root_dir / ".env")
+
+# Process-wide registry: every client is built once per process and shared by the
+# nodes, the edges and every Streamlit session, whatever the number of reruns.
+_registry: dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def shared(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Return the process-wide resource registered under `name`, building it with
+    `factory` on first use.
+    """
+    resource = _registry.get(name)
+    if resource is None:
+        with _lock:
+            resource = _registry.get(name)
+            if resource is None:
+                resource = factory()
+                _registry[name] = resource
+
+    return resource
+
+
+def register(name: str, resource: Any) -> None:
+    """Register (or replace) a resource, e.g. to inject stand-ins for benchmarks."""
+    with _lock:
+        _registry[name] = resource
+
+
+def reset() -> None:
+    """Forget every resource; the next access builds them again."""
+    with _lock:
+        client = _registry.get("openai_http_client")
+        async_client = _registry.get("openai_async_http_client")
+        saver = _registry.get("checkpointer")
+        _registry.clear()
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        # Normally closed by its owner (aclose_openai_async_http_client) before.
+        try:
+            asyncio.get_running_loop().create_task(async_client.aclose())
+        except RuntimeError:
+            asyncio.run(async_client.aclose())
+    if hasattr(saver, "close"):
+        saver.close()
+
+
+def _openai_pool_options() -> dict:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "16")),
+            keepalive_expiry=60,
+        ),
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+    }
+
+
+def openai_http_client():
+    """Pooled keep-alive HTTP client shared by every OpenAI chat and embedding client."""
+    import httpx
+
+    return shared("openai_http_client", lambda: httpx.Client(**_openai_pool_options()))
+
+
+def openai_async_http_client():
+    """
+    Pooled keep-alive HTTP client of the async OpenAI calls (ainvoke/astream), or
+    None to let the SDK build its own. Its connections belong to the event loop
+    that opened them, so it only exists while a long-lived loop owns it (the API
+    server opens it in its lifespan, see `open_openai_async_http_client`).
+    """
+    return _registry.get("openai_async_http_client")
+
+
+def open_openai_async_http_client():
+    """
+    Open the pooled async client on the running event loop. Call it before the
+    first model is built, and `aclose_openai_async_http_client` on the same loop
+    once done.
+    """
+    import httpx
+
+    client = httpx.AsyncClient(**_openai_pool_options())
+    register("openai_async_http_client", client)
+    return client
+
+
+async def aclose_openai_async_http_client() -> None:
+    with _lock:
+        client = _registry.pop("openai_async_http_client", None)
+    if client is not None:
+        await client.aclose()
+
+
+def embedding_model():
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+        from agent.lang_graph.embedding_cache import CachedEmbeddings
+
+        return CachedEmbeddings(
+            OpenAIEmbeddings(
+                model="text-embedding-3-large",
+                openai_api_key=os.environ.get("OPENAI_API_KEY"),
+                http_client=openai_http_client(),
+                http_async_client=openai_async_http_client(),
+            )
+        )
+
+    return shared("embedding_model", build)
+
+
+def vector_store():
+    def build():
+        from agent.vector_store.backends import get_vector_store
+
+        return get_vector_store(embedding_model())
+
+    return shared("vector_store", build)
+
+
+def retriever():
+    def build():
+        from agent.vector_store.backends import get_sparse_index
+
+        # Hybrid (dense + BM25) retrieval when the ingestion built a sparse index,
+        # unless RETRIEVAL_MODE=dense.
+        from agent.vector_store.hybrid import DenseRetriever, HybridRetriever
+
+        sparse_index = get_sparse_index() if os.getenv("RETRIEVAL_MODE", "hybrid").lower() == "hybrid" else None
+        if sparse_index is None:
+            return DenseRetriever(vector_store=vector_store(), k=15)
+
+        k = int(os.getenv("HYBRID_K", "10"))
+        return HybridRetriever(
+            vector_store=vector_store(),
+            sparse_index=sparse_index,
+            k=k,
+            dense_k=2 * k,
+            sparse_k=2 * k,
+            dense_weight=float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0")),
+            sparse_weight=float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0")),
+            rrf_k=int(os.getenv("HYBRID_RRF_K", "60")),
+        )
+
+    return shared("retriever", build)
+
+
+def web_search_tool():
+    def build():
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        return TavilySearchResults(k=3)
+
+    return shared("web_search_tool", build)
+
+
+def generator():
+    def build():
+        from langchain_anthropic import ChatAnthropic
+
+        # --- Anthropic LLM Setup with thinking mode enabled ---
+        return ChatAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            model="claude-3-7-sonnet-latest",
+            temperature=1,
+            max_tokens=2048,
+            thinking={"type": "enabled", "budget_tokens": 1024}
+        )
+
+    return shared("generator", build)
+
+
+def checkpointer():
+    """
+    Checkpointer of the compiled graphs: a bounded SQLite file by default
+    (CHECKPOINTER_BACKEND=sqlite), or process memory (CHECKPOINTER_BACKEND=memory).
+    """
+    def build():
+        backend = os.getenv("CHECKPOINTER_BACKEND", "sqlite").lower()
+        if backend == "memory":
+            from langgraph.checkpoint.memory import MemorySaver
+
+            return MemorySaver()
+        if backend != "sqlite":
+            raise ValueError(f"Unknown checkpointer backend '{backend}', expected 'sqlite' or 'memory'")
+
+        from agent.lang_graph.checkpointer import SQLiteCheckpointer
+
+        ttl_days = float(os.getenv("CHECKPOINT_TTL_DAYS", "30"))
+        max_threads = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
+        return SQLiteCheckpointer(
+            os.getenv("CHECKPOINT_DB_PATH", str(root_dir / ".checkpoints" / "agent.sqlite")),
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "10")),
+            ttl_seconds=ttl_days * 24 * 3600 if ttl_days > 0 else None,
+            max_threads=max_threads if max_threads > 0 else None,
+            flush_interval=float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.5")),
+        )
+
+    return shared("checkpointer", build)
+
+
+def telemetry(default: str = "none"):
+    """
+    Tracing and metrics of the graph runs, exported to the sinks listed in
+    TELEMETRY_SINKS (comma-separated: json, prometheus, otel; "none" turns the
+    instrumentation off).
+
+    Args:
+        default: sinks used when TELEMETRY_SINKS is not set. Off by default, so
+            the graphs built by scripts and benchmarks pay no instrumentation
+            cost; the API server asks for prometheus.
+    """
+    def build():
+        from agent.lang_graph.telemetry import SINKS, Telemetry
+
+        names = [name.strip().lower() for name in os.getenv("TELEMETRY_SINKS", default).split(",") if name.strip()]
+        names = [name for name in names if name != "none"]
+        unknown = [name for name in names if name not in SINKS]
+        if unknown:
+            raise ValueError(f"Unknown telemetry sinks {unknown}, expected some of {list(SINKS)}")
+
+        return Telemetry([SINKS[name]() for name in names])
+
+    return shared("telemetry", build)
+
+
+def warm_up() -> None:
+    """
+    Open the pooled connections ahead of the first question, so its latency does not
+    include TCP/TLS handshakes. Failures are reported and otherwise ignored.
+    """
+    logger.info("Warming up clients")
+    try:
+        openai_http_client().get(
+            "https://api.openai.com/v1/models",
+            headers={"Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY', '')}"},
+        )
+    except Exception as e:
+        logger.warning(f"OpenAI warm-up failed: {e!r}")
+
+    try:
+        store = vector_store()
+        index = getattr(store, "index", None)
+        if index is not None:
+            index.describe_index_stats()
+    except Exception as e:
+        logger.warning(f"Vector store warm-up failed: {e!r}")
@@ -0,0 +1,191 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_ROUTE_TTLS = {
+    "vectorstore": 24 * 60 * 60,
+    "web_search": 15 * 60,
+}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation of a question."""
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!. ")
+
+
+def route_of(documents: list[Document]) -> str:
+    """Infer which datasource produced the documents of a grounded answer."""
+    if any(doc.metadata.get("source") == "web" for doc in documents):
+        return "web_search"
+    return "vectorstore"
+
+
+class SemanticAnswerCache:
+    """
+    Cache of grounded answers keyed on the embedding of the normalized question.
+
+    A lookup returns the stored answer of the most similar cached question when its
+    cosine similarity passes `similarity_threshold`. Entries expire after the TTL of
+    the route that produced them, the least recently used entry is evicted once
+    `max_size` is reached, and a whole route can be invalidated at once.
+    """
+
+    def __init__(
+        self,
+        embedding_model=None,
+        similarity_threshold: float = 0.92,
+        max_size: int = 1024,
+        route_ttls: dict[str, float] | None = None,
+    ):
+        # When left empty the graph binds its own retrieval embedding model.
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.route_ttls = {**DEFAULT_ROUTE_TTLS, **(route_ttls or {})}
+
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vector: list[float]) -> "np.ndarray":
+        # Imported on first use, like the client SDKs in resources.py.
+        import numpy as np
+
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, normalized_question: str) -> "np.ndarray":
+        return self._unit(self.embedding_model.embed_query(normalized_question))
+
+    async def _aembed(self, normalized_question: str) -> "np.ndarray":
+        return self._unit(await self.embedding_model.aembed_query(normalized_question))
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+
+    def lookup(self, question: str) -> dict | None:
+        """
+        Look up a cached answer for a question.
+
+        Args:
+            question: raw user question.
+
+        Returns:
+            The cache entry (answer, documents, route, similarity) or None on a miss.
+        """
+        key = normalize_question(question)
+        entry, searchable = self._exact(key)
+        # Exact repeats skip the embedding call altogether.
+        if entry is None and searchable:
+            key, entry = self._nearest(key, self._embed(key))
+
+        return self._hit(key, entry)
+
+    async def alookup(self, question: str) -> dict | None:
+        """Async version of `lookup`."""
+        key = normalize_question(question)
+        entry, searchable = self._exact(key)
+        if entry is None and searchable:
+            key, entry = self._nearest(key, await self._aembed(key))
+
+        return self._hit(key, entry)
+
+    def _exact(self, key: str) -> tuple[dict | None, bool]:
+        """Entry stored under exactly this question, and whether a similarity search can still hit."""
+        with self._lock:
+            self._purge_expired(time.time())
+            return self._entries.get(key), bool(self._entries)
+
+    def _nearest(self, key: str, query_vector: "np.ndarray") -> tuple[str, dict | None]:
+        with self._lock:
+            keys = list(self._entries)
+            if keys:
+                import numpy as np
+
+                matrix = np.stack([self._entries[k]["embedding"] for k in keys])
+                similarities = matrix @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    return keys[best], {**self._entries[keys[best]], "similarity": float(similarities[best])}
+
+        return key, None
+
+    def _hit(self, key: str, entry: dict | None) -> dict | None:
+        with self._lock:
+            if entry is None or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return {"similarity": 1.0, **entry}
+
+    def store(self, question: str, answer, documents: list[Document], route: str | None = None) -> None:
+        """
+        Store a grounded answer.
+
+        Args:
+            question: raw user question the answer was generated for.
+            answer: content of the final AI message (text or content blocks).
+            documents: documents the answer is grounded on.
+            route: datasource that produced the documents, inferred when omitted.
+        """
+        key = normalize_question(question)
+        self._put(key, self._embed(key), answer, documents, route)
+
+    async def astore(self, question: str, answer, documents: list[Document], route: str | None = None) -> None:
+        """Async version of `store`."""
+        key = normalize_question(question)
+        self._put(key, await self._aembed(key), answer, documents, route)
+
+    def _put(self, key: str, embedding: "np.ndarray", answer, documents: list[Document], route: str | None) -> None:
+        route = route or route_of(documents)
+        entry = {
+            "question": key,
+            "embedding": embedding,
+            "answer": answer,
+            "documents": documents,
+            "route": route,
+            "expires_at": time.time() + self.route_ttls.get(route, DEFAULT_ROUTE_TTLS["web_search"]),
+        }
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, route: str | None = None) -> int:
+        """Drop every entry of a route (or all entries) and return how many were dropped."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if route is None or entry["route"] == route]
+            for key in keys:
+                del self._entries[key]
+
+        return len(keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+import threading
+from concurrent.futures import Future, wait
+from typing import Awaitable, Callable
+from langchain_core.documents import Document
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("vectorstore", "web_search")
+
+
+class SpeculativeRouter:
+    """
+    Route a question while its retrieval already runs.
+
+    The router LLM call and the vector store retrieval start at the same time, so
+    the retrieval is off the critical path when the router picks the vector store.
+    Web search costs a paid API call per question, so it is only speculated when
+    the router has not answered after `web_search_after` seconds (None never
+    speculates on it, 0 always does). The branch the router did not pick is
+    cancelled if it has not started yet and discarded otherwise; every discarded
+    branch is counted as waste in `stats()`.
+
+    `aroute` does the same on the event loop with the async callables, where the
+    discarded branch's request is really cancelled.
+    """
+
+    def __init__(
+        self,
+        router: Callable[[str], str],
+        retrieve: Callable[[str], list[Document]],
+        search: Callable[[str], list[Document]],
+        speculate_retrieval: bool = True,
+        web_search_after: float | None = 1.0,
+        arouter: Callable[[str], Awaitable[str]] | None = None,
+        aretrieve: Callable[[str], Awaitable[list[Document]]] | None = None,
+        asearch: Callable[[str], Awaitable[list[Document]]] | None = None,
+    ):
+        self.router = router
+        self.retrieve = retrieve
+        self.search = search
+        self.arouter = arouter
+        self.aretrieve = aretrieve
+        self.asearch = asearch
+        self.speculate_retrieval = speculate_retrieval
+        self.web_search_after = web_search_after
+
+        self._lock = threading.Lock()
+        self.counts = {
+            "runs": 0,
+            "retrievals": 0,
+            "retrievals_wasted": 0,
+            "web_searches": 0,
+            "web_searches_wasted": 0,
+            "web_searches_held_back": 0,
+            "failed_branches": 0,
+        }
+        self.router_time = 0.0
+        self.time_saved = 0.0
+
+    def _count(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self.counts[name] += count
+
+    def route(self, question: str) -> tuple[str, list[Document] | None, dict]:
+        """
+        Route the question and return the result of the picked branch if it was
+        speculated.
+
+        Args:
+            question: the user question.
+
+        Returns:
+            The route ("vectorstore" or "web_search"), the documents of that route or
+            None when it was not speculated or failed (the caller then runs it), and
+            a report of what was launched, used and wasted.
+        """
+        start = time.perf_counter()
+        timings: dict[str, tuple[float, float]] = {}
+
+        def timed(name: str, fn: Callable[[str], list[Document]]):
+            def run():
+                branch_start = time.perf_counter()
+                try:
+                    return fn(question)
+                finally:
+                    timings[name] = (branch_start, time.perf_counter())
+            return run
+
+        executor = ContextThreadPoolExecutor(max_workers=3)
+        branches: dict[str, Future] = {}
+        try:
+            router = executor.submit(self.router, question)
+            if self.speculate_retrieval:
+                branches["vectorstore"] = executor.submit(timed("vectorstore", self.retrieve))
+
+            # Cost guard: only pay for a speculative web search when the router is slow.
+            if self.web_search_after is not None:
+                wait([router], timeout=self.web_search_after)
+                if not router.done():
+                    branches["web_search"] = executor.submit(timed("web_search", self.search))
+
+            route = router.result()
+            router_end = time.perf_counter()
+            self._check(route)
+
+            documents = None
+            if route in branches:
+                try:
+                    documents = branches[route].result()
+                except Exception as e:
+                    documents = self._failed(route, e)
+
+            wasted = [name for name in branches if name != route]
+            for name in wasted:
+                branches[name].cancel()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return route, documents, self._record(route, list(branches), wasted, documents, timings, start, router_end)
+
+    async def aroute(self, question: str) -> tuple[str, list[Document] | None, dict]:
+        """Async version of `route`, driven by `arouter`, `aretrieve` and `asearch`."""
+        if self.arouter is None or self.aretrieve is None or self.asearch is None:
+            raise ValueError("Async routing needs arouter, aretrieve and asearch")
+
+        start = time.perf_counter()
+        timings: dict[str, tuple[float, float]] = {}
+
+        async def timed(name: str, fn: Callable[[str], Awaitable[list[Document]]]):
+            branch_start = time.perf_counter()
+            try:
+                return await fn(question)
+            finally:
+                timings[name] = (branch_start, time.perf_counter())
+
+        branches: dict[str, asyncio.Task] = {}
+        router = asyncio.create_task(self.arouter(question))
+        try:
+            if self.speculate_retrieval:
+                branches["vectorstore"] = asyncio.create_task(timed("vectorstore", self.aretrieve))
+
+            # Cost guard: only pay for a speculative web search when the router is slow.
+            if self.web_search_after is not None:
+                await asyncio.wait([router], timeout=self.web_search_after)
+                if not router.done():
+                    branches["web_search"] = asyncio.create_task(timed("web_search", self.asearch))
+
+            route = await router
+            router_end = time.perf_counter()
+            self._check(route)
+
+            documents = None
+            if route in branches:
+                try:
+                    documents = await branches[route]
+                except Exception as e:
+                    documents = self._failed(route, e)
+
+            wasted = [name for name in branches if name != route]
+        finally:
+            # Finished tasks ignore it; the discarded branch, or every branch when
+            # routing failed or the run was cancelled, is stopped.
+            for task in [router, *branches.values()]:
+                task.cancel()
+
+        return route, documents, self._record(route, list(branches), wasted, documents, timings, start, router_end)
+
+    @staticmethod
+    def _check(route: str) -> None:
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route '{route}', expected one of {ROUTES}")
+
+    def _failed(self, route: str, error: Exception) -> None:
+        logger.warning(f"Speculative {route} failed ({error!r}), running it again")
+        self._count(failed_branches=1)
+        return None
+
+    def _record(
+        self,
+        route: str,
+        speculated: list[str],
+        wasted: list[str],
+        documents: list[Document] | None,
+        timings: dict[str, tuple[float, float]],
+        start: float,
+        router_end: float,
+    ) -> dict:
+        saved = 0.0
+        if documents is not None and route in timings:
+            branch_start, branch_end = timings[route]
+            saved = max(0.0, min(router_end, branch_end) - branch_start)
+
+        self._count(
+            runs=1,
+            retrievals="vectorstore" in speculated,
+            retrievals_wasted="vectorstore" in wasted,
+            web_searches="web_search" in speculated,
+            web_searches_wasted="web_search" in wasted,
+            web_searches_held_back=self.web_search_after is not None and "web_search" not in speculated,
+        )
+        with self._lock:
+            self.router_time += router_end - start
+            self.time_saved += saved
+
+        report = {
+            "route": route,
+            "speculated": speculated,
+            "wasted": wasted,
+            "router_time": router_end - start,
+            "time_saved": saved,
+        }
+        logger.info(
+            f"Routed to {route} in {report['router_time']:.2f}s, speculated {speculated or 'nothing'}, "
+            f"saved {saved:.2f}s, wasted {wasted or 'nothing'}"
+        )
+        return report
+
+    def stats(self) -> dict:
+        """Speculation counters, waste rates and the time taken off the critical path."""
+        with self._lock:
+            counts = dict(self.counts)
+            router_time, time_saved = self.router_time, self.time_saved
+
+        launched = counts["retrievals"] + counts["web_searches"]
+        wasted = counts["retrievals_wasted"] + counts["web_searches_wasted"]
+        return {
+            **counts,
+            "waste_rate": wasted / launched if launched else 0.0,
+            "web_search_waste_rate": counts["web_searches_wasted"] / counts["web_searches"] if counts["web_searches"] else 0.0,
+            "avg_router_time": router_time / counts["runs"] if counts["runs"] else 0.0,
+            "avg_time_saved": time_saved / counts["runs"] if counts["runs"] else 0.0,
+        }
@@ -11,8 +11,28 @@ class GraphState(TypedDict):
         question: question
         generation: LLM generation
         documents: list of documents
+        grading_report: verdicts and timings of the last document grading
+        cache_hit: whether the answer of this turn came from the semantic cache
+        budget: deadline, loop and LLM call budget of the current run
+        generation_grade: outcome of the last generation grading
+        route: route picked by the speculative router
+        confident_documents: reranked documents confident enough to skip grading
+        rerank_report: scores and avoided grader calls of the last rerank
+        context: packed documents the last generation was given
+        summary: rolling summary of the turns no longer sent verbatim
+        summarized_messages: number of leading messages folded into the summary
     """
 
     messages: Annotated[List, add_messages]
     question: str
-    documents: List[str]
\ No newline at end of file
+    documents: List[str]
+    grading_report: dict
+    cache_hit: bool
+    budget: dict
+    generation_grade: str
+    route: str
+    confident_documents: List[str]
+    rerank_report: dict
+    context: str
+    summary: str
+    summarized_messages: int
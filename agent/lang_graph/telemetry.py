@@ -0,0 +1,474 @@
+"""
+Per-run tracing and metrics of the agent graph.
+
+`Telemetry.instrument` wraps every node and edge of the graph (see graph.py) and
+records one step per call: wall time, wait time (the gap since the previous step
+of the run ended, spent in the graph runtime: checkpointing, scheduling, thread
+pools), loop iteration, documents in and out and, for edges, the decision. The
+LLM calls made while a step runs (in its thread, its grading threads or its
+tasks) and their prompt/completion tokens are added to the step by a callback
+handler, `Telemetry.callbacks`, attached to the compiled graph. The same handler
+opens a run when the graph starts and closes it when the graph ends, and the run
+record, tied to its thread id, is handed to the sinks:
+
+- JSONLogSink: one JSON line per run.
+- PrometheusSink: aggregated counters and histograms, rendered in the Prometheus
+  text format (served at /metrics by the API).
+- OpenTelemetrySink: a span per run with a child span per step.
+
+Nothing is exported while a run is in flight: steps are appended to plain dicts
+and the sinks run once per run, so the overhead is a few microseconds per step.
+
+The progress messages of the nodes and helpers go through `logging`, under the
+"agent" and "front_end" loggers; `configure_logging` sends them to stderr as text
+or as JSON lines tagged with the step they were logged from.
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, TextIO
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables.utils import accepts_config
+
+logger = logging.getLogger(__name__)
+
+# Step record of the node or edge running in the current context.
+_current_step: contextvars.ContextVar[dict | None] = contextvars.ContextVar("telemetry_step", default=None)
+
+
+class RunTrace:
+    """Record of one graph run, filled while the run is in flight."""
+
+    def __init__(self, run_id: str, thread_id: str | None, queued: float | None = None):
+        self.run_id = run_id
+        self.thread_id = thread_id
+        self.queued = queued
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.last_end = self.start
+        self.steps: list[dict] = []
+        self.iterations: Counter = Counter()
+
+    def record(self, status: str, error: str | None = None) -> dict:
+        wall = time.perf_counter() - self.start
+        return {
+            "run_id": self.run_id,
+            "thread_id": self.thread_id,
+            "started": self.started,
+            "status": status,
+            "error": error,
+            "wall": wall,
+            "queued": self.queued,
+            # Time of the run outside of any node or edge.
+            "overhead": wall - sum(step["wall"] for step in self.steps),
+            "llm_calls": sum(step["llm_calls"] for step in self.steps),
+            "prompt_tokens": sum(step["prompt_tokens"] for step in self.steps),
+            "completion_tokens": sum(step["completion_tokens"] for step in self.steps),
+            "iterations": dict(self.iterations),
+            "steps": self.steps,
+        }
+
+
+class TelemetryCallbacks(BaseCallbackHandler):
+    """Opens and closes the runs of the graph, and counts the LLM calls of each step."""
+
+    # Called in the context of the LLM call, so the current step is known, and
+    # without an executor hop under the async graph.
+    run_inline = True
+
+    def __init__(self, telemetry: "Telemetry"):
+        self.telemetry = telemetry
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: UUID | None = None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            metadata = metadata or {}
+            self.telemetry.start_run(str(run_id), metadata.get("thread_id"), metadata.get("queued_seconds"))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs):
+        if parent_run_id is None:
+            self.telemetry.finish_run(str(run_id), "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs):
+        if parent_run_id is None:
+            self.telemetry.finish_run(str(run_id), "error", repr(error))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        step = _current_step.get()
+        if step is None:
+            return
+
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+
+        with self.telemetry.lock:
+            step["llm_calls"] += 1
+            step["prompt_tokens"] += prompt_tokens
+            step["completion_tokens"] += completion_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        step = _current_step.get()
+        if step is not None:
+            with self.telemetry.lock:
+                step["llm_calls"] += 1
+                step["llm_errors"] = step.get("llm_errors", 0) + 1
+
+
+class Telemetry:
+    """
+    Instrumentation of the graph runs, exported to `sinks` (objects with an
+    `export(run: dict)` method) when each run ends.
+
+    Args:
+        sinks: where the run records go; without sinks nothing is instrumented.
+        max_open_runs: runs kept in flight at most; the oldest are dropped beyond
+            it (e.g. runs abandoned without an end event).
+    """
+
+    def __init__(self, sinks: list | None = None, max_open_runs: int = 1024):
+        self.sinks = list(sinks or [])
+        self.max_open_runs = max_open_runs
+        self.lock = threading.Lock()
+        self.callbacks = TelemetryCallbacks(self)
+        self._runs: dict[str, RunTrace] = {}
+        self._run_by_thread: dict[str | None, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def sink(self, kind: type):
+        """The first sink of the given type, or None."""
+        return next((sink for sink in self.sinks if isinstance(sink, kind)), None)
+
+    def start_run(self, run_id: str, thread_id: str | None, queued: float | None = None) -> None:
+        with self.lock:
+            while len(self._runs) >= self.max_open_runs:
+                stale = next(iter(self._runs))
+                self._run_by_thread.pop(self._runs.pop(stale).thread_id, None)
+            self._runs[run_id] = RunTrace(run_id, thread_id, queued)
+            self._run_by_thread[thread_id] = run_id
+
+    def finish_run(self, run_id: str, status: str, error: str | None = None) -> None:
+        with self.lock:
+            trace = self._runs.pop(run_id, None)
+            if trace is None:
+                return
+            if self._run_by_thread.get(trace.thread_id) == run_id:
+                del self._run_by_thread[trace.thread_id]
+
+        record = trace.record(status, error)
+        for sink in self.sinks:
+            try:
+                sink.export(record)
+            except Exception as e:
+                logger.warning(f"Telemetry sink {type(sink).__name__} failed: {e!r}")
+
+    def _trace(self, config: dict | None) -> RunTrace | None:
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        run_id = self._run_by_thread.get(thread_id)
+        return self._runs.get(run_id) if run_id is not None else None
+
+    def _begin(self, trace: RunTrace, name: str, kind: str, state: Any) -> dict:
+        start = time.perf_counter()
+        trace.iterations[name] += 1
+        step = {
+            "name": name,
+            "kind": kind,
+            "start": start - trace.start,
+            "wait": max(start - trace.last_end, 0.0),
+            "iteration": trace.iterations[name],
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+        if isinstance(state, dict) and state.get("documents") is not None:
+            step["docs_in"] = len(state["documents"])
+        return step
+
+    def _end(self, trace: RunTrace, step: dict, result: Any, error: BaseException | None) -> None:
+        end = time.perf_counter()
+        step["wall"] = end - trace.start - step["start"]
+        if error is not None:
+            step["error"] = repr(error)
+        elif isinstance(result, dict):
+            if result.get("documents") is not None:
+                step["docs_out"] = len(result["documents"])
+        elif isinstance(result, str):
+            step["decision"] = result
+
+        trace.last_end = max(trace.last_end, end)
+        trace.steps.append(step)
+
+    def instrument(self, func: Callable, afunc: Callable, kind: str = "node") -> tuple[Callable, Callable]:
+        """
+        Wrap the sync and async implementations of a node or an edge. The wrappers
+        take the run config, so the step is recorded in the run of its thread.
+        """
+        name = func.__name__
+        pass_config = accepts_config(func)
+        apass_config = accepts_config(afunc)
+
+        def traced(state, config):
+            trace = self._trace(config)
+            if trace is None:
+                return func(state, config) if pass_config else func(state)
+
+            step = self._begin(trace, name, kind, state)
+            token = _current_step.set(step)
+            result, error = None, None
+            try:
+                result = func(state, config) if pass_config else func(state)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _current_step.reset(token)
+                self._end(trace, step, result, error)
+
+        async def atraced(state, config):
+            trace = self._trace(config)
+            if trace is None:
+                return await (afunc(state, config) if apass_config else afunc(state))
+
+            step = self._begin(trace, name, kind, state)
+            token = _current_step.set(step)
+            result, error = None, None
+            try:
+                result = await (afunc(state, config) if apass_config else afunc(state))
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _current_step.reset(token)
+                self._end(trace, step, result, error)
+
+        traced.__name__ = atraced.__name__ = name
+        return traced, atraced
+
+
+class JSONLogSink:
+    """Structured logs: one JSON line per run."""
+
+    def __init__(self, stream: TextIO | None = None, include_steps: bool = True):
+        self.stream = stream
+        self.include_steps = include_steps
+        self._lock = threading.Lock()
+
+    def export(self, run: dict) -> None:
+        if not self.include_steps:
+            run = {key: value for key, value in run.items() if key != "steps"}
+        line = json.dumps({"event": "agent_run", **run}, default=str)
+        with self._lock:
+            print(line, file=self.stream or sys.stdout, flush=True)
+
+
+class PrometheusSink:
+    """
+    Counters and histograms aggregated over the runs of the process, rendered in
+    the Prometheus text exposition format by `render`.
+    """
+
+    DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    ITERATION_BUCKETS = (1, 2, 3, 5, 10)
+
+    HELP = {
+        "agent_runs_total": ("counter", "Graph runs, by status."),
+        "agent_run_duration_seconds": ("histogram", "Wall time of the graph runs."),
+        "agent_run_queued_seconds": ("histogram", "Time the runs waited for admission before starting."),
+        "agent_step_duration_seconds": ("histogram", "Wall time of the nodes and edges."),
+        "agent_step_wait_seconds": ("histogram", "Time between the end of the previous step of the run and the start of a node or edge."),
+        "agent_step_iterations": ("histogram", "Times a node or edge ran in one run (loop iterations)."),
+        "agent_step_errors_total": ("counter", "Nodes and edges that raised."),
+        "agent_llm_calls_total": ("counter", "LLM calls, by step."),
+        "agent_llm_tokens_total": ("counter", "LLM tokens, by step and type (prompt or completion)."),
+        "agent_documents_total": ("counter", "Documents entering and leaving the nodes, by step and direction."),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, Counter] = {}
+        # name -> labels -> [bucket counts, sum, count]
+        self._histograms: dict[str, dict[tuple, list]] = {}
+
+    def _inc(self, name: str, labels: tuple, value: float = 1) -> None:
+        self._counters.setdefault(name, Counter())[labels] += value
+
+    def _observe(self, name: str, labels: tuple, value: float, buckets: tuple) -> None:
+        series = self._histograms.setdefault(name, {})
+        entry = series.get(labels)
+        if entry is None:
+            entry = series[labels] = [[0] * len(buckets), 0.0, 0, buckets]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                entry[0][i] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def export(self, run: dict) -> None:
+        with self._lock:
+            self._inc("agent_runs_total", (("status", run["status"]),))
+            self._observe("agent_run_duration_seconds", (), run["wall"], self.DURATION_BUCKETS)
+            if run["queued"] is not None:
+                self._observe("agent_run_queued_seconds", (), run["queued"], self.DURATION_BUCKETS)
+
+            for step in run["steps"]:
+                labels = (("step", step["name"]), ("kind", step["kind"]))
+                self._observe("agent_step_duration_seconds", labels, step["wall"], self.DURATION_BUCKETS)
+                self._observe("agent_step_wait_seconds", labels, step["wait"], self.DURATION_BUCKETS)
+                if "error" in step:
+                    self._inc("agent_step_errors_total", labels)
+                if step["llm_calls"]:
+                    self._inc("agent_llm_calls_total", labels, step["llm_calls"])
+                    self._inc("agent_llm_tokens_total", labels + (("type", "prompt"),), step["prompt_tokens"])
+                    self._inc("agent_llm_tokens_total", labels + (("type", "completion"),), step["completion_tokens"])
+                for direction in ("in", "out"):
+                    if f"docs_{direction}" in step:
+                        self._inc("agent_documents_total", labels + (("direction", direction),), step[f"docs_{direction}"])
+
+            kinds = {step["name"]: step["kind"] for step in run["steps"]}
+            for name, count in run["iterations"].items():
+                labels = (("step", name), ("kind", kinds.get(name, "node")))
+                self._observe("agent_step_iterations", labels, count, self.ITERATION_BUCKETS)
+
+    @staticmethod
+    def _labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self.HELP.items():
+                if name not in self._counters and name not in self._histograms:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for labels, value in self._counters.get(name, {}).items():
+                    lines.append(f"{name}{self._labels(labels)} {value:g}")
+                for labels, (counts, total, count, buckets) in self._histograms.get(name, {}).items():
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{self._labels(labels + (('le', f'{bound:g}'),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {total:g}")
+                    lines.append(f"{name}_count{self._labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetrySink:
+    """
+    OpenTelemetry spans: an "agent.run" span per run with a child span per step,
+    recorded with the run's timestamps once it ended. Uses the global tracer
+    provider (configure the SDK and exporter, e.g. OTLP, at startup).
+    """
+
+    def __init__(self, tracer_name: str = "agent.lang_graph"):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "The otel telemetry sink needs OpenTelemetry: pip install opentelemetry-api opentelemetry-sdk"
+            ) from e
+
+        self._trace = trace
+        self.tracer = trace.get_tracer(tracer_name)
+
+    def export(self, run: dict) -> None:
+        trace = self._trace
+        start_ns = int(run["started"] * 1e9)
+
+        root = self.tracer.start_span(
+            "agent.run",
+            start_time=start_ns,
+            attributes={
+                key: run[key]
+                for key in ("run_id", "thread_id", "status", "llm_calls", "prompt_tokens", "completion_tokens", "queued")
+                if run[key] is not None
+            },
+        )
+        if run["error"] is not None:
+            root.set_status(trace.Status(trace.StatusCode.ERROR, run["error"]))
+
+        context = trace.set_span_in_context(root)
+        for step in run["steps"]:
+            span = self.tracer.start_span(
+                f"agent.{step['kind']}.{step['name']}",
+                context=context,
+                start_time=start_ns + int(step["start"] * 1e9),
+                attributes={key: value for key, value in step.items() if key not in ("start", "name")},
+            )
+            if "error" in step:
+                span.set_status(trace.Status(trace.StatusCode.ERROR, step["error"]))
+            span.end(end_time=start_ns + int((step["start"] + step["wall"]) * 1e9))
+
+        root.end(end_time=start_ns + int(run["wall"] * 1e9))
+
+
+SINKS = {
+    "json": JSONLogSink,
+    "prometheus": PrometheusSink,
+    "otel": OpenTelemetrySink,
+}
+
+
+class JSONLogFormatter(logging.Formatter):
+    """Log records as JSON lines, with the node or edge running when they were logged."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "event": "log",
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        step = _current_step.get()
+        if step is not None:
+            entry["step"] = step["name"]
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None) -> None:
+    """
+    Send the logs of the agent and the front end to stderr. Other libraries keep
+    their own configuration. Calling it again does nothing.
+
+    Args:
+        level: log level, LOG_LEVEL or INFO by default.
+        fmt: "text" or "json" (one JSON line per message), LOG_FORMAT or text by default.
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown log format {fmt!r}, expected text or json")
+
+    for name in ("agent", "front_end"):
+        package_logger = logging.getLogger(name)
+        if any(getattr(handler, "_agent_handler", False) for handler in package_logger.handlers):
+            continue
+
+        handler = logging.StreamHandler()
+        handler._agent_handler = True
+        handler.setFormatter(
+            JSONLogFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+        package_logger.addHandler(handler)
+        package_logger.setLevel(level)
+        package_logger.propagate = False
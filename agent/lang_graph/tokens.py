@@ -0,0 +1,53 @@
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio of English text, used when no tokenizer is available.
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = "gpt-4o-mini") -> "tiktoken.Encoding | None":
+    """
+    Return the tiktoken encoding of a model, falling back to o200k_base for models
+    tiktoken does not know about (e.g. Claude, which has no public tokenizer), and to
+    None when the encoding files cannot be loaded (e.g. offline, with a cold cache).
+    """
+    # Imported on first use, like the client SDKs in resources.py.
+    import tiktoken
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"No tokenizer for {model} ({e!r}), estimating token counts")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count the tokens of a text with the model's tokenizer."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut a text down to at most `max_tokens` tokens."""
+    if max_tokens <= 0:
+        return ""
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
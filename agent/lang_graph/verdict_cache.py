@@ -0,0 +1,73 @@
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+from langchain_core.documents import Document
+from agent.lang_graph.semantic_cache import normalize_question
+
+
+def chunk_identity(doc: Document) -> str:
+    """Stable identity of a chunk: its vector id when known, else a hash of its content."""
+    if getattr(doc, "id", None):
+        return f"id:{doc.id}"
+    return "sha256:" + hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class GradeVerdictCache:
+    """
+    Memoized document-grading verdicts keyed on (chunk identity, normalized question).
+
+    Verdicts expire after `ttl` seconds and the least recently used one is evicted
+    once `max_size` is reached. With `share_across_threads` disabled each
+    conversation thread only reuses its own verdicts.
+    """
+
+    def __init__(self, max_size: int = 50_000, ttl: float = 6 * 60 * 60, share_across_threads: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.share_across_threads = share_across_threads
+
+        self._verdicts: OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, doc: Document, question: str, thread_id: str | None) -> tuple:
+        scope = None if self.share_across_threads else thread_id
+        return scope, chunk_identity(doc), normalize_question(question)
+
+    def get(self, doc: Document, question: str, thread_id: str | None = None) -> str | None:
+        key = self._key(doc, question, thread_id)
+        with self._lock:
+            cached = self._verdicts.get(key)
+            if cached is None or cached[1] <= time.time():
+                if cached is not None:
+                    del self._verdicts[key]
+                self.misses += 1
+                return None
+
+            self._verdicts.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+    def put(self, doc: Document, question: str, verdict: str, thread_id: str | None = None) -> None:
+        key = self._key(doc, question, thread_id)
+        with self._lock:
+            self._verdicts[key] = (verdict, time.time() + self.ttl)
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_size:
+                self._verdicts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verdicts.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._verdicts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
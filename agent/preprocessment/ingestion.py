@@ -0,0 +1,214 @@
+import logging
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Callable, Iterable
+from uuid import uuid4
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from agent.lang_graph.tokens import count_tokens
+from agent.vector_store.backends import upsert_embeddings
+from agent.vector_store.sparse_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# OpenAI embeddings API limits: 2048 inputs and 300k tokens per request.
+MAX_EMBEDDING_INPUTS = 2048
+MAX_EMBEDDING_TOKENS = 300_000
+
+
+def with_retry(fn: Callable, attempts: int = 5, base_delay: float = 1.0, what: str = "call"):
+    """Call `fn`, retrying with exponential backoff on any exception."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1)
+            logger.warning(f"{what} failed ({e!r}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class IngestionStats:
+    """Counters and throughput of an ingestion run."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pages = 0
+        self.failed_pages = 0
+        self.chunks = 0
+        self.embeddings = 0
+        self.upserted = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def report(self) -> dict:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "elapsed": elapsed,
+            "pages": self.pages,
+            "failed_pages": self.failed_pages,
+            "chunks": self.chunks,
+            "embeddings": self.embeddings,
+            "upserted": self.upserted,
+            "pages_per_s": self.pages / elapsed,
+            "chunks_per_s": self.chunks / elapsed,
+            "embeddings_per_s": self.embeddings / elapsed,
+        }
+
+    def __str__(self) -> str:
+        r = self.report()
+        return (
+            f"{r['pages']} pages ({r['failed_pages']} failed), {r['chunks']} chunks, "
+            f"{r['upserted']} upserted in {r['elapsed']:.1f}s | "
+            f"{r['pages_per_s']:.2f} pages/s, {r['chunks_per_s']:.1f} chunks/s, "
+            f"{r['embeddings_per_s']:.1f} embeddings/s"
+        )
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: fetch -> chunk -> embed -> upsert.
+
+    At most `max_in_flight_fetches` pages are downloaded at a time, and each page is
+    chunked as soon as it arrives. Chunks are buffered into embedding batches that
+    respect the embedding API limits, and each batch is embedded and upserted by a
+    writer pool. When `max_pending_batches` batches are waiting, fetching pauses
+    until one finishes (backpressure). Memory is therefore bounded by the in-flight
+    pages plus the pending batches, whatever the corpus size.
+
+    With a `sparse_index`, every upserted batch is also added to that BM25 index.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        embedding_model: Embeddings,
+        fetch_page: Callable[[str], list[Document]],
+        chunk_docs: Callable[[list[Document]], list[Document]],
+        max_in_flight_fetches: int = 8,
+        embedding_batch_size: int = 512,
+        embedding_batch_tokens: int = 250_000,
+        max_pending_batches: int = 4,
+        max_writers: int = 4,
+        retries: int = 5,
+        progress_every: float = 5.0,
+        chunk_ids: Callable[[Document], str] | None = None,
+        sparse_index: BM25Index | None = None,
+    ):
+        self.vector_store = vector_store
+        self.embedding_model = embedding_model
+        self.fetch_page = fetch_page
+        self.chunk_docs = chunk_docs
+        self.max_in_flight_fetches = max_in_flight_fetches
+        self.embedding_batch_size = min(embedding_batch_size, MAX_EMBEDDING_INPUTS)
+        self.embedding_batch_tokens = min(embedding_batch_tokens, MAX_EMBEDDING_TOKENS)
+        self.max_pending_batches = max_pending_batches
+        self.max_writers = max_writers
+        self.retries = retries
+        self.progress_every = progress_every
+        self.chunk_ids = chunk_ids or (lambda chunk: str(uuid4()))
+        self.sparse_index = sparse_index
+
+    def _write_batch(self, chunks: list[Document], stats: IngestionStats) -> None:
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = with_retry(
+            lambda: self.embedding_model.embed_documents(texts),
+            attempts=self.retries,
+            what="Embedding batch",
+        )
+        stats.add(embeddings=len(vectors))
+
+        metadatas = [chunk.metadata for chunk in chunks]
+        ids = [self.chunk_ids(chunk) for chunk in chunks]
+        with_retry(
+            lambda: upsert_embeddings(self.vector_store, texts, vectors, metadatas, ids),
+            attempts=self.retries,
+            what="Upsert batch",
+        )
+        if self.sparse_index is not None:
+            self.sparse_index.add(ids, texts, metadatas)
+        stats.add(upserted=len(chunks))
+
+    def run(self, urls: Iterable[str]) -> IngestionStats:
+        """
+        Ingest every URL and return the run statistics.
+
+        Args:
+            urls: pages to ingest, consumed lazily so it can be a generator.
+        """
+        stats = IngestionStats()
+        urls = iter(urls)
+        last_progress = time.perf_counter()
+
+        batch: list[Document] = []
+        batch_tokens = 0
+        pending_writes: deque[Future] = deque()
+
+        fetchers = ThreadPoolExecutor(max_workers=self.max_in_flight_fetches)
+        writers = ThreadPoolExecutor(max_workers=self.max_writers)
+
+        def flush() -> None:
+            nonlocal batch, batch_tokens
+            if not batch:
+                return
+            # Backpressure: wait for the oldest batch before queuing another one.
+            while len(pending_writes) >= self.max_pending_batches:
+                pending_writes.popleft().result()
+            pending_writes.append(writers.submit(self._write_batch, batch, stats))
+            batch, batch_tokens = [], 0
+
+        def submit_next(in_flight: dict) -> None:
+            url = next(urls, None)
+            if url is not None:
+                in_flight[fetchers.submit(with_retry, lambda: self.fetch_page(url), self.retries, 1.0, f"Fetching {url}")] = url
+
+        try:
+            in_flight: dict[Future, str] = {}
+            for _ in range(self.max_in_flight_fetches):
+                submit_next(in_flight)
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = in_flight.pop(future)
+                    try:
+                        chunks = self.chunk_docs(future.result())
+                        stats.add(pages=1, chunks=len(chunks))
+                    except Exception as e:
+                        logger.warning(f"Skipping {url}: {e!r}")
+                        stats.add(failed_pages=1)
+                        chunks = []
+
+                    for chunk in chunks:
+                        chunk_tokens = count_tokens(chunk.page_content, model="text-embedding-3-large")
+                        if batch and (
+                            len(batch) >= self.embedding_batch_size
+                            or batch_tokens + chunk_tokens > self.embedding_batch_tokens
+                        ):
+                            flush()
+                        batch.append(chunk)
+                        batch_tokens += chunk_tokens
+
+                    submit_next(in_flight)
+
+                if time.perf_counter() - last_progress >= self.progress_every:
+                    logger.info(f"Ingestion progress: {stats}")
+                    last_progress = time.perf_counter()
+
+            flush()
+            while pending_writes:
+                pending_writes.popleft().result()
+        finally:
+            fetchers.shutdown(wait=False, cancel_futures=True)
+            writers.shutdown(wait=True)
+
+        logger.info(f"Ingestion done: {stats}")
+        return stats
@@ -1,13 +1,16 @@
 import os
-from pinecone import Pinecone, ServerlessSpec
-from langchain_pinecone import PineconeVectorStore
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from uuid import uuid4
 from dotenv import load_dotenv
 from pathlib import Path
+from agent.vector_store.backends import create_vector_store, vector_backend, local_store_path, sparse_index_path
+from agent.vector_store.local_store import LocalVectorStore
+from agent.vector_store.sparse_index import BM25Index
+from agent.preprocessment.ingestion import IngestionPipeline
+from agent.preprocessment.sync import ContentManifest, IncrementalSync, chunk_id
+import requests
 
 root_dir = Path().absolute()
 
@@ -16,56 +19,119 @@ load_dotenv(root_dir / ".env")
 class WebPageLoader:
     """
     Class to load web pages and add them to a vector store.
+
+    Pages are ingested by a streaming pipeline: fetched concurrently, chunked as they
+    arrive, embedded in API-sized batches and upserted in parallel (see
+    IngestionPipeline for the tuning knobs accepted as `pipeline_options`).
+
+    Chunk ids are content hashes, so re-running is idempotent. With `incremental`
+    (the default) a manifest of what is indexed per URL is kept, and only new or
+    changed chunks are embedded while stale ones are deleted; `prune` also removes
+    the pages that are no longer listed in `urls`.
+
+    With `sparse_index` (the default) a BM25 index of the same chunks is maintained
+    next to the vector index for hybrid retrieval.
     """
 
-    def __init__(self, index_name: str, urls: list[str]):
+    def __init__(
+        self,
+        index_name: str,
+        urls: list[str],
+        backend: str | None = None,
+        ivf_min_size: int = 50_000,
+        incremental: bool = True,
+        prune: bool = False,
+        manifest_path: str | Path | None = None,
+        sparse_index: bool = True,
+        **pipeline_options,
+    ):
         self.urls = urls
-
-        self.pc = Pinecone(
-            api_key=os.getenv("PINECONE_API_KEY")
-        )
+        self.index_name = index_name
+        self.backend = backend or vector_backend()
+        self.ivf_min_size = ivf_min_size
 
         self.embedding_model = OpenAIEmbeddings(
             model="text-embedding-3-large",
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
 
-        self.pc.create_index(
-            name=index_name,
-            dimension=3072,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-        )
-
-        self.index = self.pc.Index(index_name)
-        self.vector_store = PineconeVectorStore(index=self.index, embedding=self.embedding_model)
-
-        self.docs = self.load_web_pages(urls)
-
-        self.chunked_docs = self.chunk_docs(self.docs)
+        self.vector_store = create_vector_store(self.embedding_model, index_name, backend=self.backend)
 
-        self.add_docs_to_vector_store(self.chunked_docs)
-
-    def add_docs_to_vector_store(self, docs: list[Document]) -> None:
-        uuids = [str(uuid4()) for _ in range(len(docs))]
-
-        self.vector_store.add_documents(documents=docs, ids=uuids)
-
-    def load_web_pages(self, urls: list[str]) -> list[Document]:
-        docs = [WebBaseLoader(url).load() for url in urls]
-        docs_list = [item for sublist in docs for item in sublist]
+        # One pooled keep-alive session shared by every fetch.
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=512,
+            chunk_overlap=128,
+            # Lets the context packer put neighbouring chunks back together.
+            add_start_index=True,
+        )
 
-        return docs_list
+        self.sparse_index = None
+        if sparse_index:
+            path = sparse_index_path(index_name)
+            self.sparse_index = BM25Index.load(path) if BM25Index.exists(path) else BM25Index()
+
+        if incremental:
+            self.sync = IncrementalSync(
+                ContentManifest(manifest_path or root_dir / ".cache" / f"{index_name}.manifest.json"),
+                self.session,
+                self.text_splitter,
+                sparse_index=self.sparse_index,
+            )
+            fetch_page, chunk_docs, chunk_ids = self.sync.fetch_page, self.sync.chunk_docs, self.sync.chunk_id
+        else:
+            self.sync = None
+            fetch_page, chunk_docs, chunk_ids = self.load_web_page, self.chunk_docs, self.chunk_id
+
+        self.pipeline = IngestionPipeline(
+            self.vector_store,
+            self.embedding_model,
+            fetch_page=fetch_page,
+            chunk_docs=chunk_docs,
+            chunk_ids=chunk_ids,
+            sparse_index=self.sparse_index,
+            **pipeline_options,
+        )
+        self.stats = self.pipeline.run(urls)
+
+        if self.sync is not None:
+            self.sync_report = self.sync.finish(self.vector_store, urls if prune else None, before_commit=self.save_local_indexes)
+        else:
+            self.sync_report = None
+            self.save_local_indexes()
+
+    def save_local_indexes(self) -> None:
+        """Write the indexes that live on this machine: the local store and the BM25 index."""
+        if isinstance(self.vector_store, LocalVectorStore):
+            self.save_local_store()
+        if self.sparse_index is not None:
+            self.sparse_index.save(sparse_index_path(self.index_name))
+
+    def save_local_store(self) -> None:
+        """
+        Partition large local corpora for IVF search and write the store to disk,
+        where the retriever memory-maps it.
+        """
+        if len(self.vector_store) >= self.ivf_min_size:
+            self.vector_store.build_ivf()
+
+        self.vector_store.save(local_store_path(self.index_name))
+
+    def load_web_page(self, url: str) -> list[Document]:
+        return WebBaseLoader(url, session=self.session, raise_for_status=True, show_progress=False).load()
 
     def chunk_docs(self, docs: list[Document]) -> list[Document]:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=512,
-            chunk_overlap=128
-        )
+        return self.text_splitter.split_documents(docs)
 
-        return text_splitter.split_documents(docs)
+    @staticmethod
+    def chunk_id(chunk: Document) -> str:
+        return chunk_id(chunk.metadata["source"], chunk.page_content)
 
 if __name__ == "__main__":
+    from agent.lang_graph.telemetry import configure_logging
+
+    configure_logging()
     urls = [
         "https://lilianweng.github.io/posts/2023-06-23-agent/",
         "https://lilianweng.github.io/posts/2023-03-15-prompt-engineering/",
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from agent.lang_graph.tokens import count_tokens
+from agent.vector_store.sparse_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(url: str, content: str) -> str:
+    """Deterministic chunk id: the same text of the same page always gets the same id."""
+    return hashlib.sha256(f"{url}\0{content}".encode("utf-8")).hexdigest()
+
+
+def page_metadata(soup: BeautifulSoup, url: str) -> dict:
+    """Same metadata WebBaseLoader attaches to a page."""
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+    return metadata
+
+
+class ContentManifest:
+    """
+    Local record of what is indexed for every URL: its HTTP validators (ETag and
+    Last-Modified), the hash of its content and the ids of its chunks.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def get(self, url: str) -> dict | None:
+        return self.entries.get(url)
+
+    def save(self) -> None:
+        # Write then rename so an interrupted save never leaves a truncated manifest.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class IncrementalSync:
+    """
+    Incremental, idempotent re-indexing of web pages against a content manifest.
+
+    Pages are fetched with conditional requests and skipped when the server answers
+    304 or their content hash did not change. Changed pages are chunked with
+    deterministic content-hash ids, and only chunks that are not indexed yet are
+    passed on to be embedded and upserted. Chunks that disappeared from a page are
+    deleted, and the manifest is only written once the whole run has succeeded, so
+    an interrupted run is simply redone by the next one.
+
+    With a `sparse_index`, stale chunks are deleted from it too, and unchanged pages
+    whose chunks it is missing (e.g. the first run after enabling it) are fetched
+    and chunked again to fill it, without being embedded again.
+
+    Plugs into IngestionPipeline through `fetch_page`, `chunk_docs` and `chunk_id`.
+    """
+
+    def __init__(
+        self,
+        manifest: ContentManifest,
+        session,
+        text_splitter,
+        timeout: float = 30.0,
+        sparse_index: BM25Index | None = None,
+    ):
+        self.manifest = manifest
+        self.session = session
+        self.text_splitter = text_splitter
+        self.timeout = timeout
+        self.sparse_index = sparse_index
+
+        self._pending: dict[str, dict] = {}
+        self._stale_ids: list[str] = []
+        self._lock = threading.Lock()
+
+        self.counts = {
+            "pages_new": 0,
+            "pages_changed": 0,
+            "pages_unchanged": 0,
+            "pages_removed": 0,
+            "chunks_reused": 0,
+            "chunks_embedded": 0,
+            "chunks_deleted": 0,
+            "tokens_saved": 0,
+        }
+
+    def _count(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                self.counts[name] += count
+
+    def _needs_backfill(self, entry: dict | None) -> bool:
+        if entry is None or self.sparse_index is None:
+            return False
+        return any(doc_id not in self.sparse_index for doc_id in entry["chunk_ids"])
+
+    def fetch_page(self, url: str) -> list[Document]:
+        entry = self.manifest.get(url)
+        backfill = self._needs_backfill(entry)
+
+        headers = {}
+        if entry and entry.get("etag") and not backfill:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified") and not backfill:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            self._count(pages_unchanged=1, chunks_reused=len(entry["chunk_ids"]), tokens_saved=entry.get("tokens", 0))
+            return []
+        response.raise_for_status()
+
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": hashlib.sha256(response.content).hexdigest(),
+        }
+
+        if entry and entry["content_hash"] == validators["content_hash"] and not backfill:
+            with self._lock:
+                self._pending[url] = {**entry, **validators}
+            self._count(pages_unchanged=1, chunks_reused=len(entry["chunk_ids"]), tokens_saved=entry.get("tokens", 0))
+            return []
+
+        with self._lock:
+            self._pending[url] = validators
+        if entry and entry["content_hash"] == validators["content_hash"]:
+            self._count(pages_unchanged=1)
+        else:
+            self._count(**{"pages_changed" if entry else "pages_new": 1})
+
+        soup = BeautifulSoup(response.text, "html.parser")
+        return [Document(page_content=soup.get_text(), metadata=page_metadata(soup, url))]
+
+    def chunk_docs(self, docs: list[Document]) -> list[Document]:
+        """Chunk a fetched page and keep only the chunks that are not indexed yet."""
+        if not docs:
+            return []
+
+        url = docs[0].metadata["source"]
+        chunks = {}
+        for chunk in self.text_splitter.split_documents(docs):
+            chunk.id = chunk_id(url, chunk.page_content)
+            chunks.setdefault(chunk.id, chunk)
+
+        entry = self.manifest.get(url) or {}
+        indexed_ids = set(entry.get("chunk_ids", []))
+        tokens = {doc_id: count_tokens(chunk.page_content, model="text-embedding-3-large") for doc_id, chunk in chunks.items()}
+        new_chunks = [chunk for doc_id, chunk in chunks.items() if doc_id not in indexed_ids]
+        reused = [doc_id for doc_id in chunks if doc_id in indexed_ids]
+        stale = indexed_ids - set(chunks)
+
+        # Reused chunks are already embedded; the pipeline only adds the new ones.
+        if self.sparse_index is not None:
+            backfill = [chunks[doc_id] for doc_id in reused if doc_id not in self.sparse_index]
+            if backfill:
+                self.sparse_index.add(
+                    [chunk.id for chunk in backfill],
+                    [chunk.page_content for chunk in backfill],
+                    [chunk.metadata for chunk in backfill],
+                )
+
+        with self._lock:
+            self._pending[url].update(chunk_ids=list(chunks), tokens=sum(tokens.values()))
+            self._stale_ids.extend(stale)
+        self._count(
+            chunks_reused=len(reused),
+            chunks_embedded=len(new_chunks),
+            tokens_saved=sum(tokens[doc_id] for doc_id in reused),
+        )
+
+        return new_chunks
+
+    @staticmethod
+    def chunk_id(chunk: Document) -> str:
+        return chunk.id
+
+    def finish(self, vector_store: VectorStore, urls: list[str] | None = None, before_commit=None) -> dict:
+        """
+        Delete stale chunks and commit the manifest once every upsert succeeded.
+
+        Args:
+            vector_store: store the chunks were upserted to.
+            urls: full list of synced URLs; when given, pages missing from it are
+                removed from the index too.
+            before_commit: called after the deletes and before the manifest is
+                written, e.g. to persist a local store.
+
+        Returns:
+            Counts of new/changed/unchanged/removed pages and of reused, embedded and
+            deleted chunks, with the embedding tokens the sync did not have to pay.
+        """
+        stale_ids = list(self._stale_ids)
+        if urls is not None:
+            listed = set(urls)
+            for url in [url for url in self.manifest.entries if url not in listed]:
+                stale_ids.extend(self.manifest.entries.pop(url)["chunk_ids"])
+                self.counts["pages_removed"] += 1
+
+        for start in range(0, len(stale_ids), 1000):
+            vector_store.delete(ids=stale_ids[start:start + 1000])
+        if self.sparse_index is not None:
+            self.sparse_index.delete(stale_ids)
+        self.counts["chunks_deleted"] = len(stale_ids)
+
+        if before_commit is not None:
+            before_commit()
+
+        self.manifest.entries.update(self._pending)
+        self.manifest.save()
+        self._pending.clear()
+        self._stale_ids.clear()
+
+        logger.info(
+            f"Sync done: {self.counts['pages_new']} new, {self.counts['pages_changed']} changed, "
+            f"{self.counts['pages_unchanged']} unchanged, {self.counts['pages_removed']} removed pages | "
+            f"{self.counts['chunks_embedded']} chunks embedded, {self.counts['chunks_reused']} reused, "
+            f"{self.counts['chunks_deleted']} deleted | ~{self.counts['tokens_saved']} embedding tokens saved"
+        )
+        return dict(self.counts)
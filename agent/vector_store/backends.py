@@ -0,0 +1,132 @@
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from agent.vector_store.local_store import LocalVectorStore
+from agent.vector_store.sparse_index import BM25Index
+
+root_dir = Path().absolute()
+
+load_dotenv(dotenv_path=root_dir / ".env")
+
+INDEX_NAME = "web-ai-engineer-index"
+EMBEDDING_DIMENSION = 3072
+
+VECTOR_BACKENDS = ("pinecone", "local")
+
+
+def vector_backend() -> str:
+    """Vector backend selected by the VECTOR_STORE_BACKEND environment variable."""
+    backend = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{backend}', expected one of {VECTOR_BACKENDS}")
+    return backend
+
+
+def local_store_path(index_name: str = INDEX_NAME) -> Path:
+    return Path(os.getenv("LOCAL_VECTOR_STORE_PATH", root_dir / ".vector_store")) / index_name
+
+
+def sparse_index_path(index_name: str = INDEX_NAME) -> Path:
+    """Directory of the BM25 index built next to the vector index, whatever its backend."""
+    return Path(os.getenv("SPARSE_INDEX_PATH", root_dir / ".vector_store")) / f"{index_name}.bm25"
+
+
+def get_sparse_index(index_name: str = INDEX_NAME) -> BM25Index | None:
+    """Open the BM25 index of `index_name`, or None when it was never built."""
+    path = sparse_index_path(index_name)
+    if not BM25Index.exists(path):
+        return None
+
+    return BM25Index.load(path)
+
+
+def get_vector_store(embedding_model: Embeddings, index_name: str = INDEX_NAME, backend: str | None = None) -> VectorStore:
+    """
+    Open the vector store that backs retrieval.
+
+    Args:
+        embedding_model: embeddings used to embed queries.
+        index_name: Pinecone index name, or directory name of the local store.
+        backend: "pinecone" or "local", defaults to VECTOR_STORE_BACKEND.
+    """
+    backend = backend or vector_backend()
+
+    if backend == "local":
+        return LocalVectorStore.load(
+            local_store_path(index_name),
+            embedding_model,
+            mmap=os.getenv("LOCAL_VECTOR_STORE_MMAP", "true").lower() == "true",
+            n_probe=int(os.getenv("LOCAL_VECTOR_STORE_N_PROBE", "8")),
+        )
+
+    from pinecone import Pinecone
+    from langchain_pinecone import PineconeVectorStore
+
+    index = Pinecone().Index(index_name)
+    return PineconeVectorStore(index=index, embedding=embedding_model)
+
+
+def create_vector_store(embedding_model: Embeddings, index_name: str = INDEX_NAME, backend: str | None = None) -> VectorStore:
+    """
+    Open the vector store to ingest documents into, creating it when it does not
+    exist yet so that ingestion can be re-run.
+
+    For Pinecone this creates the serverless index, for the local backend an
+    in-memory store that is written to disk with `LocalVectorStore.save`.
+    """
+    backend = backend or vector_backend()
+
+    if backend == "local":
+        path = local_store_path(index_name)
+        n_probe = int(os.getenv("LOCAL_VECTOR_STORE_N_PROBE", "8"))
+        if (path / "vectors.npy").exists():
+            return LocalVectorStore.load(path, embedding_model, mmap=False, n_probe=n_probe)
+
+        return LocalVectorStore(
+            embedding_model,
+            dtype=os.getenv("LOCAL_VECTOR_STORE_DTYPE", "float32"),
+            n_probe=n_probe,
+        )
+
+    from pinecone import Pinecone, ServerlessSpec
+    from langchain_pinecone import PineconeVectorStore
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    if index_name not in pc.list_indexes().names():
+        pc.create_index(
+            name=index_name,
+            dimension=EMBEDDING_DIMENSION,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+        )
+
+    return PineconeVectorStore(index=pc.Index(index_name), embedding=embedding_model)
+
+
+def upsert_embeddings(
+    vector_store: VectorStore,
+    texts: list[str],
+    embeddings: list[list[float]],
+    metadatas: list[dict],
+    ids: list[str],
+    batch_size: int = 100,
+) -> None:
+    """
+    Write already embedded chunks to a vector store without embedding them again.
+
+    Pinecone receives the text under the store's text key, in upserts of at most
+    `batch_size` vectors (Pinecone caps the request size).
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        vector_store.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+        return
+
+    text_key = getattr(vector_store, "_text_key", "text")
+    vectors = [
+        (doc_id, list(vector), {**metadata, text_key: text})
+        for doc_id, vector, metadata, text in zip(ids, embeddings, metadatas, texts)
+    ]
+    for start in range(0, len(vectors), batch_size):
+        vector_store.index.upsert(vectors=vectors[start:start + batch_size])
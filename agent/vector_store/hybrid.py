@@ -0,0 +1,111 @@
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from agent.vector_store.sparse_index import BM25Index
+
+
+RELEVANCE_SCORE = "relevance_score"
+
+
+def with_relevance_scores(docs_and_scores: list[tuple[Document, float]]) -> list[Document]:
+    """Copy the documents with their dense relevance score (0 to 1) in the metadata."""
+    return [
+        Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, RELEVANCE_SCORE: score})
+        for doc, score in docs_and_scores
+    ]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[Document]],
+    weights: list[float] | None = None,
+    k: int = 60,
+) -> list[tuple[Document, float]]:
+    """
+    Fuse ranked lists with weighted reciprocal rank fusion: a document scores
+    sum(weight / (k + rank)) over the lists it appears in. Documents are matched on
+    their content, so the same chunk coming from two retrievers is counted once.
+
+    Args:
+        rankings: ranked documents of each retriever, best first.
+        weights: weight of each retriever, 1.0 for all by default.
+        k: rank offset, higher values flatten the contribution of the top ranks.
+
+    Returns:
+        The documents with their fused score, best first.
+    """
+    weights = weights if weights is not None else [1.0] * len(rankings)
+    if len(weights) != len(rankings):
+        raise ValueError("Expected one weight per ranking")
+
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, start=1):
+            documents.setdefault(doc.page_content, doc)
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + weight / (k + rank)
+
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [(documents[key], scores[key]) for key in fused]
+
+
+class DenseRetriever(BaseRetriever):
+    """Similarity search that keeps the relevance score of each document in its metadata."""
+
+    vector_store: VectorStore
+    k: int = 15
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return with_relevance_scores(self.vector_store.similarity_search_with_relevance_scores(query, k=self.k))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return with_relevance_scores(await self.vector_store.asimilarity_search_with_relevance_scores(query, k=self.k))
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense similarity search fused with BM25 keyword search by reciprocal rank fusion.
+
+    Keyword-heavy questions (model names, paper titles, acronyms) that embeddings
+    retrieve poorly are caught by the sparse index, so fewer candidates (`k`) are
+    needed for the same recall. Documents found by the dense search keep their
+    relevance score in the metadata.
+    """
+
+    vector_store: VectorStore
+    sparse_index: BM25Index
+    k: int = 10
+    dense_k: int = 20
+    sparse_k: int = 20
+    dense_weight: float = 1.0
+    sparse_weight: float = 1.0
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        dense = with_relevance_scores(self.vector_store.similarity_search_with_relevance_scores(query, k=self.dense_k))
+        return self._fuse(dense, query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        dense = with_relevance_scores(
+            await self.vector_store.asimilarity_search_with_relevance_scores(query, k=self.dense_k)
+        )
+        return self._fuse(dense, query)
+
+    def _fuse(self, dense: list[Document], query: str) -> list[Document]:
+        # The BM25 index is local and fast: it is searched inline in both versions.
+        sparse = [doc for doc, _ in self.sparse_index.search(query, k=self.sparse_k)]
+
+        fused = reciprocal_rank_fusion(
+            [dense, sparse],
+            weights=[self.dense_weight, self.sparse_weight],
+            k=self.rrf_k,
+        )
+        return [doc for doc, _ in fused[:self.k]]
@@ -0,0 +1,232 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+from uuid import uuid4
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store backed by a NumPy matrix of unit-normalized vectors.
+
+    Search is an exact top-k by cosine similarity (one matrix-vector product). For
+    larger corpora an IVF-style partitioning can be built with `build_ivf`: vectors
+    are clustered with spherical k-means and a query only scans the `n_probe`
+    closest partitions. A store can be saved to a directory and loaded back with
+    the vectors memory-mapped, as float32 or float16.
+    """
+
+    def __init__(self, embedding: Embeddings, dtype: str = "float32", n_probe: int = 8):
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be 'float32' or 'float16'")
+
+        self.embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self.n_probe = n_probe
+
+        self._vectors: np.ndarray | None = None
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict] = []
+        self._centroids: np.ndarray | None = None
+        self._assignments: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add_embeddings(
+        self,
+        texts: list[str],
+        embeddings: list[list[float]] | np.ndarray,
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """Add already embedded texts, replacing the ones whose id is already stored."""
+        ids = list(ids) if ids is not None else [str(uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32)).astype(self.dtype)
+
+        with self._lock:
+            existing = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            replaced = [doc_id for doc_id in ids if doc_id in existing]
+            if replaced:
+                self._delete_locked(replaced)
+
+            self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            self._metadatas.extend(metadatas)
+            # New vectors are not in any partition yet: fall back to exact search.
+            self._centroids = self._assignments = None
+
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding.embed_documents(texts), metadatas, ids)
+
+    def _delete_locked(self, ids: list[str]) -> None:
+        to_delete = set(ids)
+        keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in to_delete]
+        self._vectors = self._vectors[keep] if self._vectors is not None else None
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._centroids = self._assignments = None
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool:
+        with self._lock:
+            self._delete_locked(ids or [])
+        return True
+
+    def get_by_ids(self, ids: list[str]) -> list[Document]:
+        positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        return [self._document(positions[doc_id]) for doc_id in ids if doc_id in positions]
+
+    def _document(self, i: int) -> Document:
+        return Document(id=self._ids[i], page_content=self._texts[i], metadata=self._metadatas[i])
+
+    def build_ivf(self, n_lists: int | None = None, n_iter: int = 10, seed: int = 0) -> None:
+        """
+        Partition the vectors with spherical k-means so queries only scan the closest
+        partitions. `n_lists` defaults to sqrt(corpus size).
+        """
+        with self._lock:
+            if self._vectors is None or len(self._ids) == 0:
+                return
+
+            vectors = np.asarray(self._vectors, dtype=np.float32)
+            n_lists = min(n_lists or int(np.sqrt(len(vectors))), len(vectors))
+            rng = np.random.default_rng(seed)
+            centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)]
+
+            for _ in range(n_iter):
+                assignments = np.argmax(vectors @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = vectors[assignments == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+
+            self._centroids = centroids
+            self._assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray | None:
+        if self._centroids is None:
+            return None
+
+        n_probe = min(self.n_probe, len(self._centroids))
+        closest = np.argpartition(-(self._centroids @ query), n_probe - 1)[:n_probe]
+        return np.flatnonzero(np.isin(self._assignments, closest))
+
+    def similarity_search_by_vector_with_score(self, embedding: list[float], k: int = 4) -> list[tuple[Document, float]]:
+        with self._lock:
+            if self._vectors is None or len(self._ids) == 0:
+                return []
+
+            if k < 1:
+                return []
+
+            query = self._normalize(np.asarray(embedding, dtype=np.float32))
+            candidates = self._candidates(query)
+            if candidates is not None and len(candidates) < k:
+                # The probed partitions are empty or too small: search exactly.
+                candidates = None
+            matrix = self._vectors if candidates is None else self._vectors[candidates]
+            scores = (matrix @ query.astype(self.dtype)).astype(np.float32)
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            positions = top if candidates is None else candidates[top]
+
+            return [(self._document(int(i)), float(scores[j])) for i, j in zip(positions, top)]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        # Only the query embedding waits on the network; the search itself is in-process.
+        return self.similarity_search_by_vector_with_score(await self.embedding.aembed_query(query), k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2
+
+    def save(self, path: str | Path) -> None:
+        """Save vectors, documents and partitions to a directory."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            vectors = self._vectors if self._vectors is not None else np.zeros((0, 0), dtype=self.dtype)
+            np.save(path / "vectors.npy", np.ascontiguousarray(vectors, dtype=self.dtype))
+            with open(path / "documents.jsonl", "w", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(self._ids, self._texts, self._metadatas):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+            if self._centroids is not None:
+                np.savez(path / "ivf.npz", centroids=self._centroids, assignments=self._assignments)
+            elif (path / "ivf.npz").exists():
+                (path / "ivf.npz").unlink()
+
+    @classmethod
+    def load(cls, path: str | Path, embedding: Embeddings, mmap: bool = True, n_probe: int = 8) -> "LocalVectorStore":
+        """Load a saved store, memory-mapping the vector matrix unless `mmap` is False."""
+        path = Path(path)
+        vectors = np.load(path / "vectors.npy", mmap_mode="r" if mmap else None)
+
+        store = cls(embedding, dtype=vectors.dtype.name, n_probe=n_probe)
+        with open(path / "documents.jsonl", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                store._ids.append(record["id"])
+                store._texts.append(record["text"])
+                store._metadatas.append(record["metadata"])
+        store._vectors = vectors if store._ids else None
+
+        if (path / "ivf.npz").exists():
+            ivf = np.load(path / "ivf.npz")
+            store._centroids, store._assignments = ivf["centroids"], ivf["assignments"]
+
+        return store
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
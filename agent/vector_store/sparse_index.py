@@ -0,0 +1,236 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Words, keeping identifiers such as "gpt-4o", "llama-3.1" or "text_splitter" whole.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or that the their "
+    "there these this to was what when where which who why will with you your do does can".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercase word tokens without stopwords. Compound identifiers are kept whole and
+    their parts are added too, so "gpt-4o" matches both "gpt-4o" and "gpt".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_.]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+
+    return tokens
+
+
+class BM25Index:
+    """
+    Local sparse (keyword) index scored with Okapi BM25.
+
+    Documents are kept as term-frequency maps and compiled on first search into
+    CSR-style postings (per-term offsets into flat document-index and term-frequency
+    arrays), which are scored with NumPy. Documents with an id that is already
+    indexed replace it, so re-indexing the same chunks is idempotent.
+
+    On disk the index is a directory with the compiled postings in a compressed
+    `postings.npz` and the chunks in `documents.jsonl`.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict] = []
+        self._positions: dict[str, int] = {}
+        self._term_freqs: list[Counter] | None = []
+        self._lock = threading.Lock()
+
+        # Compiled postings, rebuilt after any change.
+        self._vocabulary: dict[str, int] | None = None
+        self._offsets: "np.ndarray | None" = None
+        self._doc_indexes: "np.ndarray | None" = None
+        self._frequencies: "np.ndarray | None" = None
+        self._doc_lengths: "np.ndarray | None" = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._positions
+
+    def _ensure_term_freqs(self) -> None:
+        # A loaded index only has compiled postings: rebuild the per-document maps
+        # before it is modified.
+        if self._term_freqs is None:
+            self._term_freqs = [Counter(tokenize(text)) for text in self._texts]
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict] | None = None) -> None:
+        """Index chunks, replacing the ones whose id is already indexed."""
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        term_freqs = [Counter(tokenize(text)) for text in texts]
+
+        with self._lock:
+            self._ensure_term_freqs()
+            self._delete_locked([doc_id for doc_id in ids if doc_id in self._positions])
+            for doc_id, text, metadata, freqs in zip(ids, texts, metadatas, term_freqs):
+                self._positions[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._texts.append(text)
+                self._metadatas.append(metadata)
+                self._term_freqs.append(freqs)
+            self._vocabulary = None
+
+    def _delete_locked(self, ids: list[str]) -> None:
+        to_delete = {doc_id for doc_id in ids if doc_id in self._positions}
+        if not to_delete:
+            return
+
+        keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in to_delete]
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._term_freqs = [self._term_freqs[i] for i in keep]
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._vocabulary = None
+
+    def delete(self, ids: list[str]) -> None:
+        with self._lock:
+            self._ensure_term_freqs()
+            self._delete_locked(ids)
+
+    def _compile_locked(self) -> None:
+        if self._vocabulary is not None:
+            return
+        # Imported on first use: tokenize() is needed by the graph long before any index.
+        import numpy as np
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for i, freqs in enumerate(self._term_freqs):
+            for term, freq in freqs.items():
+                postings.setdefault(term, []).append((i, freq))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for t, term in enumerate(terms):
+            offsets[t + 1] = offsets[t] + len(postings[term])
+
+        doc_indexes = np.empty(offsets[-1], dtype=np.int32)
+        frequencies = np.empty(offsets[-1], dtype=np.uint16)
+        for t, term in enumerate(terms):
+            entries = np.asarray(postings[term], dtype=np.int64)
+            doc_indexes[offsets[t]:offsets[t + 1]] = entries[:, 0]
+            frequencies[offsets[t]:offsets[t + 1]] = np.minimum(entries[:, 1], np.iinfo(np.uint16).max)
+
+        self._vocabulary = {term: t for t, term in enumerate(terms)}
+        self._offsets, self._doc_indexes, self._frequencies = offsets, doc_indexes, frequencies
+        self._doc_lengths = np.array([sum(freqs.values()) for freqs in self._term_freqs], dtype=np.int32)
+
+    def search(self, query: str, k: int = 10) -> list[tuple[Document, float]]:
+        """Top `k` chunks by BM25 score; chunks sharing no term with the query are left out."""
+        with self._lock:
+            if not self._ids:
+                return []
+            self._compile_locked()
+            import numpy as np
+
+            n_docs = len(self._ids)
+            doc_lengths = self._doc_lengths.astype(np.float32)
+            length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / max(doc_lengths.mean(), 1.0))
+            scores = np.zeros(n_docs, dtype=np.float32)
+
+            for term in set(tokenize(query)):
+                t = self._vocabulary.get(term)
+                if t is None:
+                    continue
+                start, end = self._offsets[t], self._offsets[t + 1]
+                docs = self._doc_indexes[start:end]
+                freqs = self._frequencies[start:end].astype(np.float32)
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + length_norm[docs])
+
+            matches = np.flatnonzero(scores > 0)
+            k = min(k, len(matches))
+            if k == 0:
+                return []
+            top = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                (Document(id=self._ids[i], page_content=self._texts[i], metadata=self._metadatas[i]), float(scores[i]))
+                for i in top
+            ]
+
+    def save(self, path: str | Path) -> None:
+        """Save the compiled postings and the chunks to a directory."""
+        import numpy as np
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            self._compile_locked()
+            terms = sorted(self._vocabulary, key=self._vocabulary.get)
+            # Write then rename so an interrupted save never leaves a half-written index.
+            with open(path / "postings.tmp.npz", "wb") as f:
+                np.savez_compressed(
+                    f,
+                    terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                    offsets=self._offsets,
+                    doc_indexes=self._doc_indexes,
+                    frequencies=self._frequencies,
+                    doc_lengths=self._doc_lengths,
+                    params=np.array([self.k1, self.b]),
+                )
+            with open(path / "documents.tmp.jsonl", "w", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(self._ids, self._texts, self._metadatas):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+
+        os.replace(path / "postings.tmp.npz", path / "postings.npz")
+        os.replace(path / "documents.tmp.jsonl", path / "documents.jsonl")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BM25Index":
+        import numpy as np
+
+        path = Path(path)
+        postings = np.load(path / "postings.npz")
+        k1, b = postings["params"]
+
+        index = cls(k1=float(k1), b=float(b))
+        with open(path / "documents.jsonl", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                index._positions[record["id"]] = len(index._ids)
+                index._ids.append(record["id"])
+                index._texts.append(record["text"])
+                index._metadatas.append(record["metadata"])
+
+        terms = postings["terms"].tobytes().decode("utf-8")
+        index._vocabulary = {term: t for t, term in enumerate(terms.split("\n"))} if terms else {}
+        index._offsets = postings["offsets"]
+        index._doc_indexes = postings["doc_indexes"]
+        index._frequencies = postings["frequencies"]
+        index._doc_lengths = postings["doc_lengths"]
+        index._term_freqs = None
+
+        return index
+
+    @staticmethod
+    def exists(path: str | Path) -> bool:
+        return (Path(path) / "postings.npz").exists()
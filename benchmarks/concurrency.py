@@ -0,0 +1,111 @@
+"""
+Concurrency benchmark of the agent graph.
+
+Runs `--conversations` independent conversations through the real graph, with
+every LLM, retrieval and web search call replaced by a fake that takes
+`--latency` seconds (see benchmarks/fakes.py), in two ways:
+
+- "threads": the sync graph (`invoke`) on a pool of `--threads` threads, one
+  conversation per thread at a time, like one request per worker thread.
+- "async": the async graph (`astream`) on a single event loop, every
+  conversation at once.
+
+For each latency it reports the wall time and the throughput. The threaded
+throughput is capped at threads / conversation latency, while the async one
+follows the number of conversations waiting on I/O, whatever the thread count,
+until the single event loop is busy with the CPU work of the graph. At low
+latencies both are CPU-bound and on par, so the run only fails when the async
+graph is not at least `--min-speedup` times faster at the highest latency, or
+gains less there than at the lowest one.
+
+Run it from the repository root with:
+    python -m benchmarks.concurrency
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from agent.lang_graph.graph import AdaptiveRAGGraph
+from agent.lang_graph.telemetry import Telemetry, configure_logging
+from benchmarks.fakes import register_fakes
+
+
+def conversation(question: str) -> tuple[dict, dict]:
+    return {"messages": [HumanMessage(content=question)]}, {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+
+def run_threads(agent, conversations: int, threads: int) -> float:
+    def run(i: int):
+        inputs, config = conversation(f"Question {i}")
+        return agent.invoke(inputs, config)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(run, range(conversations)))
+    return time.perf_counter() - start
+
+
+async def run_async(agent, conversations: int) -> float:
+    async def run(i: int):
+        inputs, config = conversation(f"Question {i}")
+        async for _ in agent.astream(inputs, config, stream_mode="updates"):
+            pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(conversations)))
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--latency", type=float, nargs="+", default=[0.02, 0.05, 0.1, 0.2],
+        help="seconds every fake LLM, retrieval and search call takes",
+    )
+    parser.add_argument(
+        "--min-speedup", type=float, default=2.0,
+        help="speedup of the async graph required at the highest latency",
+    )
+    parser.add_argument("--verbose", action="store_true", help="show the node logs")
+    args = parser.parse_args()
+    if args.verbose:
+        configure_logging()
+
+    results = []
+    for latency in args.latency:
+        register_fakes(latency=latency)
+        agent = AdaptiveRAGGraph(checkpointer=MemorySaver(), telemetry=Telemetry()).agent
+
+        # One run first, so lazy clients and graders are built outside the timings.
+        run_threads(agent, 1, 1)
+        threaded = run_threads(agent, args.conversations, args.threads)
+        concurrent = asyncio.run(run_async(agent, args.conversations))
+        results.append((latency, threaded, concurrent))
+
+    print(f"{args.conversations} conversations, {args.threads} threads for the sync graph")
+    print(f"{'latency':>8}{'threads':>10}{'conv/s':>9}{'async':>10}{'conv/s':>9}{'speedup':>9}")
+    for latency, threaded, concurrent in results:
+        print(
+            f"{latency * 1000:>6.0f}ms{threaded:>9.2f}s{args.conversations / threaded:>9.1f}"
+            f"{concurrent:>9.2f}s{args.conversations / concurrent:>9.1f}{threaded / concurrent:>8.1f}x"
+        )
+
+    speedups = {latency: threaded / concurrent for latency, threaded, concurrent in results}
+    highest, lowest = max(speedups), min(speedups)
+    if speedups[highest] < args.min_speedup:
+        print(f"FAIL: the async graph is only {speedups[highest]:.1f}x faster at {highest * 1000:.0f}ms")
+        return 1
+    if speedups[highest] < speedups[lowest]:
+        print("FAIL: the async speedup does not grow with the latency")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
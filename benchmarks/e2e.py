@@ -0,0 +1,328 @@
+"""
+End-to-end benchmark of the agent graph, offline and deterministic.
+
+Runs `AdaptiveRAGGraph` with its real prompts, chains, graders, reranker and
+context packing, against stand-in models (see benchmarks/fakes.py): a chat model
+behind every gpt-4o-mini chain and a generator, both taking `--latency` seconds
+plus their output tokens at `--tokens-per-second`, hash embeddings over a local
+vector store of a synthetic corpus, and a search tool. The structured outputs
+are scripted per scenario, so every path of the graph is covered:
+
+- "web_search": routed to web search, the answer passes both graders.
+- "vectorstore": routed to the vector store, every document is relevant.
+- "rewrite_loop": no document is relevant until the question was rewritten once.
+- "regeneration": the first answer is not grounded and is generated again.
+
+Each scenario answers `--questions` questions, one thread each, `--repeats`
+times, and checks that every run took its path. It reports the p50/p95/p99
+latency, the LLM calls per node and the prompt/completion tokens per question.
+
+The results are compared with the baseline file (benchmarks/baselines/e2e.json).
+The LLM calls and tokens are deterministic: the run fails when a scenario makes
+more LLM calls per node, or uses more tokens per question (within
+`--token-tolerance`), than its baseline. Latency depends on the machine and its
+load, so only the median of the p50 of every repeat is compared, and only fails
+beyond `--latency-tolerance`; the tail percentiles are reported, not gated.
+After an intended change, record a new baseline with `--save-baseline`.
+
+Run it from the repository root with:
+    python -m benchmarks.e2e
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from langchain_core.messages import BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from agent.lang_graph import resources
+from agent.lang_graph.graph import AdaptiveRAGGraph
+from agent.lang_graph.memory import message_text
+from agent.lang_graph.prompts import REWRITE_SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT
+from agent.lang_graph.telemetry import Telemetry, configure_logging
+from benchmarks.fakes import FakeChatModel, UsageRecorder, register_models
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "e2e.json"
+
+# Node whose LLM calls each structured output belongs to.
+SCHEMA_NODES = {
+    "RouteQuery": "route_question",
+    "GradeDocuments": "grade_documents",
+    "GradeDocumentsBatch": "grade_documents",
+    "GradeHallucinations": "grade_generation",
+    "GradeAnswer": "grade_generation",
+}
+
+TOPICS = [
+    "agents planning memory tools reflection task decomposition",
+    "prompt engineering chain of thought few shot instructions",
+    "adversarial attacks jailbreak prompt injection robustness",
+    "retrieval augmented generation embeddings vector search chunks",
+]
+
+
+class Scenario:
+    """
+    Script of the stand-in LLMs for one graph path.
+
+    Args:
+        route: datasource picked by the router.
+        rewrites: rewrites before the documents are graded relevant.
+        regenerations: generations before an answer is graded grounded.
+        expected: minimum number of times each node runs per question.
+    """
+
+    def __init__(self, route: str, expected: dict[str, int], rewrites: int = 0, regenerations: int = 0):
+        self.route = route
+        self.rewrites = rewrites
+        self.regenerations = regenerations
+        self.expected = expected
+        self.usage = UsageRecorder()
+
+    @staticmethod
+    def node_of(schema: str | None, messages: list[BaseMessage]) -> str:
+        if schema is not None:
+            return SCHEMA_NODES[schema]
+        if message_text(messages[0]).startswith(SUMMARY_SYSTEM_PROMPT.split("{")[0]):
+            return "update_memory"
+        return "rewrite_query"
+
+    def respond(self, schema: str | None, messages: list[BaseMessage]) -> str:
+        """Answer of the gpt-4o-mini stand-in."""
+        prompt = message_text(messages[-1])
+        if schema == "RouteQuery":
+            return json.dumps({"datasource": self.route})
+        if schema == "GradeDocuments":
+            relevant = self.usage.calls["rewrite_query"] >= self.rewrites
+            return json.dumps({"binary_score": "yes" if relevant else "no"})
+        if schema == "GradeDocumentsBatch":
+            relevant = self.usage.calls["rewrite_query"] >= self.rewrites
+            ids = re.findall(r'<document id="(\d+)">', prompt)
+            verdicts = [{"document_id": int(i), "binary_score": "yes" if relevant else "no"} for i in ids]
+            return json.dumps({"verdicts": verdicts})
+        if schema == "GradeHallucinations":
+            grounded = self.usage.calls["generate"] > self.regenerations
+            return json.dumps({"binary_score": "yes" if grounded else "no"})
+        if schema == "GradeAnswer":
+            return json.dumps({"binary_score": "yes"})
+
+        if message_text(messages[0]).startswith(REWRITE_SYSTEM_PROMPT):
+            question = prompt.split("\n\n", 1)[-1].split("\n Formulate")[0].strip()
+            return f"What does the literature say about {question}?"
+        return "The user asked about agents, prompting and attacks; the answers cited the retrieved posts."
+
+    def generate(self, thinking_tokens: int, answer_tokens: int):
+        """Answer of the generator stand-in: a thinking block and a text block."""
+        def respond(schema: str | None, messages: list[BaseMessage]) -> list:
+            attempt = self.usage.calls["generate"] + 1
+            return [
+                {"type": "thinking", "thinking": words(f"Reasoning {attempt}", thinking_tokens), "signature": "sig"},
+                {"type": "text", "text": words(f"Answer {attempt}", answer_tokens)},
+            ]
+
+        return respond
+
+
+SCENARIOS = {
+    "web_search": lambda: Scenario("web_search", {"web_search": 1, "generate": 1, "grade_generation": 1}),
+    "vectorstore": lambda: Scenario(
+        "vectorstore", {"retrieve_documents": 1, "grade_documents": 1, "generate": 1, "grade_generation": 1}
+    ),
+    "rewrite_loop": lambda: Scenario(
+        "vectorstore", {"rewrite_query": 1, "retrieve_documents": 2, "grade_documents": 2, "generate": 1}, rewrites=1
+    ),
+    "regeneration": lambda: Scenario(
+        "vectorstore", {"retrieve_documents": 1, "generate": 2, "grade_generation": 2}, regenerations=1
+    ),
+}
+
+
+def words(prefix: str, tokens: int) -> str:
+    """Text of about `tokens` stand-in tokens (4 characters each)."""
+    return (f"{prefix} " + "lorem ipsum dolor sit amet " * (tokens // 6 + 1))[:tokens * 4]
+
+
+def corpus(n_docs: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    """Documents and questions on the topics of the vector store."""
+    rng = np.random.default_rng(seed)
+    filler = ["the", "a", "model", "paper", "results", "method", "shows", "using", "with", "large", "language"]
+
+    docs = []
+    for i in range(n_docs):
+        topic = TOPICS[i % len(TOPICS)].split()
+        text = list(rng.choice(topic, size=12)) + list(rng.choice(filler, size=40))
+        rng.shuffle(text)
+        docs.append(f"Post {i}: " + " ".join(text) + ".")
+
+    questions = []
+    for i in range(n_docs):
+        topic = TOPICS[i % len(TOPICS)].split()
+        questions.append("How do " + " ".join(rng.choice(topic, size=4, replace=False)) + " work?")
+    return docs, questions
+
+
+def run_scenario(name: str, args, docs: list[str], questions: list[str]) -> dict:
+    scenario = SCENARIOS[name]()
+    llm = FakeChatModel(
+        respond=scenario.respond,
+        node_of=scenario.node_of,
+        usage=scenario.usage,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+    )
+    generator = FakeChatModel(
+        respond=scenario.generate(args.thinking_tokens, args.answer_tokens),
+        node_of=lambda schema, messages: "generate",
+        usage=scenario.usage,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+    )
+    resources.reset()
+    register_models(llm, generator, docs, embedding_latency=args.embedding_latency, search_latency=args.latency)
+    agent = AdaptiveRAGGraph(checkpointer=MemorySaver(), telemetry=Telemetry()).agent
+
+    def ask(question: str) -> tuple[float, Counter]:
+        scenario.usage.reset()
+        inputs = {"messages": [HumanMessage(content=question)]}
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        visits = Counter()
+
+        start = time.perf_counter()
+        if args.use_async:
+            async def run():
+                async for update in agent.astream(inputs, config, stream_mode="updates"):
+                    visits.update(update.keys())
+
+            asyncio.run(run())
+        else:
+            for update in agent.stream(inputs, config, stream_mode="updates"):
+                visits.update(update.keys())
+        return time.perf_counter() - start, visits
+
+    latencies, medians, calls, prompt_tokens, completion_tokens = [], [], Counter(), 0, 0
+    # One question first, so lazy clients and graders are built outside the timings.
+    ask(questions[-1])
+    for _ in range(args.repeats):
+        repeat = []
+        for question in questions[:args.questions]:
+            seconds, visits = ask(question)
+            missing = {node: n for node, n in scenario.expected.items() if visits[node] < n}
+            if missing:
+                raise AssertionError(f"{name}: expected {scenario.expected}, the graph ran {dict(visits)}")
+
+            usage = scenario.usage.snapshot()
+            repeat.append(seconds)
+            calls.update(usage["calls"])
+            prompt_tokens += usage["prompt_tokens"]
+            completion_tokens += usage["completion_tokens"]
+        latencies += repeat
+        medians.append(float(np.median(repeat)))
+
+    n = len(latencies)
+    p95, p99 = np.percentile(latencies, [95, 99])
+    return {
+        # Median of the per-repeat medians: the only latency the gate compares.
+        "p50": round(float(np.median(medians)), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "llm_calls": round(sum(calls.values()) / n, 2),
+        "llm_calls_per_node": {node: round(count / n, 2) for node, count in sorted(calls.items())},
+        "prompt_tokens": round(prompt_tokens / n, 1),
+        "completion_tokens": round(completion_tokens / n, 1),
+    }
+
+
+def regressions(results: dict, baseline: dict, latency_tolerance: float, token_tolerance: float) -> list[str]:
+    """Every metric of `results` worse than its baseline, beyond the tolerances."""
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get("scenarios", {}).get(name)
+        if expected is None:
+            continue
+
+        if result["p50"] > expected["p50"] * (1 + latency_tolerance):
+            failures.append(f"{name}: p50 {result['p50'] * 1000:.0f}ms > baseline {expected['p50'] * 1000:.0f}ms")
+        for node, count in result["llm_calls_per_node"].items():
+            if count > expected["llm_calls_per_node"].get(node, 0):
+                failures.append(f"{name}: {count} {node} LLM calls > baseline {expected['llm_calls_per_node'].get(node, 0)}")
+        for key in ("prompt_tokens", "completion_tokens"):
+            if result[key] > expected[key] * (1 + token_tolerance):
+                failures.append(f"{name}: {result[key]:.0f} {key} > baseline {expected[key]:.0f}")
+
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--questions", type=int, default=10, help="questions per scenario and repeat")
+    parser.add_argument("--repeats", type=int, default=3, help="runs of the questions of every scenario")
+    parser.add_argument("--docs", type=int, default=200, help="documents in the vector store")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds before the first token of an LLM or search call")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="output rate of the stand-in LLMs")
+    parser.add_argument("--embedding-latency", type=float, default=0.01, help="seconds of an embedding call")
+    parser.add_argument("--thinking-tokens", type=int, default=100)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="run the async graph (astream)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="allowed p50 latency growth, as a fraction")
+    parser.add_argument("--token-tolerance", type=float, default=0.02, help="allowed token growth, as a fraction")
+    parser.add_argument("--verbose", action="store_true", help="show the node logs")
+    args = parser.parse_args()
+    if args.verbose:
+        configure_logging()
+
+    docs, questions = corpus(args.docs)
+    results = {name: run_scenario(name, args, docs, questions) for name in args.scenarios}
+    resources.reset()
+
+    print(f"{args.questions} questions x {args.repeats} repeats per scenario, {'async' if args.use_async else 'sync'} graph")
+    print(f"{'scenario':<14}{'p50':>8}{'p95':>8}{'p99':>8}{'LLM calls':>11}{'prompt tok':>12}{'output tok':>12}")
+    for name, r in results.items():
+        print(
+            f"{name:<14}{r['p50'] * 1000:>6.0f}ms{r['p95'] * 1000:>6.0f}ms{r['p99'] * 1000:>6.0f}ms"
+            f"{r['llm_calls']:>11.1f}{r['prompt_tokens']:>12.0f}{r['completion_tokens']:>12.0f}"
+        )
+    print("LLM calls per question and node:")
+    for name, r in results.items():
+        print(f"  {name:<12} " + ", ".join(f"{node} {count:g}" for node, count in r["llm_calls_per_node"].items()))
+
+    settings = {
+        key: getattr(args, key)
+        for key in ("questions", "repeats", "docs", "latency", "tokens_per_second", "embedding_latency", "thinking_tokens", "answer_tokens", "use_async")
+    }
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"scenarios": {}}
+        baseline["settings"] = settings
+        baseline["scenarios"].update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, record one with --save-baseline")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("settings") != settings:
+        print(f"WARNING: the baseline was recorded with other settings: {baseline.get('settings')}")
+
+    failures = regressions(results, baseline, args.latency_tolerance, args.token_tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if failures:
+        return 1
+
+    print("No regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
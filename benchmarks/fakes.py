@@ -0,0 +1,236 @@
+"""
+Offline stand-ins for the LLM chains, the retriever, the web search tool and the
+generator, registered in the resource registry so the real graph runs without any
+network. Every fake waits `latency` seconds like a remote call: `time.sleep` under
+invoke and `asyncio.sleep` under ainvoke, so the sync and async graphs pay the
+same I/O time.
+
+`register_fakes` replaces whole chains with canned answers. `FakeChatModel`,
+`HashEmbeddings` and `register_models` go one level lower: they stand in for the
+chat models, the embedding model, the vector store and the search tool, so the
+real prompts, chains, structured-output parsing and retrieval all run.
+"""
+import asyncio
+import threading
+import time
+import zlib
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Callable
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from agent.lang_graph import resources
+from agent.lang_graph.memory import message_text
+from agent.lang_graph.tokens import CHARS_PER_TOKEN
+
+
+def fake(respond, latency: float) -> RunnableLambda:
+    """Runnable answering `respond(input)` after `latency` seconds, sync and async."""
+    def invoke(value):
+        time.sleep(latency)
+        return respond(value)
+
+    async def ainvoke(value):
+        await asyncio.sleep(latency)
+        return respond(value)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def register_fakes(
+    latency: float = 0.05,
+    route: str = "vectorstore",
+    documents: int = 4,
+    relevant: str = "yes",
+    grounded: str = "yes",
+    useful: str = "yes",
+) -> None:
+    """
+    Register fakes for every remote dependency of the graph.
+
+    Args:
+        latency: seconds every fake call takes.
+        route: datasource picked by the router ("vectorstore" or "web_search").
+        documents: number of documents retrieved per question.
+        relevant, grounded, useful: binary scores of the document, hallucination
+            and answer graders.
+    """
+    def retrieve(question: str) -> list[Document]:
+        return [
+            Document(page_content=f"Passage {i} about {question}.", metadata={"source": f"doc-{i}"})
+            for i in range(documents)
+        ]
+
+    resources.register("query_router_chain", fake(lambda _: SimpleNamespace(datasource=route), latency))
+    resources.register("document_grader_chain", fake(lambda _: SimpleNamespace(binary_score=relevant), latency))
+    resources.register("hallucination_grader_chain", fake(lambda _: SimpleNamespace(binary_score=grounded), latency))
+    resources.register("answer_grader_chain", fake(lambda _: SimpleNamespace(binary_score=useful), latency))
+    resources.register("question_rewriter_chain", fake(lambda value: value["question"] + " (rewritten)", latency))
+    resources.register("conversation_summary_chain", fake(lambda value: f"Summary: {value['conversation'][:200]}", latency))
+    resources.register("retriever", fake(retrieve, latency))
+    resources.register("web_search_tool", fake(lambda value: [{"content": f"Web result for {value['query']}."}], latency))
+    resources.register("generator", fake(lambda _: AIMessage(content="A grounded and useful answer."), latency))
+
+
+def fake_tokens(text: str) -> int:
+    """Token count of the stand-ins: characters / 4, the same with or without tiktoken."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class UsageRecorder:
+    """Thread-safe tally of the stand-in LLM calls and tokens, per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls: Counter = Counter()
+            self.prompt_tokens: Counter = Counter()
+            self.completion_tokens: Counter = Counter()
+
+    def record(self, node: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.calls[node] += 1
+            self.prompt_tokens[node] += prompt_tokens
+            self.completion_tokens[node] += completion_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "prompt_tokens": sum(self.prompt_tokens.values()),
+                "completion_tokens": sum(self.completion_tokens.values()),
+            }
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering `respond(schema, messages)` after `latency` seconds plus
+    the time to emit its output at `tokens_per_second`.
+
+    `schema` is the name of the structured-output model the call was made for
+    (e.g. "GradeDocuments"), or None for a plain text call; `respond` returns the
+    text of the answer, or its JSON for structured calls, which is parsed by the
+    schema like a real tool call would be. Every call is recorded in `usage` under
+    the node `node_of(schema, messages)` names.
+    """
+
+    respond: Callable[[str | None, list[BaseMessage]], str | list]
+    node_of: Callable[[str | None, list[BaseMessage]], str]
+    usage: UsageRecorder
+    latency: float = 0.05
+    tokens_per_second: float = 2000.0
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def with_structured_output(self, schema, **kwargs: Any):
+        return self.bind(schema=schema.__name__) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
+
+    def _answer(self, messages: list[BaseMessage], schema: str | None) -> tuple[AIMessage, float]:
+        content = self.respond(schema, messages)
+        prompt_tokens = sum(fake_tokens(message_text(m)) for m in messages)
+        # Thinking blocks are billed as output tokens too.
+        output = content if isinstance(content, str) else "".join(
+            block.get("text") or block.get("thinking", "") for block in content
+        )
+        completion_tokens = fake_tokens(output)
+        self.usage.record(self.node_of(schema, messages), prompt_tokens, completion_tokens)
+
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return message, self.latency + completion_tokens / self.tokens_per_second
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, schema: str | None = None, **kwargs) -> ChatResult:
+        message, seconds = self._answer(messages, schema)
+        time.sleep(seconds)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, schema: str | None = None, **kwargs) -> ChatResult:
+        message, seconds = self._answer(messages, schema)
+        await asyncio.sleep(seconds)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Stand-in embedding model: a text is the normalized sum of a random vector per
+    word, seeded by the word, so texts sharing words are similar. Every call waits
+    `latency` seconds like a request to an embedding API.
+    """
+
+    def __init__(self, size: int = 256, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size)
+        for word in text.lower().split():
+            vector += np.random.default_rng(zlib.crc32(word.encode("utf-8"))).standard_normal(self.size)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+def register_models(
+    llm: FakeChatModel,
+    generator: FakeChatModel,
+    texts: list[str],
+    embedding_latency: float = 0.0,
+    search_latency: float = 0.05,
+    k: int = 15,
+) -> None:
+    """
+    Register the stand-in models: `llm` behind every gpt-4o-mini chain, `generator`
+    as the answer model, a local vector store of `texts` with hash embeddings
+    behind a dense retriever of `k` documents, and a search tool.
+    """
+    from agent.vector_store.hybrid import DenseRetriever
+    from agent.vector_store.local_store import LocalVectorStore
+
+    embeddings = HashEmbeddings(latency=embedding_latency)
+    store = LocalVectorStore(embeddings)
+    store.add_texts(texts, metadatas=[{"source": f"doc-{i}"} for i in range(len(texts))])
+
+    resources.register("gpt_4o_mini", llm)
+    resources.register("generator", generator)
+    resources.register("embedding_model", embeddings)
+    resources.register("vector_store", store)
+    resources.register("retriever", DenseRetriever(vector_store=store, k=k))
+    resources.register(
+        "web_search_tool",
+        fake(lambda value: [{"content": f"Web result {i} for {value['query']}."} for i in range(3)], search_latency),
+    )
@@ -0,0 +1,109 @@
+"""
+Listwise vs pointwise document grading, against the real grader and retriever.
+
+For every question it retrieves documents with the configured retriever (the same
+one the graph uses), grades them once pointwise (one gpt-4o-mini call per
+document, "concurrent" mode) and once listwise (batched calls, "listwise" mode),
+and reports how often the two agree, with the LLM calls, prompt tokens and time
+of each mode. It fails when the agreement is below `--min-agreement`, i.e. when
+listwise grading changes which documents reach generation too often to be a safe
+replacement.
+
+It needs OPENAI_API_KEY and an ingested vector store: the stand-in graders of the
+other benchmarks return scripted verdicts, so they always agree and cannot
+measure this.
+
+Run it from the repository root with:
+    python -m benchmarks.grading --questions questions.txt
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from agent.lang_graph import chains, resources
+from agent.lang_graph.grading import DocumentGrader, grading_agreement
+
+DEFAULT_QUESTIONS = [
+    "What is task decomposition for LLM agents?",
+    "How does chain of thought prompting work?",
+    "What are the types of memory in an LLM agent?",
+    "How do adversarial attacks on LLMs work?",
+    "What is few-shot prompting?",
+    "How can an agent use external tools?",
+    "What is self-reflection in autonomous agents?",
+    "How does the ReAct framework combine reasoning and acting?",
+]
+
+
+def load_questions(path: Path | None) -> list[str]:
+    """Questions of a text file (one per line) or a JSONL file of {"question": ...} lines."""
+    if path is None:
+        return DEFAULT_QUESTIONS
+
+    lines = [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return [json.loads(line)["question"] if line.startswith("{") else line for line in lines]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, help="text file (one question per line) or JSONL with a question field")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-batch-tokens", type=int, default=8000, help="prompt budget of a listwise batch")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per grade or batch")
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="fraction of verdicts both modes must share")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("FAIL: set OPENAI_API_KEY, this benchmark grades with the real model")
+        return 1
+
+    options = {"max_concurrency": args.max_concurrency, "timeout": args.timeout}
+    pointwise = DocumentGrader(chains.document_grader_chain(), mode="concurrent", **options)
+    listwise = DocumentGrader(
+        chains.document_grader_chain(),
+        mode="listwise",
+        batch_grader_chain=chains.batch_document_grader_chain(),
+        max_batch_tokens=args.max_batch_tokens,
+        **options,
+    )
+
+    totals = {name: {"llm_calls": 0, "prompt_tokens": 0, "time": 0.0, "relevant": 0} for name in ("pointwise", "listwise")}
+    agreeing, graded = 0, 0
+    print(f"{'agreement':>10}{'docs':>6}{'pointwise yes':>15}{'listwise yes':>14}  question")
+    for question in load_questions(args.questions):
+        docs = resources.retriever().invoke(question)
+        _, point_report = pointwise.grade(docs, question)
+        _, list_report = listwise.grade(docs, question)
+
+        for name, report in (("pointwise", point_report), ("listwise", list_report)):
+            totals[name]["llm_calls"] += report["llm_calls"]
+            totals[name]["prompt_tokens"] += report["prompt_tokens"]
+            totals[name]["time"] += report["total_time"]
+            totals[name]["relevant"] += report["verdicts"].count("yes")
+
+        agreement = grading_agreement(point_report["verdicts"], list_report["verdicts"])
+        agreeing += round(agreement * len(docs))
+        graded += len(docs)
+        print(
+            f"{agreement:>10.2f}{len(docs):>6}{point_report['verdicts'].count('yes'):>15}"
+            f"{list_report['verdicts'].count('yes'):>14}  {question}"
+        )
+
+    print(f"{'mode':<10}{'LLM calls':>11}{'prompt tok':>12}{'time':>9}{'relevant':>10}")
+    for name, total in totals.items():
+        print(
+            f"{name:<10}{total['llm_calls']:>11}{total['prompt_tokens']:>12}"
+            f"{total['time']:>8.1f}s{total['relevant']:>10}"
+        )
+
+    overall = agreeing / graded if graded else 1.0
+    print(f"Agreement over {graded} documents: {overall:.3f}")
+    if overall < args.min_agreement:
+        print(f"FAIL: listwise and pointwise grading agree on only {overall:.1%} of the documents")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Conversation persistence benchmark of the chat front end.
+
+Replays conversations of `--turns` turns (a question, then an answer with thinking
+and text) and saves the thread after every answer through ChatMemoryClient,
+against an in-process stand-in of the chat-memory API that records every payload:
+
+- "full": the previous behaviour, converting the whole thread and PATCHing every
+  message after each answer.
+- "delta": `persist`, converting and appending only the messages added since the
+  last save.
+
+Reports the payload of the last turn, the bytes sent over the whole conversation
+and the time spent converting and serializing, for every conversation length.
+
+Run it from the repository root with:
+    python -m benchmarks.persistence
+"""
+import argparse
+import json
+import sys
+import time
+from langchain_core.messages import AIMessage, HumanMessage
+from agent.lang_graph import resources
+from front_end.utils.chat_memory import ChatMemoryClient
+from front_end.utils.message_utils import convert_messages_to_save
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload: dict | None = None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self) -> dict:
+        return self.payload
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeChatMemoryAPI:
+    """Stand-in of the chat-memory API session: keeps the threads and counts bytes."""
+
+    def __init__(self):
+        self.threads: dict[str, list] = {}
+        self.bytes_sent = 0
+        self.last_payload = 0
+
+    def _send(self, payload: dict) -> None:
+        self.last_payload = len(json.dumps(payload).encode("utf-8"))
+        self.bytes_sent += self.last_payload
+
+    def post(self, url: str, json: dict, timeout=None) -> FakeResponse:
+        self._send(json)
+        if url.endswith("/messages"):
+            thread_id = url.rsplit("/", 2)[-2]
+            if len(self.threads.get(thread_id, [])) != json["expected_count"]:
+                return FakeResponse(409)
+            self.threads[thread_id].extend(json["messages"])
+            return FakeResponse(200)
+
+        self.threads[json["thread_id"]] = [[json["first_message_role"], json["first_message_content"]]]
+        return FakeResponse(200)
+
+    def patch(self, url: str, json: dict, timeout=None) -> FakeResponse:
+        self._send(json)
+        self.threads[json["thread_id"]] = list(json["messages"])
+        return FakeResponse(200)
+
+
+def answer(turn: int, thinking_chars: int, text_chars: int) -> AIMessage:
+    return AIMessage(content=[
+        {"type": "thinking", "thinking": (f"Reasoning about turn {turn}. " * thinking_chars)[:thinking_chars], "signature": "sig"},
+        {"type": "text", "text": (f"Answer of turn {turn}. " * text_chars)[:text_chars]},
+    ])
+
+
+def run(mode: str, turns: int, args) -> dict:
+    api = FakeChatMemoryAPI()
+    resources.register("chat_memory_http_session", api)
+    client = ChatMemoryClient("http://chat-memory")
+    client.append_supported = mode == "delta"
+
+    thread_id = f"{mode}-{turns}"
+    messages = []
+    busy = 0.0
+    for turn in range(turns):
+        question = f"Question {turn} about retrieval augmented generation?"
+        messages.append(HumanMessage(content=question))
+        if turn == 0:
+            client.create_conversation("session", thread_id, "Benchmark", question)
+        messages.append(answer(turn, args.thinking_chars, args.text_chars))
+
+        start = time.perf_counter()
+        if mode == "delta":
+            client.persist(thread_id, lambda offset: messages[offset:], convert_messages_to_save)
+        else:
+            client.update_messages(thread_id, convert_messages_to_save(messages))
+        busy += time.perf_counter() - start
+
+    assert api.threads[thread_id] == convert_messages_to_save(messages), f"{mode} saved a different thread"
+    return {"last_payload": api.last_payload, "bytes_sent": api.bytes_sent, "busy": busy}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--thinking-chars", type=int, default=1500)
+    parser.add_argument("--text-chars", type=int, default=2500)
+    args = parser.parse_args()
+
+    print(f"{'turns':>6}{'mode':>7}{'last payload':>14}{'bytes sent':>14}{'save time':>11}")
+    for turns in args.turns:
+        for mode in ("full", "delta"):
+            r = run(mode, turns, args)
+            print(f"{turns:>6}{mode:>7}{r['last_payload']:>14,}{r['bytes_sent']:>14,}{r['busy'] * 1000:>9.1f}ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
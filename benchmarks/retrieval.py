@@ -0,0 +1,172 @@
+"""
+Offline retrieval benchmark: dense vs BM25 vs hybrid (reciprocal rank fusion).
+
+For every labeled question it reports recall@k and MRR, how many documents each
+retriever sends to grading, and how many questions would trigger a rewrite loop
+(no relevant document retrieved, so grading filters everything out).
+
+By default it runs on a synthetic corpus, with no network involved. Every chunk
+names a unique identifier (like model names and paper titles do) and a handful of
+concepts. Half of the questions quote the identifier, the other half paraphrase
+the concepts with synonyms. The stand-in embedding model understands synonyms but
+represents rare identifiers poorly, like real dense models do. With `--dataset`
+it runs the real indexes (VECTOR_STORE_BACKEND, the BM25 index built by
+WebPageLoader) on a JSONL file of {"question": ..., "relevant_ids": [...]} lines.
+
+Run it from the repository root with:
+    python -m benchmarks.retrieval
+"""
+import argparse
+import json
+import sys
+import zlib
+from pathlib import Path
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from agent.vector_store.hybrid import HybridRetriever
+from agent.vector_store.local_store import LocalVectorStore
+from agent.vector_store.sparse_index import BM25Index, tokenize
+
+
+class ConceptEmbeddings(Embeddings):
+    """
+    Stand-in dense model: a text is the sum of the vectors of its concepts, with
+    both synonyms of a concept sharing one vector. Tokens that are not concepts
+    (identifiers, filler) get a weak random vector of their own.
+    """
+
+    def __init__(self, synonyms: dict[str, str], size: int = 256, identifier_weight: float = 0.15):
+        self.synonyms = synonyms
+        self.size = size
+        self.identifier_weight = identifier_weight
+
+    def _vector(self, token: str) -> np.ndarray:
+        return np.random.default_rng(zlib.crc32(token.encode("utf-8"))).standard_normal(self.size)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = np.zeros(self.size)
+        for token in tokenize(text):
+            if token in self.synonyms:
+                vector += self._vector(self.synonyms[token])
+            else:
+                vector += self.identifier_weight * self._vector(token)
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+def synthetic_corpus(n_docs: int, n_topics: int = 12, concepts_per_topic: int = 40, seed: int = 0):
+    """Chunks, labeled questions and the synonym table of the stand-in embeddings."""
+    rng = np.random.default_rng(seed)
+    syllables = ["ka", "lo", "mi", "ra", "te", "vo", "su", "ne", "pi", "da", "fe", "gu"]
+
+    def word() -> str:
+        return "".join(rng.choice(syllables, size=4))
+
+    topics = [[(word(), word()) for _ in range(concepts_per_topic)] for _ in range(n_topics)]
+    synonyms = {}
+    for concepts in topics:
+        for concept, synonym in concepts:
+            synonyms[concept] = synonyms[synonym] = concept
+    filler = [word() for _ in range(200)]
+
+    docs, questions = [], []
+    for i in range(n_docs):
+        concepts = topics[i % n_topics]
+        own = [concepts[j] for j in rng.choice(len(concepts), size=8, replace=False)]
+        identifier = f"{word()}-{i}"
+        words = [concept for concept, _ in own] + list(rng.choice(filler, size=20)) + [identifier, identifier]
+        rng.shuffle(words)
+        docs.append(Document(id=f"chunk-{i}", page_content=" ".join(words)))
+
+        if i % 2 == 0:
+            question = f"{identifier} {own[0][0]}"
+        else:
+            question = " ".join(synonym for _, synonym in own[:5])
+        questions.append({"question": question, "relevant_ids": [f"chunk-{i}"]})
+
+    return docs, questions, synonyms
+
+
+def evaluate(retrieve, questions: list[dict], k: int) -> dict:
+    hits, reciprocal_ranks, sent_to_grading = 0, 0.0, 0
+    for item in questions:
+        docs = retrieve(item["question"])[:k]
+        sent_to_grading += len(docs)
+        ranks = [rank for rank, doc in enumerate(docs, start=1) if doc.id in set(item["relevant_ids"])]
+        hits += bool(ranks)
+        reciprocal_ranks += 1 / ranks[0] if ranks else 0.0
+
+    n = max(len(questions), 1)
+    return {
+        "k": k,
+        "recall": hits / n,
+        "mrr": reciprocal_ranks / n,
+        "docs_to_grading": sent_to_grading / n,
+        "rewrite_loops": len(questions) - hits,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", type=Path, help="JSONL of labeled questions, runs the real indexes")
+    parser.add_argument("--docs", type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument("--dense-k", type=int, default=15, help="k of the dense-only baseline")
+    parser.add_argument("--k", type=int, default=10, help="k of the hybrid retriever")
+    parser.add_argument("--dense-weight", type=float, default=1.0)
+    parser.add_argument("--sparse-weight", type=float, default=1.0)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.dataset:
+        from agent.lang_graph import resources
+        from agent.vector_store.backends import get_sparse_index
+
+        questions = [json.loads(line) for line in args.dataset.read_text(encoding="utf-8").splitlines() if line.strip()]
+        vector_store, sparse_index = resources.vector_store(), get_sparse_index()
+        if sparse_index is None:
+            print("FAIL: no BM25 index, run the ingestion (WebPageLoader) first")
+            return 1
+    else:
+        docs, questions, synonyms = synthetic_corpus(args.docs)
+        vector_store = LocalVectorStore.from_texts(
+            [doc.page_content for doc in docs], ConceptEmbeddings(synonyms), ids=[doc.id for doc in docs]
+        )
+        sparse_index = BM25Index()
+        sparse_index.add([doc.id for doc in docs], [doc.page_content for doc in docs])
+
+    hybrid = HybridRetriever(
+        vector_store=vector_store,
+        sparse_index=sparse_index,
+        k=args.k,
+        dense_k=2 * args.k,
+        sparse_k=2 * args.k,
+        dense_weight=args.dense_weight,
+        sparse_weight=args.sparse_weight,
+        rrf_k=args.rrf_k,
+    )
+    results = {
+        "dense": evaluate(lambda q: vector_store.similarity_search(q, k=args.dense_k), questions, args.dense_k),
+        "bm25": evaluate(lambda q: [doc for doc, _ in sparse_index.search(q, k=args.k)], questions, args.k),
+        "hybrid": evaluate(hybrid.invoke, questions, args.k),
+    }
+
+    print(f"{len(questions)} questions over {len(sparse_index)} chunks")
+    print(f"{'retriever':<10}{'k':>4}{'recall@k':>10}{'MRR':>8}{'docs/question':>15}{'rewrite loops':>15}")
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['k']:>4}{r['recall']:>10.3f}{r['mrr']:>8.3f}"
+            f"{r['docs_to_grading']:>15.1f}{r['rewrite_loops']:>15}"
+        )
+
+    if results["hybrid"]["recall"] < results["dense"]["recall"]:
+        print("FAIL: hybrid retrieval recalls less than dense retrieval")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Startup-time benchmark of the agent package.
+
+Measures, each in a fresh interpreter, the import time of the graph module and the
+time to the first compiled graph (run against a throwaway local vector store and
+dummy API keys, so no network is involved). It also checks that importing the
+graph does not pull in the heavy client SDKs (nor tiktoken and numpy), and exits non-zero when a limit is
+exceeded so import-time regressions fail loudly.
+
+Run it from the repository root with:
+    python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent
+
+# SDKs and heavy libraries that must only be imported when first used.
+LAZY_MODULES = (
+    "tiktoken",
+    "numpy",
+    "pinecone",
+    "langchain_pinecone",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_community",
+    "openai",
+    "anthropic",
+    "tavily",
+)
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import agent.lang_graph.graph
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "eager": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+BUILD_PROBE = """
+import json, time
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent.vector_store.local_store import LocalVectorStore
+from agent.vector_store.backends import local_store_path
+LocalVectorStore.from_texts(["warm up"], DeterministicFakeEmbedding(size=8)).save(local_store_path())
+
+start = time.perf_counter()
+from agent.lang_graph.graph import get_agent
+get_agent()
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def run_probe(code: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=root_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=2.5)
+    parser.add_argument("--max-build-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(root_dir),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "benchmark"),
+        "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY", "benchmark"),
+        "VECTOR_STORE_BACKEND": "local",
+        "LOCAL_VECTOR_STORE_PATH": tempfile.mkdtemp(prefix="startup-bench-"),
+    }
+
+    imports = [run_probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+    builds = [run_probe(BUILD_PROBE, env) for _ in range(args.runs)]
+
+    import_time = statistics.median(run["seconds"] for run in imports)
+    build_time = statistics.median(run["seconds"] for run in builds)
+    eager = sorted({module for run in imports for module in run["eager"]})
+
+    print(f"import agent.lang_graph.graph: {import_time * 1000:.0f} ms (median of {args.runs})")
+    print(f"time to first compiled graph:  {build_time * 1000:.0f} ms (median of {args.runs})")
+
+    failures = []
+    if eager:
+        failures.append(f"heavy modules imported eagerly: {', '.join(eager)}")
+    if import_time > args.max_import_seconds:
+        failures.append(f"import took {import_time:.2f}s, limit is {args.max_import_seconds:.2f}s")
+    if build_time > args.max_build_seconds:
+        failures.append(f"graph build took {build_time:.2f}s, limit is {args.max_build_seconds:.2f}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
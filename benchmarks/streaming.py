@@ -0,0 +1,125 @@
+"""
+Streaming render benchmark of the chat front end.
+
+Replays a synthetic answer stream (thinking chunks, then text chunks, arriving
+every `--chunk-interval` seconds) through two renderers and reports the
+time-to-first-token, the total time until the last frame, the number of frames,
+the time spent rendering and the bytes re-sent to the browser:
+
+- "per-chunk": the previous renderer, which re-rendered the whole markdown on
+  every chunk and slept `--legacy-sleep` seconds after every streamed event.
+- "coalesced": FrameBuffer, which renders at most `--max-fps` frames a second.
+
+Rendering is stood in for by a placeholder whose cost grows with the text length,
+like Streamlit re-sending and re-parsing the whole markdown on every update.
+
+Run it from the repository root with:
+    python -m benchmarks.streaming
+"""
+import argparse
+import re
+import sys
+import time
+from front_end.utils.streaming import FrameBuffer
+
+MARKDOWN_PATTERN = re.compile(r"(\*\*|__|`|#+ |\n)")
+
+
+class FakePlaceholder:
+    """Stand-in for st.empty(): rendering costs one pass over the whole text."""
+
+    def __init__(self):
+        self.render_time = 0.0
+        self.bytes_sent = 0
+        self.first_render = None
+
+    def markdown(self, text: str) -> None:
+        start = time.perf_counter()
+        if self.first_render is None:
+            self.first_render = start
+        payload = text.encode("utf-8")
+        MARKDOWN_PATTERN.findall(text)
+        self.bytes_sent += len(payload)
+        self.render_time += time.perf_counter() - start
+
+
+def synthetic_stream(thinking_chunks: int, text_chunks: int, chunk_interval: float, chunk_size: int):
+    """Yield ("thinking" | "text", chunk) pairs at a steady pace, like a model streaming."""
+    words = "the retrieved documents describe **agents** with `memory`, planning and tool use\n".split(" ")
+    for i in range(thinking_chunks + text_chunks):
+        time.sleep(chunk_interval)
+        channel = "thinking" if i < thinking_chunks else "text"
+        yield channel, " ".join(words[(i + j) % len(words)] for j in range(chunk_size)) + " "
+
+
+def run_per_chunk(args) -> dict:
+    thinking, text = FakePlaceholder(), FakePlaceholder()
+    streamed_thoughts, answer = "", ""
+    start = time.perf_counter()
+    for channel, chunk in synthetic_stream(args.thinking_chunks, args.text_chunks, args.chunk_interval, args.chunk_size):
+        if channel == "thinking":
+            streamed_thoughts += chunk
+            thinking.markdown(f"**Model is thinking...**\n\n{streamed_thoughts}")
+        else:
+            answer += chunk
+            text.markdown(answer)
+    elapsed = time.perf_counter() - start
+
+    events = args.thinking_chunks + args.text_chunks
+    return {
+        "ttft": text.first_render - start + args.legacy_sleep * args.thinking_chunks,
+        "total": elapsed + args.legacy_sleep * events,
+        "frames": events,
+        "render_time": thinking.render_time + text.render_time,
+        "bytes_sent": thinking.bytes_sent + text.bytes_sent,
+    }
+
+
+def run_coalesced(args) -> dict:
+    thinking, text = FakePlaceholder(), FakePlaceholder()
+    thoughts = FrameBuffer(lambda value: thinking.markdown(f"**Model is thinking...**\n\n{value}"), max_fps=args.max_fps)
+    answer = FrameBuffer(text.markdown, max_fps=args.max_fps)
+    start = time.perf_counter()
+    for channel, chunk in synthetic_stream(args.thinking_chunks, args.text_chunks, args.chunk_interval, args.chunk_size):
+        (thoughts if channel == "thinking" else answer).write(chunk)
+    thoughts.flush()
+    answer.flush()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ttft": text.first_render - start,
+        "total": elapsed,
+        "frames": thoughts.frames + answer.frames,
+        "render_time": thinking.render_time + text.render_time,
+        "bytes_sent": thinking.bytes_sent + text.bytes_sent,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thinking-chunks", type=int, default=100)
+    parser.add_argument("--text-chunks", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=4, help="words per chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.002, help="seconds between chunks")
+    parser.add_argument("--max-fps", type=float, default=15.0)
+    parser.add_argument(
+        "--legacy-sleep", type=float, default=0.3,
+        help="per-event sleep of the previous renderer, added to its timings instead of actually slept",
+    )
+    args = parser.parse_args()
+
+    results = {"per-chunk": run_per_chunk(args), "coalesced": run_coalesced(args)}
+
+    print(f"{args.thinking_chunks} thinking + {args.text_chunks} text chunks, one every {args.chunk_interval * 1000:.0f} ms")
+    print(f"{'renderer':<11}{'TTFT':>10}{'total':>10}{'frames':>8}{'render time':>13}{'bytes sent':>12}")
+    for name, r in results.items():
+        print(
+            f"{name:<11}{r['ttft']:>9.3f}s{r['total']:>9.2f}s{r['frames']:>8}"
+            f"{r['render_time'] * 1000:>11.1f}ms{r['bytes_sent']:>12,}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
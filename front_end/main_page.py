@@ -15,14 +15,33 @@ sys.path.append(BASE_DIR)
 import streamlit as st
 import uuid
 from streamlit_javascript import st_javascript
-import requests
 
-from agent.lang_graph.graph import AdaptiveRAGGraph
-from front_end.utils.message_utils import stream_assistant_response, convert_messages_to_save, summary_conversation_theme
+from front_end.utils.chat_memory import ChatMemoryClient
+from front_end.utils.message_utils import (
+    stream_assistant_response, render_answer_stream, convert_messages_to_save, summary_conversation_theme
+)
+
+from agent.lang_graph.telemetry import configure_logging
 
 st.set_page_config(layout="wide")
+configure_logging()
+
+# With AGENT_API_URL set the page is a thin client of the agent service
+# (python -m agent.api.server); otherwise the graph runs in this process.
+AGENT_API_URL = os.getenv("AGENT_API_URL")
+if AGENT_API_URL:
+    from agent.lang_graph import resources
+    from front_end.utils.agent_client import AgentClient
+
+    agent_client = resources.shared("agent_client", lambda: AgentClient(AGENT_API_URL))
+    graph = None
+else:
+    from agent.lang_graph.graph import get_agent
+    from agent.lang_graph.semantic_cache import SemanticAnswerCache
+    from agent.lang_graph.verdict_cache import GradeVerdictCache
 
-graph = AdaptiveRAGGraph().agent
+    # Built once per process and shared by every session, so reruns don't rebuild it.
+    graph = get_agent(warm_up=True, answer_cache=SemanticAnswerCache(), verdict_cache=GradeVerdictCache())
 
 sidebar_style = """
 <style>
@@ -47,6 +66,11 @@ if os.path.exists(css_path):
 
 API_URL = "http://localhost:8000"
 
+# Chat-memory API client of this session: conversations are cached across reruns.
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ChatMemoryClient(API_URL)
+chat_memory = st.session_state.chat_memory
+
 # Simple session management
 if "user_session_id" not in st.session_state:
     st.session_state.user_session_id = None
@@ -86,14 +110,10 @@ if not st.session_state.user_session_id:
         
         if submit and username:
             # Call the backend login API
-            response = requests.post(
-                f"{API_URL}/auth/login-simple",
-                json={"username": username}
-            )
+            data = chat_memory.login(username)
             
-            if response.status_code == 200:
+            if data is not None:
                 # Extract session token from response
-                data = response.json()
                 new_session_id = data["session_token"]
                 st.session_state.user_session_id = new_session_id
                 st.session_state.user_name = data["user"]["name"]
@@ -125,11 +145,9 @@ if "thoughts" not in st.session_state:
 def load_conversations():
     session_token = st.session_state.user_session_id
     if session_token:
-        resp = requests.get(f"{API_URL}/conversation?session_token={session_token}")
-        if resp.status_code == 200:
-            data = resp.json()
-            return data["conversations"]
-        else:
+        try:
+            return chat_memory.conversations(session_token)
+        except Exception:
             st.error("Error loading chats.")
             return []
     return []
@@ -143,6 +161,7 @@ if st.sidebar.button("Logout"):
     st.session_state.messages = []
     st.session_state.thread_id = None
     st.session_state.thoughts = ""
+    chat_memory.clear()
     
     # Clear cookie via JavaScript
     st.markdown(
@@ -172,9 +191,21 @@ if conversations_list:
         if st.sidebar.button(label, key=conv["thread_id"]):
             st.session_state.thread_id = conv["thread_id"]
             st.session_state.messages = []
-            for role, content in conv["messages"]:
-                st.session_state.messages.append({"role": role, "content": content})
-            st.rerun()
+            # Message bodies are only fetched when a conversation is opened.
+            try:
+                history = chat_memory.messages(st.session_state.user_session_id, conv["thread_id"])
+            except Exception:
+                # Opened with an empty history; no rerun, so the error stays on screen.
+                st.error("Error loading the conversation messages.")
+            else:
+                for role, content in history:
+                    st.session_state.messages.append({"role": role, "content": content})
+                st.rerun()
+
+if chat_memory.has_more and chat_memory.headers is not None:
+    if st.sidebar.button("Load more"):
+        chat_memory.load_more(st.session_state.user_session_id)
+        st.rerun()
 
 st.title("AI Engineering Q&A w/ Adaptive RAG")
 
@@ -202,15 +233,7 @@ if prompt:
     if st.session_state.thread_id is None:
         st.session_state.thread_id = (session_token or "") + str(uuid.uuid4())
         conversation_theme = summary_conversation_theme(prompt)
-        payload_create = {
-            "session_id": session_token,
-            "thread_id": st.session_state.thread_id,
-            "thread_name": conversation_theme,
-            "first_message_role": "user",
-            "first_message_content": prompt
-        }
-        resp = requests.post(f"{API_URL}/conversation", json=payload_create)
-        if resp.status_code != 200:
+        if not chat_memory.create_conversation(session_token, st.session_state.thread_id, conversation_theme, prompt):
             st.error("Error to create new conversation.")
         st.session_state.messages.append({"role": "user", "content": prompt})
     else:
@@ -222,18 +245,18 @@ if prompt:
 
     memory_config = {"configurable": {"thread_id": st.session_state.thread_id}}
     with st.chat_message("assistant"):
-        final_response = stream_assistant_response(prompt, graph, memory_config)
+        if graph is None:
+            final_response = render_answer_stream(agent_client.stream(prompt, st.session_state.thread_id))
+        else:
+            final_response = stream_assistant_response(prompt, graph, memory_config)
 
     st.session_state.messages.append({"role": "assistant_response", "content": final_response})
 
-    full_msg_objects = graph.get_state(memory_config).values["messages"]
-
-    final_converted = convert_messages_to_save(full_msg_objects)
+    # Only the messages added since the last save are converted and appended.
+    def load_messages(offset: int) -> list:
+        if graph is None:
+            return agent_client.messages(st.session_state.thread_id, offset=offset)
+        return graph.get_state(memory_config).values["messages"][offset:]
 
-    update_payload = {
-        "thread_id": st.session_state.thread_id,
-        "messages": final_converted
-    }
-    patch_resp = requests.patch(f"{API_URL}/conversation", json=update_payload)
-    if patch_resp.status_code != 200:
+    if not chat_memory.persist(st.session_state.thread_id, load_messages, convert_messages_to_save):
         st.error("Error on updating conversation.")
@@ -0,0 +1,62 @@
+import json
+from typing import Iterator
+import requests
+from langchain_core.messages import BaseMessage, messages_from_dict
+
+
+class AgentServiceError(RuntimeError):
+    """The agent service refused or failed a run."""
+
+
+class AgentClient:
+    """
+    Client of the agent HTTP service (agent/api/server.py), so the Streamlit page
+    can run as a thin client while the graph scales separately.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, read_timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+
+    def stream(self, prompt: str, thread_id: str) -> Iterator[tuple[str, str]]:
+        """
+        Answer a user message of the thread and yield its answer events as they are
+        streamed (see agent/api/events.py).
+        """
+        with self.session.post(
+            f"{self.base_url}/threads/{thread_id}/runs/stream",
+            json={"message": prompt},
+            stream=True,
+            timeout=(self.timeout, self.read_timeout),
+        ) as response:
+            if response.status_code != 200:
+                raise AgentServiceError(f"Agent service answered {response.status_code}: {response.text}")
+
+            event, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith(":"):
+                    continue  # heartbeat
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                elif not line and event is not None:
+                    payload = json.loads("\n".join(data)) if data else None
+                    if event == "error":
+                        raise AgentServiceError(payload["message"])
+                    if event == "done":
+                        return
+                    yield event, payload
+                    event, data = None, []
+
+        raise AgentServiceError("Agent service closed the stream before the run finished")
+
+    def messages(self, thread_id: str, offset: int = 0) -> list[BaseMessage]:
+        """Messages of the thread from `offset` on, as stored by the service's checkpointer."""
+        response = self.session.get(
+            f"{self.base_url}/threads/{thread_id}/messages", params={"offset": offset}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return messages_from_dict(response.json()["messages"])
@@ -0,0 +1,218 @@
+import logging
+from typing import Callable
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from agent.lang_graph import resources
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts of the chat-memory API calls, in seconds.
+TIMEOUT = (3.05, 15.0)
+
+
+def http_session() -> requests.Session:
+    """
+    Keep-alive HTTP session shared by every Streamlit session of the process. Reads
+    (and the idempotent PATCH) are retried on connection errors and 502/503/504.
+    """
+    def build():
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "PATCH"}),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    return resources.shared("chat_memory_http_session", build)
+
+
+class ChatMemoryClient:
+    """
+    Client of the chat-memory API for one user session, with a session cache.
+
+    The sidebar only needs conversation headers (thread id and name): they are
+    fetched a page at a time (`limit`/`offset`, `include_messages=false`), and the
+    messages of a thread are only fetched when it is opened. Both are cached and
+    kept up to date by `create_conversation` and `update_messages`, so a Streamlit
+    rerun makes no HTTP call. A server that ignores the paging parameters and
+    returns every conversation with its messages fills both caches in one call.
+
+    `persist` saves a thread after each answer by appending only the messages added
+    since the last save, and falls back to a full PATCH when the server has no
+    append operation or the thread diverged from what was saved.
+    """
+
+    def __init__(self, base_url: str, page_size: int = 30):
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+        self.clear()
+
+    @property
+    def session(self) -> requests.Session:
+        return http_session()
+
+    def clear(self) -> None:
+        """Forget the cached conversations (e.g. on logout)."""
+        self.headers: list[dict] | None = None
+        self.messages_by_thread: dict[str, list] = {}
+        self.next_offset = 0
+        self.has_more = True
+        # thread id -> (graph messages saved, entries saved, last entry saved)
+        self.saved: dict[str, tuple[int, int, list]] = {}
+        self.append_supported = True
+
+    def login(self, username: str) -> dict | None:
+        response = self.session.post(f"{self.base_url}/auth/login-simple", json={"username": username}, timeout=TIMEOUT)
+        return response.json() if response.status_code == 200 else None
+
+    def conversations(self, session_token: str) -> list[dict]:
+        """Cached conversation headers, fetching the first page on first use."""
+        if self.headers is None:
+            self.headers = []
+            self.load_more(session_token)
+        return self.headers
+
+    def load_more(self, session_token: str) -> None:
+        """Fetch the next page of conversation headers."""
+        if not self.has_more:
+            return
+
+        response = self.session.get(
+            f"{self.base_url}/conversation",
+            params={
+                "session_token": session_token,
+                "limit": self.page_size,
+                "offset": self.next_offset,
+                "include_messages": "false",
+            },
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        page = response.json()["conversations"]
+
+        known = {conv["thread_id"] for conv in self.headers or []}
+        new = [conv for conv in page if conv["thread_id"] not in known]
+        for conv in new:
+            if "messages" in conv:
+                self.messages_by_thread.setdefault(conv["thread_id"], conv["messages"])
+
+        self.headers = (self.headers or []) + [
+            {key: value for key, value in conv.items() if key != "messages"} for conv in new
+        ]
+        self.next_offset += len(page)
+        # A short page is the last; so is an oversized one or one with nothing new
+        # (a server that ignores the paging parameters).
+        self.has_more = len(page) == self.page_size and len(new) > 0
+
+    def messages(self, session_token: str, thread_id: str) -> list:
+        """Messages ([role, content] pairs) of a conversation, fetched on first open."""
+        if thread_id not in self.messages_by_thread:
+            response = self.session.get(
+                f"{self.base_url}/conversation/{thread_id}",
+                params={"session_token": session_token},
+                timeout=TIMEOUT,
+            )
+            response.raise_for_status()
+            self.messages_by_thread[thread_id] = response.json()["messages"]
+        return self.messages_by_thread[thread_id]
+
+    def create_conversation(self, session_token: str, thread_id: str, thread_name: str, prompt: str) -> bool:
+        response = self.session.post(
+            f"{self.base_url}/conversation",
+            json={
+                "session_id": session_token,
+                "thread_id": thread_id,
+                "thread_name": thread_name,
+                "first_message_role": "user",
+                "first_message_content": prompt,
+            },
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            return False
+
+        if self.headers is not None:
+            self.headers.insert(0, {"thread_id": thread_id, "thread_name": thread_name})
+            self.next_offset += 1
+        self.messages_by_thread[thread_id] = [["user", prompt]]
+        self.saved[thread_id] = (1, 1, ["user", prompt])
+        return True
+
+    def update_messages(self, thread_id: str, messages: list) -> bool:
+        response = self.session.patch(
+            f"{self.base_url}/conversation",
+            json={"thread_id": thread_id, "messages": messages},
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            # The server copy is unknown now: fetch it again when the thread is opened.
+            self.messages_by_thread.pop(thread_id, None)
+            self.saved.pop(thread_id, None)
+            return False
+
+        self.messages_by_thread[thread_id] = messages
+        return True
+
+    def append_messages(self, thread_id: str, entries: list, expected_count: int) -> bool | None:
+        """
+        Append entries to a conversation that has `expected_count` entries.
+
+        Returns:
+            True when appended, False when the server copy diverged (it has another
+            number of entries) and None when the server has no append operation.
+        """
+        response = self.session.post(
+            f"{self.base_url}/conversation/{thread_id}/messages",
+            json={"messages": entries, "expected_count": expected_count},
+            timeout=TIMEOUT,
+        )
+        if response.status_code in (404, 405, 501):
+            self.append_supported = False
+            return None
+        if response.status_code != 200:
+            return False
+
+        if thread_id in self.messages_by_thread:
+            self.messages_by_thread[thread_id] = self.messages_by_thread[thread_id] + entries
+        return True
+
+    def persist(self, thread_id: str, load_messages: Callable[[int], list], convert: Callable[[list], list]) -> bool:
+        """
+        Save the graph messages of a thread after an answer.
+
+        Only the messages added since the last save are loaded, converted and
+        appended. The last saved message is loaded again and compared with the last
+        saved entry; on a mismatch, a failed append or when appending is not
+        supported, the whole thread is converted and PATCHed instead.
+
+        Args:
+            thread_id: the conversation.
+            load_messages: returns the graph messages of the thread from an index on.
+            convert: turns graph messages into [role, content] entries.
+        """
+        if thread_id in self.saved and self.append_supported:
+            count, entries_count, last_entry = self.saved[thread_id]
+            tail = load_messages(count - 1)
+            if tail and convert(tail[:1])[-1:] == [last_entry]:
+                new_entries = convert(tail[1:])
+                if not new_entries:
+                    return True
+                appended = self.append_messages(thread_id, new_entries, entries_count)
+                if appended:
+                    self.saved[thread_id] = (count - 1 + len(tail), entries_count + len(new_entries), new_entries[-1])
+                    return True
+            logger.warning(f"Conversation {thread_id} needs a full resync")
+
+        messages = load_messages(0)
+        entries = convert(messages)
+        if not self.update_messages(thread_id, entries):
+            return False
+        if entries:
+            self.saved[thread_id] = (len(messages), len(entries), entries[-1])
+        return True
@@ -1,32 +1,48 @@
-import time
 import streamlit as st
-from langchain_core.messages import HumanMessage, AIMessageChunk, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
 import os
+from agent.lang_graph import resources
+from agent.api.events import answer_events
+from front_end.utils.streaming import FrameBuffer
 from dotenv import load_dotenv
 from pathlib import Path
 
 root_dir = Path().absolute()
 load_dotenv(dotenv_path=root_dir / ".env")
 
-# Explicitly use the OpenAI API key
-summary_llm = ChatOpenAI(
-    model="gpt-4o-mini-2024-07-18",
-    openai_api_key=os.environ.get("OPENAI_API_KEY")
-)
+def summary_llm():
+    def build():
+        from langchain_openai import ChatOpenAI
 
-def stream_assistant_response(prompt, graph, memory_config) -> str:
+        # Explicitly use the OpenAI API key
+        return ChatOpenAI(
+            model="gpt-4o-mini-2024-07-18",
+            openai_api_key=os.environ.get("OPENAI_API_KEY"),
+            http_client=resources.openai_http_client()
+        )
+
+    return resources.shared("summary_llm", build)
+
+# Nodes that run before any document is retrieved or graded.
+ROUTING_NODES = ("__start__", "init_budget", "update_memory", "lookup_cache", "speculate_route")
+
+def stream_assistant_response(prompt, graph, memory_config, max_fps: float = 15.0) -> str:
     """
-    Stream assistant answer displaying thoughts in real time and, when the final
-    answer starts, replacing thoughts with an expander. Returns the final generated
-    answer.
+    Run the graph in process and render its answer stream (see `render_answer_stream`).
+    Returns the final generated answer.
+    """
+    return render_answer_stream(answer_events(graph, prompt, memory_config), max_fps=max_fps)
+
+def render_answer_stream(events, max_fps: float = 15.0) -> str:
+    """
+    Render answer events, from the graph or from the agent service, displaying
+    thoughts in real time and, when the final answer starts, replacing thoughts
+    with an expander. Thoughts and answer are buffered separately and re-rendered at
+    most `max_fps` times a second, however fast chunks arrive. Returns the final
+    generated answer.
     """
-    final_response = ""
-    streaming_thoughts = ""
     thinking_expander_created = False
-    current_node = ""
-    is_routing = False
     document_relevance_low = False
 
     # Reinicia os pensamentos para a interação atual (não acumula com interações anteriores)
@@ -38,72 +54,56 @@ def stream_assistant_response(prompt, graph, memory_config) -> str:
     node_placeholder = st.empty()
     loading_placeholder = st.empty()
 
-    for response in graph.stream(
-        {"messages": [HumanMessage(content=prompt)]},
-        stream_mode="messages",
-        config=memory_config
-    ):
-        if isinstance(response, tuple):
-            if len(response) > 1 and isinstance(response[1], dict):
-                metadata = response[1]
-                
-                if 'langgraph_node' in metadata:
-                    new_node = metadata['langgraph_node']
-                    
-                    if new_node == '__start__':
-                        if not is_routing:
-                            is_routing = True
-                            loading_placeholder.markdown("⏳ **Searching for relevant documents...**")
-                            node_placeholder.empty()
-                    
-                    elif new_node != current_node and new_node != 'generate':
-                        current_node = new_node
-                        is_routing = False
-                        
-                        if 'grade_documents' in new_node:
-                            loading_placeholder.empty()
-                            node_placeholder.markdown("🔍 **Evaluating relevance of retrieved documents...**")
-                        elif document_relevance_low and 'retrieve_documents' in new_node:
-                            loading_placeholder.empty()
-                            node_placeholder.markdown("📚 **Document relevance is low, searching for more documents...**")
-                
-                if 'langgraph_node' in metadata and 'grade_documents' in metadata['langgraph_node']:
-                    for item in response:
-                        if isinstance(item, AIMessageChunk) and hasattr(item, 'additional_kwargs'):
-                            if 'parsed' in item.additional_kwargs and hasattr(item.additional_kwargs['parsed'], 'binary_score'):
-                                if item.additional_kwargs['parsed'].binary_score == 'no':
-                                    document_relevance_low = True
-            
-            for item in response:
-                if isinstance(item, AIMessageChunk) and item.content:
-                    
-                    if isinstance(item.content, list) and len(item.content) > 0:
-                        chunk = item.content[0]
-                        if "type" in chunk:
-                            if chunk["type"] == "thinking" and "thinking" in chunk:
-                                if not thinking_expander_created:
-                                    streaming_thoughts += chunk["thinking"]
-                                    thinking_placeholder.markdown(
-                                        f"**Model is thinking...**\n\n{streaming_thoughts}"
-                                    )
-                            elif chunk["type"] == "text" and "text" in chunk:
-                                if not thinking_expander_created:
-                                    thinking_placeholder.empty()
-                                    st.session_state.thoughts = streaming_thoughts
-                                    st.expander("🤖 Model's Thoughts", expanded=False).markdown(
-                                        st.session_state.thoughts
-                                    )
-                                    thinking_expander_created = True
-                                    node_placeholder.empty()
-                                final_response += chunk["text"]
-                                final_placeholder.markdown(final_response)
-        time.sleep(0.3)
+    thoughts = FrameBuffer(
+        lambda text: thinking_placeholder.markdown(f"**Model is thinking...**\n\n{text}"),
+        max_fps=max_fps,
+    )
+    answer = FrameBuffer(final_placeholder.markdown, max_fps=max_fps)
+
+    for event, data in events:
+        if event == "node":
+            if data in ROUTING_NODES:
+                loading_placeholder.markdown("⏳ **Searching for relevant documents...**")
+                node_placeholder.empty()
+            elif data == "grade_documents":
+                loading_placeholder.empty()
+                node_placeholder.markdown("🔍 **Evaluating relevance of retrieved documents...**")
+            elif document_relevance_low and data == "retrieve_documents":
+                loading_placeholder.empty()
+                node_placeholder.markdown("📚 **Document relevance is low, searching for more documents...**")
+
+        elif event == "low_relevance":
+            document_relevance_low = True
+
+        elif event == "thinking":
+            if not thinking_expander_created:
+                thoughts.write(data)
+
+        elif event == "text":
+            if not thinking_expander_created:
+                thinking_placeholder.empty()
+                st.session_state.thoughts = thoughts.value
+                st.expander("🤖 Model's Thoughts", expanded=False).markdown(
+                    st.session_state.thoughts
+                )
+                thinking_expander_created = True
+                node_placeholder.empty()
+            answer.write(data)
+
+        # Chunks that arrived between two frames are shown by the next event.
+        answer.tick()
+        if not thinking_expander_created:
+            thoughts.tick()
+
+    if not thinking_expander_created:
+        thoughts.flush()
+    answer.flush()
 
     # Limpa qualquer placeholder restante ao finalizar
     loading_placeholder.empty()
     node_placeholder.empty()
     
-    return final_response
+    return answer.value
 
 def convert_messages_to_save(messages: list) -> list:
     """
@@ -154,7 +154,7 @@ def summary_conversation_theme(prompt: str) -> str:
 
     summary_prompt = "Take the user input prompt and resume it in a few words as the main theme of the conversation. Try to use less min2 max5 words. User prompt: {prompt}"
 
-    chain = summary_llm | StrOutputParser()
+    chain = summary_llm() | StrOutputParser()
 
     theme = chain.invoke(summary_prompt.format(prompt=prompt))
 
@@ -0,0 +1,61 @@
+import time
+from typing import Callable
+
+
+class FrameBuffer:
+    """
+    Coalesce streamed chunks into frames rendered at most `max_fps` times a second.
+
+    Every write is appended to the buffer, but the accumulated text is only rendered
+    when at least 1/max_fps seconds passed since the previous frame, so the cost of
+    re-rendering the whole markdown grows with the number of frames instead of the
+    number of chunks. The first write renders immediately (time-to-first-token is
+    not delayed) and `flush` renders what is left once the stream ends. Nothing ever
+    sleeps: a chunk that arrives between frames waits for the next write, `tick` or
+    `flush`.
+    """
+
+    def __init__(self, render: Callable[[str], None], max_fps: float = 15.0, clock: Callable[[], float] = time.perf_counter):
+        if max_fps <= 0:
+            raise ValueError("max_fps must be positive")
+
+        self.render = render
+        self.frame_interval = 1.0 / max_fps
+        self.clock = clock
+
+        self._parts: list[str] = []
+        self._value = ""
+        self._dirty = False
+        self._last_frame = float("-inf")
+
+        self.chunks = 0
+        self.frames = 0
+
+    @property
+    def value(self) -> str:
+        if self._parts:
+            self._value += "".join(self._parts)
+            self._parts = []
+        return self._value
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self._parts.append(text)
+        self._dirty = True
+        self.chunks += 1
+        self.tick()
+
+    def tick(self) -> None:
+        """Render a frame if there is something new and the frame interval elapsed."""
+        if self._dirty and self.clock() - self._last_frame >= self.frame_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Render the buffer now if it changed since the last frame."""
+        if not self._dirty:
+            return
+        self.render(self.value)
+        self._dirty = False
+        self._last_frame = self.clock()
+        self.frames += 1
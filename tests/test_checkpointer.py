@@ -0,0 +1,40 @@
+import operator
+from typing import Annotated, TypedDict
+from langgraph.graph import END, START, StateGraph
+from agent.lang_graph.checkpointer import SQLiteCheckpointer
+
+
+class State(TypedDict):
+    messages: Annotated[list, operator.add]
+
+
+def build(saver: SQLiteCheckpointer):
+    graph = StateGraph(State)
+    graph.add_node("answer", lambda state: {"messages": ["answer"]})
+    graph.add_edge(START, "answer")
+    graph.add_edge("answer", END)
+    return graph.compile(checkpointer=saver)
+
+
+def test_run_is_visible_to_another_saver_on_the_same_file(tmp_path):
+    path = tmp_path / "agent.sqlite"
+    # A long flush interval: nothing may depend on the timer.
+    writer = build(SQLiteCheckpointer(path, flush_interval=60))
+    reader = build(SQLiteCheckpointer(path, flush_interval=60))
+    config = {"configurable": {"thread_id": "thread"}}
+
+    writer.invoke({"messages": ["question"]}, config)
+
+    assert reader.get_state(config).values["messages"] == ["question", "answer"]
+
+
+def test_only_the_last_checkpoints_of_a_thread_are_kept(tmp_path):
+    saver = SQLiteCheckpointer(tmp_path / "agent.sqlite", keep_last=2)
+    agent = build(saver)
+    config = {"configurable": {"thread_id": "thread"}}
+
+    for turn in range(3):
+        agent.invoke({"messages": [f"question {turn}"]}, config)
+
+    assert len(list(saver.list(config))) == 2
+    assert len(agent.get_state(config).values["messages"]) == 6
@@ -0,0 +1,48 @@
+from agent.lang_graph import budget as budgets
+from agent.lang_graph.edges import AdaptiveRAGEdges
+
+edges = AdaptiveRAGEdges()
+
+
+def test_a_speculated_route_that_found_nothing_is_not_run_again():
+    assert edges.route_speculated({"route": "vectorstore", "documents": []}) == "grade_documents"
+    assert edges.route_speculated({"route": "web_search", "documents": []}) == "generate"
+
+
+def test_a_route_that_was_not_speculated_runs():
+    assert edges.route_speculated({"route": "vectorstore", "documents": None}) == "vectorstore"
+    assert edges.route_speculated({"route": "web_search", "documents": None}) == "web_search"
+
+
+def state(documents: list | None = None, grade: str | None = None, **spent) -> dict:
+    budget = budgets.new_budget(max_rewrites=1, max_regenerations=1)
+    budget.update(spent)
+    return {"documents": documents or [], "generation_grade": grade, "budget": budget}
+
+
+def test_without_relevant_documents_the_query_is_rewritten_while_the_budget_allows_it():
+    assert edges.decide_to_generate(state()) == "rewrite_query"
+    assert edges.decide_to_generate(state(["document"], rewrites=1)) == "generate"
+
+
+def test_out_of_rewrites_the_run_degrades_to_a_web_search():
+    assert edges.decide_to_generate(state(rewrites=1)) == "web_search"
+    assert edges.decide_to_generate(state(exhausted=budgets.REWRITES)) == "web_search"
+
+
+def test_out_of_time_or_llm_calls_the_run_generates_with_what_it_has():
+    assert edges.decide_to_generate(state(exhausted=budgets.DEADLINE)) == "generate"
+    assert edges.decide_to_generate(state(exhausted=budgets.LLM_CALLS)) == "generate"
+
+
+def test_a_graded_generation_loops_while_the_budget_allows_it():
+    assert edges.decide_after_grading(state(grade="useful")) == "useful"
+    assert edges.decide_after_grading(state(grade="not supported", generations=1)) == "not supported"
+    assert edges.decide_after_grading(state(grade="not useful")) == "not useful"
+
+
+def test_a_graded_generation_ends_once_the_budget_is_exhausted():
+    assert edges.decide_after_grading(state(grade="not supported", generations=2)) == "end"
+    assert edges.decide_after_grading(state(grade="not useful", rewrites=1)) == "end"
+    assert edges.decide_after_grading(state(grade="not supported", exhausted=budgets.DEADLINE)) == "end"
+    assert edges.decide_after_grading(state(grade="not useful", exhausted=budgets.LLM_CALLS)) == "end"
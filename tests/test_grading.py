@@ -0,0 +1,41 @@
+import time
+from langchain_core.documents import Document
+from agent.lang_graph.grading import DocumentGrader
+from agent.lang_graph.output_models import DocumentVerdict, GradeDocumentsBatch
+
+
+class SlowBatchGrader:
+    """Batch grader chain answering "yes" after `seconds`, or hanging on the documents in `hang`."""
+
+    def __init__(self, seconds: float, hang: set[int], hang_seconds: float = 2.0):
+        self.seconds = seconds
+        self.hang = hang
+        self.hang_seconds = hang_seconds
+
+    def invoke(self, inputs: dict) -> GradeDocumentsBatch:
+        ids = [i for i in range(10) if f'<document id="{i}">' in inputs["documents"]]
+        time.sleep(self.hang_seconds if set(ids) & self.hang else self.seconds)
+        return GradeDocumentsBatch(verdicts=[DocumentVerdict(document_id=i, binary_score="yes") for i in ids])
+
+
+def test_listwise_timeouts_do_not_add_up_across_batches():
+    docs = [Document(page_content=f"document {i} " + "word " * 20) for i in range(4)]
+    grader = DocumentGrader(
+        grader_chain=None,
+        mode="listwise",
+        max_concurrency=4,
+        timeout=0.3,
+        default_verdict="no",
+        # One document per batch.
+        batch_grader_chain=SlowBatchGrader(seconds=0.05, hang={1, 2, 3}),
+        max_batch_tokens=1,
+    )
+
+    start = time.perf_counter()
+    filtered, report = grader.grade(docs, "question")
+    elapsed = time.perf_counter() - start
+
+    assert filtered == docs[:1]
+    assert [failure["reason"] for failure in report["failures"]] == ["timeout"] * 3
+    # Waiting on the batches in order took about 3 timeouts.
+    assert elapsed < 0.3 * 2
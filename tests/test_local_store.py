@@ -0,0 +1,45 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from agent.vector_store.local_store import LocalVectorStore
+
+VECTORS = {
+    "north": [1.0, 0.0, 0.0],
+    "north east": [0.9, 0.1, 0.0],
+    "east": [0.0, 1.0, 0.0],
+    "up": [0.0, 0.0, 1.0],
+}
+
+
+class TableEmbeddings(Embeddings):
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [VECTORS[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return VECTORS[text]
+
+
+def store() -> LocalVectorStore:
+    vector_store = LocalVectorStore(TableEmbeddings(), n_probe=1)
+    vector_store.add_texts(["north", "north east", "east"])
+    return vector_store
+
+
+def test_ivf_search_finds_the_closest_documents():
+    vector_store = store()
+    vector_store.build_ivf(n_lists=2)
+
+    docs = vector_store.similarity_search("north", k=2)
+
+    assert [doc.page_content for doc in docs] == ["north", "north east"]
+
+
+def test_ivf_search_with_an_empty_probed_partition_falls_back_to_exact_search():
+    vector_store = store()
+    vector_store.build_ivf(n_lists=2)
+    # A partition no vector is assigned to, closest to the query.
+    vector_store._centroids = np.vstack([vector_store._centroids, [0.0, 0.0, 1.0]]).astype(np.float32)
+
+    docs = vector_store.similarity_search("up", k=2)
+
+    assert len(docs) == 2
+    assert vector_store.similarity_search("up", k=0) == []
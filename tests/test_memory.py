@@ -0,0 +1,29 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from agent.lang_graph.memory import ConversationMemory
+
+
+def conversation(turns: int, words: int = 50) -> list:
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"question {turn} " + "word " * words))
+        messages.append(AIMessage(content=f"answer {turn} " + "word " * words))
+    return messages
+
+
+def test_the_view_stays_within_the_token_budget_before_the_overflow_is_summarized():
+    memory = ConversationMemory(max_tokens=300, summary_batch_tokens=10_000)
+    messages = conversation(10) + [HumanMessage(content="current question")]
+
+    view = memory.view(messages, summarized=0)
+
+    assert memory.to_summarize(messages, summarized=0) == []
+    assert memory.tokens(view) <= memory.max_tokens
+    assert view[-1].content == "current question"
+    assert view[0].content.startswith("question ")
+
+
+def test_the_current_turn_is_kept_even_over_the_budget():
+    memory = ConversationMemory(max_tokens=10)
+    messages = conversation(2) + [HumanMessage(content="current " + "word " * 100)]
+
+    assert memory.view(messages, summarized=0) == messages[-1:]
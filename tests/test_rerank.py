@@ -0,0 +1,19 @@
+from langchain_core.documents import Document
+from agent.lang_graph.rerank import CandidateReranker
+from agent.vector_store.hybrid import RELEVANCE_SCORE
+
+QUESTION = "What is an agent?"
+
+
+def test_a_keyword_only_match_is_still_sent_to_the_grader():
+    # A BM25-only hit containing every term of the question, as fused by the hybrid retriever.
+    keyword_hit = Document(page_content="Our cafeteria agent will be on vacation next week.")
+    dense_hit = Document(
+        page_content="An LLM agent plans and calls tools to reach a goal.",
+        metadata={RELEVANCE_SCORE: 0.95},
+    )
+
+    to_grade, confident, _ = CandidateReranker().rerank([keyword_hit, dense_hit], QUESTION)
+
+    assert keyword_hit in to_grade
+    assert confident == [dense_hit]